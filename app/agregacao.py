@@ -0,0 +1,296 @@
+# app/agregacao.py
+# Agregação dos registros por data de pagamento sobre as colunas do ArmazemRegistros:
+# centavos inteiros somados por ordinal de data com NumPy (ou com laço simples sem ele),
+# com resultado idêntico, inclusive no expoente do Decimal, ao da soma registro a registro.
+# O IndiceDatas organiza esses totais por dia para consultas por intervalo, semana e mês.
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from app.registros import DATA_VAZIA, ArmazemRegistros, data_para_ordinal, ordinal_para_data
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:
+    np = None
+
+ROTULO_SEM_DATA = "Data não identificada"
+
+# Maior intervalo de ordinais (em dias) somado com um balde por dia
+_LIMITE_BALDES = 100_000
+
+# Soma de um grupo: (centavos dos valores regulares, quantidade deles, valores fora do padrão)
+_Grupo = Tuple[int, int, List[Decimal]]
+
+# Chave de agrupamento: ordinal da data, ou o texto dela quando não é uma data válida
+Chave = Union[int, str]
+
+
+def _rotulo(data: str) -> str:
+    return data if data else ROTULO_SEM_DATA
+
+
+def rotulo_chave(chave: Chave) -> str:
+    return ordinal_para_data(chave) if isinstance(chave, int) else chave
+
+
+def somar_por_data_decimal(registros: Sequence, ignorar_nulos: bool = False) -> Dict[str, Decimal]:
+    """Caminho de referência: soma Decimal registro a registro (a implementação original)"""
+    somas: Dict[str, Decimal] = {}
+    for registro in registros:
+        if ignorar_nulos and not registro.valor:
+            continue
+        data = _rotulo(registro.data_pagamento)
+        somas[data] = somas.get(data, Decimal('0')) + registro.valor
+    return somas
+
+
+def _grupos_vetorizados(armazem: ArmazemRegistros, ignorar_nulos: bool,
+                        excecoes: set) -> Dict[Union[int, str], _Grupo]:
+    """Soma por ordinal de data dos registros regulares, com NumPy quando disponível"""
+    grupos: Dict[Union[int, str], _Grupo] = {}
+    if np is not None:
+        datas = np.frombuffer(armazem.datas, dtype=f"i{armazem.datas.itemsize}")
+        centavos = np.frombuffer(armazem.centavos, dtype=f"i{armazem.centavos.itemsize}")
+        mascara = np.ones(len(datas), dtype=bool)
+        if excecoes:
+            mascara[np.fromiter(excecoes, dtype=np.int64, count=len(excecoes))] = False
+        if ignorar_nulos:
+            mascara &= centavos != 0
+        # Registros sem data (ordinal 0) ficariam longe das demais datas no intervalo de baldes
+        sem_data = mascara & (datas == DATA_VAZIA)
+        if sem_data.any():
+            grupos[DATA_VAZIA] = (int(centavos[sem_data].sum()), int(sem_data.sum()), [])
+            mascara &= ~sem_data
+        datas = datas[mascara]
+        centavos = centavos[mascara]
+        if len(datas) == 0:
+            return grupos
+        # Datas viram índices de balde: o deslocamento do ordinal quando o intervalo é curto
+        # (o caso comum, poucos anos), ou a posição entre as datas distintas
+        menor = int(datas.min())
+        if int(datas.max()) - menor < _LIMITE_BALDES:
+            indices = datas - menor
+            ordinais = np.arange(menor, int(datas.max()) + 1)
+        else:
+            ordinais, indices = np.unique(datas, return_inverse=True)
+        # add.at soma em int64, sem passar por float como o bincount com pesos
+        somas = np.zeros(len(ordinais), dtype=np.int64)
+        np.add.at(somas, indices, centavos)
+        quantidades = np.bincount(indices, minlength=len(ordinais))
+        ocupados = np.flatnonzero(quantidades)
+        for ordinal, soma, quantidade in zip(ordinais[ocupados].tolist(), somas[ocupados].tolist(),
+                                             quantidades[ocupados].tolist()):
+            grupos[ordinal] = (soma, quantidade, [])
+        return grupos
+
+    for posicao, (ordinal, centavos) in enumerate(zip(armazem.datas, armazem.centavos)):
+        if (ignorar_nulos and centavos == 0) or posicao in excecoes:
+            continue
+        soma, quantidade, _ = grupos.get(ordinal, (0, 0, None))
+        grupos[ordinal] = (soma + centavos, quantidade + 1, [])
+    return grupos
+
+
+def _grupos(armazem: ArmazemRegistros, ignorar_nulos: bool) -> Dict[Chave, _Grupo]:
+    """
+    Grupos pelo ordinal da data (ou pelo rótulo, para registros sem data ou com data inválida);
+    registros com valor ou data fora do padrão vão um a um.
+    """
+    excecoes = set(armazem.valores_excecao) | set(armazem.datas_excecao)
+    grupos: Dict[Chave, _Grupo] = {}
+    for ordinal, grupo in _grupos_vetorizados(armazem, ignorar_nulos, excecoes).items():
+        grupos[ROTULO_SEM_DATA if ordinal == DATA_VAZIA else ordinal] = grupo
+
+    for posicao in sorted(excecoes):
+        valor = armazem.valor(posicao)
+        if ignorar_nulos and not valor:
+            continue
+        if posicao in armazem.datas_excecao:
+            chave: Chave = armazem.datas_excecao[posicao]
+        else:
+            ordinal = armazem.datas[posicao]
+            chave = ROTULO_SEM_DATA if ordinal == DATA_VAZIA else ordinal
+        soma, quantidade, fora_do_padrao = grupos.get(chave, (0, 0, []))
+        if posicao in armazem.valores_excecao:
+            grupos[chave] = (soma, quantidade, fora_do_padrao + [valor])
+        else:
+            grupos[chave] = (soma + armazem.centavos[posicao], quantidade + 1, fora_do_padrao)
+    return grupos
+
+
+def _total_grupo(grupo: _Grupo, inicio: Union[Decimal, int]) -> Union[Decimal, int]:
+    """
+    Converte a soma em centavos para Decimal. O expoente de uma soma Decimal é o menor entre as
+    parcelas, então o resultado só ganha as duas casas se houver ao menos um valor regular.
+    """
+    centavos, quantidade, fora_do_padrao = grupo
+    total = Decimal(centavos).scaleb(-2) if quantidade else inicio
+    for valor in fora_do_padrao:
+        total = total + valor
+    return total
+
+
+def somar_por_chave(registros: Sequence, ignorar_nulos: bool = False) -> Dict[Chave, Decimal]:
+    """
+    Soma os valores por ordinal da data de pagamento; datas ausentes ficam em ROTULO_SEM_DATA
+    e datas fora do formato DD/MM/AAAA ficam no próprio texto.
+    ignorar_nulos descarta valores None ou zero, como no agrupamento diário do ISSQN.
+    Sequências que não são ArmazemRegistros usam o caminho Decimal de referência.
+    """
+    if not isinstance(registros, ArmazemRegistros):
+        somas: Dict[Chave, Decimal] = {}
+        for data, total in somar_por_data_decimal(registros, ignorar_nulos).items():
+            somas[data_para_ordinal(data) or data] = total
+        return somas
+    return {chave: _total_grupo(grupo, Decimal('0')) for chave, grupo in _grupos(registros, ignorar_nulos).items()}
+
+
+def somar_por_data(registros: Sequence, ignorar_nulos: bool = False) -> Dict[str, Decimal]:
+    """Como somar_por_chave, mas com as datas no formato DD/MM/AAAA"""
+    return {rotulo_chave(chave): total for chave, total in somar_por_chave(registros, ignorar_nulos).items()}
+
+
+def somar(registros: Sequence, ignorar_none: bool = False) -> Union[Decimal, int]:
+    """
+    Total dos valores, igual a sum(v.valor for v in registros); com ignorar_none, os valores
+    None são descartados. Como no sum(), uma sequência sem valores resulta no inteiro 0.
+    """
+    if not isinstance(registros, ArmazemRegistros):
+        return sum(v.valor for v in registros if not (ignorar_none and v.valor is None))
+    fora_do_padrao: List[Decimal] = []
+    if np is not None and len(registros.centavos):
+        # Valores fora do padrão têm 0 na coluna de centavos e não alteram a soma
+        centavos = int(np.frombuffer(registros.centavos, dtype=f"i{registros.centavos.itemsize}").sum())
+    else:
+        centavos = sum(registros.centavos)
+    quantidade = len(registros) - len(registros.valores_excecao)
+    for posicao in sorted(registros.valores_excecao):
+        valor = registros.valores_excecao[posicao]
+        if valor is None:
+            if ignorar_none:
+                continue
+            raise TypeError("valor None na soma de registros")
+        fora_do_padrao.append(valor)
+    return _total_grupo((centavos, quantidade, fora_do_padrao), 0)
+
+
+def motor_agregacao() -> str:
+    """Implementação em uso: 'numpy' ou 'python' (quando o NumPy não está instalado)"""
+    return "numpy" if np is not None else "python"
+
+
+@dataclass
+class TotalPeriodo:
+    """Totais somados de um período (intervalo de datas, semana ou mês)"""
+    periodo: str
+    inicio: str
+    fim: str
+    dias_com_movimento: int
+    demonstrativos: Decimal
+    funarpen: Decimal
+    issqn: Decimal
+    valor_liquido: Decimal
+
+
+def _data(valor: Union[str, date]) -> date:
+    """Aceita date ou texto DD/MM/AAAA"""
+    if isinstance(valor, date):
+        return valor
+    ordinal = data_para_ordinal(valor)
+    if ordinal is None:
+        raise ValueError(f"Data inválida: '{valor}' (use DD/MM/AAAA)")
+    return date.fromordinal(ordinal)
+
+
+class IndiceDatas:
+    """
+    Totais diários indexados pelo ordinal do dia, em ordem cronológica, com somas acumuladas
+    para consultar qualquer intervalo por busca binária, sem percorrer os registros de novo.
+    Registros sem data ou com data inválida ficam à parte, em `outros`, e não entram nas consultas.
+    """
+
+    def __init__(self, demonstrativos: Sequence, funarpen: Sequence, issqn: Sequence):
+        por_tipo = (
+            somar_por_chave(demonstrativos),
+            somar_por_chave(funarpen),
+            somar_por_chave(issqn, ignorar_nulos=True),
+        )
+        chaves = set().union(*por_tipo)
+        zero = Decimal('0')
+
+        def totais(chave: Chave) -> Tuple[Decimal, Decimal, Decimal]:
+            return tuple(somas.get(chave, zero) for somas in por_tipo)  # type: ignore[return-value]
+
+        self.ordinais: List[int] = sorted(c for c in chaves if isinstance(c, int))
+        self.totais: List[Tuple[Decimal, Decimal, Decimal]] = [totais(o) for o in self.ordinais]
+        self.outros: List[Tuple[str, Tuple[Decimal, Decimal, Decimal]]] = [
+            (c, totais(c)) for c in sorted(c for c in chaves if isinstance(c, str))
+        ]
+        # acumulados[i] = soma dos totais dos i primeiros dias
+        self._acumulados: List[Tuple[Decimal, Decimal, Decimal]] = [(zero, zero, zero)]
+        for d, f, i in self.totais:
+            ad, af, ai = self._acumulados[-1]
+            self._acumulados.append((ad + d, af + f, ai + i))
+
+    def __len__(self) -> int:
+        return len(self.ordinais) + len(self.outros)
+
+    def dias(self) -> Iterator[Tuple[str, Decimal, Decimal, Decimal]]:
+        """(data, demonstrativos, funarpen, issqn) por dia, em ordem cronológica, e depois os outros"""
+        for ordinal, (d, f, i) in zip(self.ordinais, self.totais):
+            yield ordinal_para_data(ordinal), d, f, i
+        for rotulo, (d, f, i) in self.outros:
+            yield rotulo, d, f, i
+
+    def intervalo(self) -> Optional[Tuple[str, str]]:
+        """Primeira e última data com movimento, ou None se não houver datas válidas"""
+        if not self.ordinais:
+            return None
+        return ordinal_para_data(self.ordinais[0]), ordinal_para_data(self.ordinais[-1])
+
+    def _somar_indices(self, periodo: str, inicio: date, fim: date, de: int, ate: int) -> TotalPeriodo:
+        d = self._acumulados[ate][0] - self._acumulados[de][0]
+        f = self._acumulados[ate][1] - self._acumulados[de][1]
+        i = self._acumulados[ate][2] - self._acumulados[de][2]
+        return TotalPeriodo(periodo, ordinal_para_data(inicio.toordinal()), ordinal_para_data(fim.toordinal()),
+                            ate - de, d, f, i, d - f - i)
+
+    def totais_entre(self, inicio: Union[str, date], fim: Union[str, date]) -> TotalPeriodo:
+        """Totais dos dias de `inicio` a `fim`, inclusive"""
+        inicio, fim = _data(inicio), _data(fim)
+        if fim < inicio:
+            raise ValueError("A data final é anterior à inicial")
+        de = bisect_left(self.ordinais, inicio.toordinal())
+        ate = bisect_right(self.ordinais, fim.toordinal())
+        rotulo = f"{ordinal_para_data(inicio.toordinal())} - {ordinal_para_data(fim.toordinal())}"
+        return self._somar_indices(rotulo, inicio, fim, de, ate)
+
+    def _agrupar(self, limites: Callable[[date], Tuple[str, date, date]]) -> List[TotalPeriodo]:
+        """Um TotalPeriodo por período com movimento; limites(dia) dá (rótulo, início, fim) do período"""
+        periodos: List[TotalPeriodo] = []
+        posicao = 0
+        while posicao < len(self.ordinais):
+            rotulo, inicio, fim = limites(date.fromordinal(self.ordinais[posicao]))
+            ate = bisect_right(self.ordinais, fim.toordinal(), lo=posicao)
+            periodos.append(self._somar_indices(rotulo, inicio, fim, posicao, ate))
+            posicao = ate
+        return periodos
+
+    def totais_por_semana(self) -> List[TotalPeriodo]:
+        """Totais por semana ISO (segunda a domingo), em ordem cronológica"""
+        def semana(dia: date) -> Tuple[str, date, date]:
+            ano, numero, _ = dia.isocalendar()
+            inicio = dia - timedelta(days=dia.weekday())
+            return f"Semana {numero:02d}/{ano}", inicio, inicio + timedelta(days=6)
+        return self._agrupar(semana)
+
+    def totais_por_mes(self) -> List[TotalPeriodo]:
+        """Totais por mês, em ordem cronológica"""
+        def mes(dia: date) -> Tuple[str, date, date]:
+            inicio = dia.replace(day=1)
+            proximo = (inicio + timedelta(days=32)).replace(day=1)
+            return f"{dia.month:02d}/{dia.year}", inicio, proximo - timedelta(days=1)
+        return self._agrupar(mes)
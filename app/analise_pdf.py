@@ -1,21 +1,50 @@
 # analise_pdf.py
 # Módulo responsável pela análise e processamento de PDFs financeiros.
 # Realiza extração de valores, cálculos e geração de relatórios estruturados.
+import os
 import re
 import sys
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional, Union
-from dataclasses import dataclass
+from typing import Callable, Iterator, List, Dict, NamedTuple, Sequence, TextIO, Tuple, Optional, Union
+from dataclasses import dataclass, field
 from decimal import Decimal, InvalidOperation
-from collections import defaultdict
+from collections import Counter, deque
+from contextlib import ExitStack, nullcontext
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as TempoEsgotado
 from datetime import datetime
-import csv
+import argparse
+import io
+import logging
+import threading
+import time
+from itertools import islice
 
-try:
-    import PyPDF2  # type: ignore
-except ImportError:
-    print("Erro: PyPDF2 não está instalado. Execute: pip install PyPDF2")
-    sys.exit(1)
+# Permite executar o módulo diretamente (python app/analise_pdf.py) além de python -m app.analise_pdf
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.checkpoint import (
+    LIMITE_CHECKPOINTS_MB, PASTA_CHECKPOINTS_PADRAO, ArmazemCheckpoints, CheckpointDocumento, desserializar_registro,
+    hash_pagina,
+)
+from app.agregacao import IndiceDatas, somar
+from app.cache_extracao import CAMINHO_CACHE_PADRAO, LIMITE_PADRAO_MB, CacheExtracao
+from app.extracao import MOTORES, MOTOR_PADRAO, criar_extrator, normalizar_motores
+from app.memoria import MedicaoMemoria, MedidorMemoria, pico_rss_processo, pss_atual
+from app.log import FORMATOS, FORMATO_TEXTO, configurar_log, nivel_por_verbosidade
+from app.perfil import (
+    ETAPA_ABERTURA, ETAPA_AGREGACAO, ETAPA_CHECKPOINT, ETAPA_DETECCAO, ETAPA_PREFILTRO, ETAPA_RELATORIO, ETAPA_VARREDURA,
+    PAGINAS_LENTAS_PADRAO, PerfilAnalise, perfil_cprofile,
+)
+from app.mapeamento import compartilhar, mapeamento_herdado, mapear
+from app.sessao import SessaoDocumento
+from app.perfis import PAGINAS_DETECCAO, PERFIL_EMBUTIDO, PerfilLayout, registro_padrao
+from app.prefiltro import criar_prefiltro
+from app.registros import ArmazemRegistros
+from app.relatorio import EscritorRelatorio
+
+# Nome fixo: executado com python -m, o módulo se chama __main__
+logger = logging.getLogger("app.analise_pdf")
 
 @dataclass
 class ValorDemonstrativo:
@@ -38,6 +67,63 @@ class ValorIssqn:
     valor: Optional[Decimal]
     data_pagamento: str
 
+# Tipos de registro entregues por AnalisadorPDF.iterar_registros
+TIPO_DEMONSTRATIVO = "demonstrativo"
+TIPO_FUNARPEN = "funarpen"
+TIPO_ISSQN = "issqn"
+
+class RegistroExtraido(NamedTuple):
+    tipo: str
+    registro: Union[ValorDemonstrativo, ValorFunarpen, ValorIssqn]
+
+class ProgressoAnalise(NamedTuple):
+    """Andamento informado a cada página (a cada bloco, no modo paralelo)"""
+    paginas_concluidas: int
+    total_paginas: int
+    registros: int
+
+class AnaliseCancelada(Exception):
+    """A análise foi interrompida pelo TokenCancelamento"""
+
+class TokenCancelamento:
+    """Pedido de cancelamento de uma análise, consultado por ela entre uma página e outra"""
+    
+    def __init__(self):
+        self._evento = threading.Event()
+    
+    def cancelar(self):
+        self._evento.set()
+    
+    @property
+    def cancelado(self) -> bool:
+        return self._evento.is_set()
+    
+    def verificar(self):
+        if self._evento.is_set():
+            raise AnaliseCancelada()
+
+@dataclass
+class ResultadoBloco:
+    """Registros extraídos por um processo worker para um bloco contíguo de páginas"""
+    # Enviados já em colunas (ArmazemRegistros), o que também reduz o volume entre processos
+    valores_demonstrativos: Sequence[ValorDemonstrativo]
+    valores_funarpen: Sequence[ValorFunarpen]
+    valores_issqn: Sequence[ValorIssqn]
+    paginas_processadas: int
+    paginas_com_fallback: List[int]
+    acertos_cache: int = 0
+    falhas_cache: int = 0
+    paginas_ignoradas_prefiltro: int = 0
+    falsos_negativos_prefiltro: int = 0
+    paginas_com_campo: List[int] = field(default_factory=list)
+    perfil: Optional[PerfilAnalise] = None
+    pico_rss: Optional[int] = None
+    # PSS do worker ao fim do bloco e o processo que o mediu, para somar um valor por worker
+    pss: Optional[int] = None
+    pid: Optional[int] = None
+    # Índice (exclusivo) da última página do bloco, para o progresso
+    fim: int = 0
+
 @dataclass
 class TotalDiario:
     data: str
@@ -46,319 +132,854 @@ class TotalDiario:
     issqn: Decimal
     valor_liquido: Decimal
 
+# Abaixo deste número de páginas o custo de iniciar o pool supera o ganho do paralelismo
+MIN_PAGINAS_PARALELO = 64
+
+# Intervalo (s) em que o modo paralelo, esperando um bloco, consulta o pedido de cancelamento
+INTERVALO_CANCELAMENTO = 0.1
+
+# Campo que identifica as páginas do demonstrativo bancário no layout padrão
+# (outros layouts vêm dos perfis em perfis/, ver app/perfis.py)
+CAMPO_BANCARIO_ESPERADO = PERFIL_EMBUTIDO.campo_bancario
+
+# Padrões pré-compilados usados na varredura das páginas
+PADRAO_DATA_PAGAMENTO = re.compile(r'Dt\.\s*Pgto:\s*(\d{2}/\d{2}/\d{4})')
+# Mesma data, procurada no texto inteiro da página sem atravessar quebras de linha:
+# o primeiro casamento é o mesmo da busca linha a linha
+PADRAO_DATA_PAGAMENTO_PAGINA = re.compile(r'Dt\.[^\S\n]*Pgto:[^\S\n]*(\d{2}/\d{2}/\d{4})')
+PADRAO_VALOR_MONETARIO = re.compile(r'R\$\s*([0-9.,]+)')
+
+GATILHO_DEMONSTRATIVO = PERFIL_EMBUTIDO.gatilho_demonstrativo
+GATILHO_FUNARPEN = PERFIL_EMBUTIDO.gatilho_funarpen
+GATILHO_ISSQN = PERFIL_EMBUTIDO.gatilho_issqn
+
+def converter_valor_monetario(texto: str) -> Optional[Decimal]:
+    """Extrai valor monetário no formato brasileiro (R$ 1.234,56)"""
+    match = PADRAO_VALOR_MONETARIO.search(texto)
+    if match:
+        valor_str = match.group(1).replace('.', '').replace(',', '.')
+        try:
+            return Decimal(valor_str)
+        except InvalidOperation:
+            return None
+    return None
+
+class VarredorPagina:
+    """
+    Varredura única de uma página: cada linha é classificada uma só vez e a data de
+    pagamento da página é procurada uma só vez. Produz os mesmos registros que as três
+    passagens originais (uma por tipo de valor, mantidas como referência em
+    benchmarks/bench_varredura.py), incluindo a busca do valor FUNARPEN nas linhas vizinhas.
+    """
+    
+    def __init__(self, gatilho_demonstrativo: str = GATILHO_DEMONSTRATIVO,
+                 gatilho_funarpen: str = GATILHO_FUNARPEN, gatilho_issqn: str = GATILHO_ISSQN):
+        self.gatilho_demonstrativo = gatilho_demonstrativo
+        self.gatilho_funarpen = gatilho_funarpen
+        self.gatilho_issqn = gatilho_issqn
+    
+    @classmethod
+    def do_perfil(cls, perfil: PerfilLayout) -> "VarredorPagina":
+        return cls(perfil.gatilho_demonstrativo, perfil.gatilho_funarpen, perfil.gatilho_issqn)
+    
+    def varrer(self, texto: str, num_pagina: int
+               ) -> Tuple[List[ValorDemonstrativo], List[ValorFunarpen], List[ValorIssqn]]:
+        linhas = texto.split('\n')
+        demonstrativos: List[ValorDemonstrativo] = []
+        funarpen: List[ValorFunarpen] = []
+        issqn: List[ValorIssqn] = []
+        
+        gatilho_demonstrativo = self.gatilho_demonstrativo
+        gatilho_funarpen = self.gatilho_funarpen
+        gatilho_issqn = self.gatilho_issqn
+        data_pagina: Optional[str] = None
+        ultima = len(linhas) - 1
+        # Valor já convertido por índice de linha: as linhas vizinhas de um FUNARPEN
+        # costumam ser elas mesmas linhas de gatilho
+        valores: Dict[int, Optional[Decimal]] = {}
+        
+        def valor_da_linha(i: int) -> Optional[Decimal]:
+            if i not in valores:
+                valores[i] = converter_valor_monetario(linhas[i])
+            return valores[i]
+        
+        for i, linha in enumerate(linhas):
+            eh_demonstrativo = gatilho_demonstrativo in linha
+            eh_funarpen = gatilho_funarpen in linha
+            eh_issqn = gatilho_issqn in linha
+            if not (eh_demonstrativo or eh_funarpen or eh_issqn):
+                continue
+            
+            valor = valor_da_linha(i)
+            linha_limpa = linha.strip()
+            if eh_demonstrativo and valor:
+                match = PADRAO_DATA_PAGAMENTO.search(linha)
+                demonstrativos.append(
+                    ValorDemonstrativo(num_pagina, linha_limpa, valor, match.group(1) if match else "")
+                )
+            if not (eh_funarpen or eh_issqn):
+                continue
+            
+            if data_pagina is None:
+                match = PADRAO_DATA_PAGAMENTO_PAGINA.search(texto)
+                data_pagina = match.group(1) if match else ""
+            
+            if eh_funarpen:
+                if valor:
+                    funarpen.append(ValorFunarpen(num_pagina, linha_limpa, valor, data_pagina))
+                else:
+                    # Sem valor na própria linha: verifica a linha anterior e a posterior
+                    if i > 0:
+                        valor_anterior = valor_da_linha(i - 1)
+                        if valor_anterior:
+                            funarpen.append(ValorFunarpen(
+                                num_pagina, f"{linhas[i-1].strip()} | {linha_limpa}", valor_anterior, data_pagina
+                            ))
+                    if i < ultima:
+                        valor_posterior = valor_da_linha(i + 1)
+                        if valor_posterior:
+                            funarpen.append(ValorFunarpen(
+                                num_pagina, f"{linha_limpa} | {linhas[i+1].strip()}", valor_posterior, data_pagina
+                            ))
+            if eh_issqn:
+                issqn.append(ValorIssqn(num_pagina, linha_limpa, valor, data_pagina))
+        
+        return demonstrativos, funarpen, issqn
+
 class AnalisadorPDF:
-    def __init__(self, caminho_pdf: str):
+    def __init__(self, caminho_pdf: str, motor: Union[str, List[str], None] = None, workers: int = 1,
+                 cache: Union[bool, str, CacheExtracao, None] = None, limite_cache_mb: float = LIMITE_PADRAO_MB,
+                 prefiltro: bool = False, verificar_prefiltro: bool = False,
+                 checkpoint: Union[bool, str, None] = None, limite_checkpoints_mb: float = LIMITE_CHECKPOINTS_MB,
+                 perfilar: bool = False,
+                 paginas_lentas: int = PAGINAS_LENTAS_PADRAO, medir_memoria: bool = False,
+                 rastrear_alocacoes: bool = False, perfil_layout: Union[str, PerfilLayout, None] = None,
+                 mapear_arquivo: bool = True, sessao: Optional[SessaoDocumento] = None,
+                 progresso: Optional[Callable[[ProgressoAnalise], None]] = None,
+                 cancelamento: Optional[TokenCancelamento] = None):
+        """
+        motor: nome do motor de extração ('pypdf2' ou 'fitz') ou uma cadeia de fallback,
+        como 'fitz,pypdf2' ou ['fitz', 'pypdf2']. Padrão: 'pypdf2'.
+        workers: número de processos para a extração em paralelo (1 = modo serial).
+        cache: cache de texto por página; True usa results/.cache/paginas.sqlite, uma string
+        indica outro arquivo, e uma instância de CacheExtracao é usada diretamente.
+        limite_cache_mb: tamanho máximo do cache aberto pelo analisador.
+        prefiltro: descarta pelo texto do PyMuPDF as páginas sem o campo bancário antes da
+        extração completa (só tem efeito quando o motor principal não é o fitz). Desligado por
+        padrão: o texto do PyMuPDF pode diferir do PyPDF2 (CMaps, ligaduras) e uma página
+        descartada por engano some dos totais.
+        verificar_prefiltro: liga o pré-filtro, mas extrai também as páginas descartadas e conta em
+        falsos_negativos_prefiltro as que tinham o campo (elas são processadas normalmente).
+        checkpoint: guarda hashes e registros por página ao final da análise; numa nova versão
+        do documento com as mesmas páginas iniciais, só as páginas seguintes são processadas.
+        True usa results/.checkpoints, uma string indica outra pasta.
+        limite_checkpoints_mb: tamanho máximo da pasta de checkpoints (os menos usados saem).
+        perfilar: mede o tempo de cada etapa e guarda as paginas_lentas páginas de extração mais
+        lenta em self.perfil (PerfilAnalise); sem ele, self.perfil é None.
+        medir_memoria: acompanha o RSS do processo (e dos workers) durante a análise e guarda
+        os picos em self.memoria (MedicaoMemoria); rastrear_alocacoes mede também o pico de
+        alocações Python pelo tracemalloc, que deixa a análise bem mais lenta.
+        perfil_layout: campo bancário e gatilhos do layout do documento; o nome de um perfil de
+        perfis/ ou um PerfilLayout. Sem ele, o perfil é detectado pelas primeiras páginas
+        (com um único perfil registrado, ele é usado direto).
+        mapear_arquivo: abre o PDF com mmap e usa o mesmo mapeamento no extrator, no pré-filtro
+        e nos processos worker; com False, cada um lê o arquivo pelo caminho.
+        sessao: SessaoDocumento (app/sessao.py) já aberta para o arquivo; a análise usa o
+        mapeamento dela em vez de mapear o arquivo de novo, e não o fecha ao terminar.
+        progresso: chamado com um ProgressoAnalise a cada página (a cada bloco, no modo
+        paralelo), na thread da análise.
+        cancelamento: TokenCancelamento consultado entre as páginas; acionado, analisar_pdf
+        para, retorna False e marca self.cancelada (iterar_registros levanta AnaliseCancelada).
+        """
         self.caminho_pdf = caminho_pdf
-        self.valores_demonstrativos: List[ValorDemonstrativo] = []
-        self.valores_funarpen: List[ValorFunarpen] = []
-        self.valores_issqn: List[ValorIssqn] = []
-        self.campo_bancario_esperado = "Ag./Cod. Cedente: 3162/730791-8"
+        self.motores = normalizar_motores(motor)
+        self.workers = max(1, int(workers))
+        self._config_cache = cache
+        self.limite_cache_mb = limite_cache_mb
+        self.cache: Optional[CacheExtracao] = cache if isinstance(cache, CacheExtracao) else None
+        self.acertos_cache = 0
+        self.falhas_cache = 0
+        self.usar_prefiltro = prefiltro or verificar_prefiltro
+        self.verificar_prefiltro = verificar_prefiltro
+        self.paginas_ignoradas_prefiltro = 0
+        self.falsos_negativos_prefiltro = 0
+        self.mapear_arquivo = mapear_arquivo
+        self.sessao = sessao
+        self._mapeamento = None
+        self.progresso = progresso
+        self.cancelamento = cancelamento
+        self.cancelada = False
+        if checkpoint in (None, False):
+            self.checkpoints: Optional[ArmazemCheckpoints] = None
+        else:
+            self.checkpoints = ArmazemCheckpoints(checkpoint if isinstance(checkpoint, str) else PASTA_CHECKPOINTS_PADRAO,
+                                                  limite_checkpoints_mb)
+        # Hash do conteúdo de cada página (índice -> hash), calculado uma vez pelo checkpoint e
+        # reaproveitado na chave do cache de extração
+        self._hashes_paginas: Dict[int, str] = {}
+        self.paginas_reaproveitadas = 0
+        self.paginas_com_fallback: List[int] = []
+        self.total_paginas = 0
+        self.paginas_processadas = 0
+        self.perfil: Optional[PerfilAnalise] = PerfilAnalise(paginas_lentas) if perfilar else None
+        self._medidor_memoria = (MedidorMemoria(rastrear_alocacoes)
+                                 if medir_memoria or rastrear_alocacoes else None)
+        self.memoria: Optional[MedicaoMemoria] = None
+        # Mensagem do erro que interrompeu a última análise, se houve
+        self.erro: Optional[str] = None
+        # Registros guardados em colunas; ler um item devolve o dataclass correspondente
+        self.valores_demonstrativos = ArmazemRegistros(ValorDemonstrativo)
+        self.valores_funarpen = ArmazemRegistros(ValorFunarpen)
+        self.valores_issqn = ArmazemRegistros(ValorIssqn)
+        if isinstance(perfil_layout, PerfilLayout):
+            perfil_inicial = perfil_layout
+        elif perfil_layout is not None:
+            perfil_inicial = registro_padrao().obter(perfil_layout)
+        else:
+            perfil_inicial = registro_padrao().padrao
+        # Detecção a cada análise só quando há mais de um perfil para escolher
+        self._detectar_perfil = perfil_layout is None and len(registro_padrao()) > 1
+        self.perfil_detectado = False
+        self._aplicar_perfil(perfil_inicial)
+        # Agregações calculadas uma vez por estado dos registros; a contagem registra
+        # quantas vezes cada uma foi de fato calculada
+        self._agregacoes: Dict[str, Tuple[tuple, object]] = {}
+        self.contagem_agregacoes: Counter = Counter()
         
+    def _aplicar_perfil(self, perfil: PerfilLayout):
+        self.perfil_layout = perfil
+        self.campo_bancario_esperado = perfil.campo_bancario
+        self.varredor = VarredorPagina.do_perfil(perfil)
+    
+    def _detectar_perfil_layout(self, extrator):
+        """Escolhe o perfil pelo campo bancário das primeiras páginas; sem nenhum, fica o padrão"""
+        if not self._detectar_perfil:
+            return
+        registro = registro_padrao()
+        with self._medir(ETAPA_DETECCAO):
+            textos = (self._obter_texto(extrator, indice) for indice in range(min(PAGINAS_DETECCAO, self.total_paginas)))
+            perfil, examinadas = registro.detectar(textos)
+        documento = {"documento": self.caminho_pdf}
+        if perfil is None:
+            self.perfil_detectado = False
+            self._aplicar_perfil(registro.padrao)
+            logger.info("Nenhum perfil de layout reconhecido nas primeiras %d páginas; usando '%s'",
+                        examinadas, registro.padrao.nome, extra=documento)
+        else:
+            self.perfil_detectado = True
+            self._aplicar_perfil(perfil)
+            logger.info("Perfil de layout detectado: %s (página %d)", perfil.nome, examinadas, extra=documento)
+    
     def extrair_data_pagamento(self, texto: str) -> str:
         """Extrai data de pagamento no formato DD/MM/YYYY"""
-        padrao = r'Dt\.\s*Pgto:\s*(\d{2}/\d{2}/\d{4})'
-        match = re.search(padrao, texto)
+        match = PADRAO_DATA_PAGAMENTO.search(texto)
         if match:
             return match.group(1)
         return ""
     
     def extrair_valor_monetario(self, texto: str) -> Optional[Decimal]:
         """Extrai valor monetário no formato brasileiro (R$ 1.234,56)"""
-        padrao = r'R\$\s*([0-9.,]+)'
-        match = re.search(padrao, texto)
-        if match:
-            valor_str = match.group(1).replace('.', '').replace(',', '.')
-            try:
-                return Decimal(valor_str)
-            except InvalidOperation:
-                return None
-        return None
+        return converter_valor_monetario(texto)
     
     def pagina_contem_campo_bancario(self, texto: str) -> bool:
         """Verifica se a página contém o campo bancário específico"""
         return self.campo_bancario_esperado in texto
     
-    def processar_valor_demonstrativo(self, linhas: List[str], num_pagina: int):
-        """Processa valores demonstrativos na página"""
-        for i, linha in enumerate(linhas):
-            if "Valor Demonstrativo:" in linha:
-                valor = self.extrair_valor_monetario(linha)
-                data_pagamento = self.extrair_data_pagamento(linha)
-                if valor:
-                    self.valores_demonstrativos.append(
-                        ValorDemonstrativo(num_pagina, linha.strip(), valor, data_pagamento)
-                    )
+    def _varrer_pagina(self, texto: str, num_pagina: int
+                       ) -> Optional[Tuple[List[ValorDemonstrativo], List[ValorFunarpen], List[ValorIssqn]]]:
+        """Varre uma página sem acumular os registros; None se ela não tiver o campo bancário"""
+        if self.perfil is not None:
+            with self.perfil.medir(ETAPA_VARREDURA):
+                return self._varrer_texto(texto, num_pagina)
+        return self._varrer_texto(texto, num_pagina)
     
-    def processar_funarpen(self, linhas: List[str], num_pagina: int):
-        """Processa valores FUNARPEN na página"""
-        # Primeiro, encontra a data de pagamento na página
-        data_pagamento = ""
-        for linha in linhas:
-            data_temp = self.extrair_data_pagamento(linha)
-            if data_temp:
-                data_pagamento = data_temp
-                break
-        
-        for i, linha in enumerate(linhas):
-            if "FUNARPEN" in linha:
-                # Verifica a linha atual
-                valor = self.extrair_valor_monetario(linha)
-                if valor:
-                    self.valores_funarpen.append(
-                        ValorFunarpen(num_pagina, linha.strip(), valor, data_pagamento)
-                    )
-                else:
-                    # Verifica linha anterior
-                    if i > 0:
-                        valor_anterior = self.extrair_valor_monetario(linhas[i-1])
-                        if valor_anterior:
-                            self.valores_funarpen.append(
-                                ValorFunarpen(num_pagina, f"{linhas[i-1].strip()} | {linha.strip()}", valor_anterior, data_pagamento)
-                            )
-                    
-                    # Verifica linha posterior
-                    if i < len(linhas) - 1:
-                        valor_posterior = self.extrair_valor_monetario(linhas[i+1])
-                        if valor_posterior:
-                            self.valores_funarpen.append(
-                                ValorFunarpen(num_pagina, f"{linha.strip()} | {linhas[i+1].strip()}", valor_posterior, data_pagamento)
-                            )
-    
-    def processar_issqn(self, linhas: List[str], num_pagina: int):
-        """Processa valores ISSQN na página"""
-        # Primeiro, encontra a data de pagamento na página
-        data_pagamento = ""
-        for linha in linhas:
-            data_temp = self.extrair_data_pagamento(linha)
-            if data_temp:
-                data_pagamento = data_temp
-                break
+    def _varrer_texto(self, texto: str, num_pagina: int):
+        # Verifica se contém o campo bancário específico
+        if not self.pagina_contem_campo_bancario(texto):
+            return None
         
-        for linha in linhas:
-            if "ISSQN - Imposto sobre Serviços de Qualquer Natureza" in linha:
-                valor = self.extrair_valor_monetario(linha)
-                self.valores_issqn.append(
-                    ValorIssqn(num_pagina, linha.strip(), valor, data_pagamento)
-                )
+        # Varre as linhas uma única vez, extraindo os três tipos de valor
+        return self.varredor.varrer(texto, num_pagina)
     
     def processar_pagina(self, texto: str, num_pagina: int):
         """Processa uma página completa"""
-        print(f"Processando página {num_pagina}...")
-        
-        # Verifica se contém o campo bancário específico
-        if not self.pagina_contem_campo_bancario(texto):
-            print(f"  Página {num_pagina}: Campo bancário não encontrado - ignorando")
+        resultado = self._varrer_pagina(texto, num_pagina)
+        if resultado is None:
             return False
         
-        print(f"  Página {num_pagina}: Campo bancário encontrado - processando")
-        
-        # Divide em linhas para processamento
-        linhas = texto.split('\n')
+        demonstrativos, funarpen, issqn = resultado
+        self.valores_demonstrativos.extend(demonstrativos)
+        self.valores_funarpen.extend(funarpen)
+        self.valores_issqn.extend(issqn)
         
-        # Processa cada tipo de valor
-        self.processar_valor_demonstrativo(linhas, num_pagina)
-        self.processar_funarpen(linhas, num_pagina)
-        self.processar_issqn(linhas, num_pagina)
+        return True
+    
+    def _extrair_texto(self, extrator, indice: int) -> str:
+        """Extrai o texto da página, consultando antes o cache de extração se houver um"""
+        if self.perfil is None:
+            return self._obter_texto(extrator, indice)
+        inicio = time.perf_counter()
+        texto = self._obter_texto(extrator, indice)
+        self.perfil.registrar_pagina(indice + 1, time.perf_counter() - inicio)
+        return texto
+    
+    def _obter_texto(self, extrator, indice: int) -> str:
+        if self.cache is None:
+            return extrator.extrair_texto(indice)
+        chave = self.cache.chave(self._hash_pagina(extrator, indice), extrator.nome, extrator.versao)
+        texto = self.cache.obter(chave)
+        if texto is not None:
+            self.acertos_cache += 1
+            return texto
+        self.falhas_cache += 1
+        texto = extrator.extrair_texto(indice)
+        self.cache.gravar(chave, texto)
+        return texto
+    
+    def _hash_pagina(self, extrator, indice: int) -> str:
+        hash_conteudo = self._hashes_paginas.get(indice)
+        if hash_conteudo is None:
+            hash_conteudo = hash_pagina(extrator.conteudo_pagina(indice))
+        return hash_conteudo
+    
+    def _medir(self, etapa: str):
+        """Contexto que mede a etapa no perfil, se a análise estiver sendo perfilada"""
+        return self.perfil.medir(etapa) if self.perfil is not None else nullcontext()
+    
+    def _criar_prefiltro(self, motor_principal: str):
+        if not self.usar_prefiltro:
+            return None
+        with self._medir(ETAPA_PREFILTRO):
+            # Na interface, o documento do PyMuPDF já interpretado pela sessão é reaproveitado
+            return criar_prefiltro(self.caminho_pdf, self.campo_bancario_esperado, motor_principal, self._mapeamento,
+                                   self.sessao)
+    
+    def _varrer_pagina_filtrada(self, extrator, prefiltro, indice: int):
+        """
+        Passa a página pelo pré-filtro (se houver) e, sendo candidata, extrai e varre o texto.
+        Retorna os registros da página, ou None se ela foi descartada ou não tem o campo bancário.
+        """
+        # O evento por página (e a medição do tempo dele) só existe com o nível DEBUG ativo
+        if not logger.isEnabledFor(logging.DEBUG):
+            return self._analisar_pagina(extrator, prefiltro, indice)[0]
+        inicio = time.perf_counter()
+        resultado, situacao = self._analisar_pagina(extrator, prefiltro, indice)
+        duracao_ms = round((time.perf_counter() - inicio) * 1000, 2)
+        logger.debug("Página %d: %s", indice + 1, situacao,
+                     extra={"documento": self.caminho_pdf, "pagina": indice + 1, "duracao_ms": duracao_ms})
+        return resultado
+    
+    def _analisar_pagina(self, extrator, prefiltro, indice: int) -> Tuple[Optional[tuple], str]:
+        """Registros da página (ou None) e a situação dela, para o evento de log"""
+        num_pagina = indice + 1
+        if prefiltro is not None and not self._pode_conter(prefiltro, indice):
+            self.paginas_ignoradas_prefiltro += 1
+            if not self.verificar_prefiltro:
+                return None, "campo bancário não encontrado pelo pré-filtro - ignorando"
+            texto = self._extrair_texto(extrator, indice)
+            if self.pagina_contem_campo_bancario(texto):
+                self.falsos_negativos_prefiltro += 1
+        else:
+            texto = self._extrair_texto(extrator, indice)
+        resultado = self._varrer_pagina(texto, num_pagina)
+        if resultado is None:
+            return None, "campo bancário não encontrado - ignorando"
+        return resultado, "campo bancário encontrado - processando"
+    
+    def _pode_conter(self, prefiltro, indice: int) -> bool:
+        if self.perfil is None:
+            return prefiltro.pode_conter(indice)
+        with self.perfil.medir(ETAPA_PREFILTRO):
+            return prefiltro.pode_conter(indice)
+    
+    def _processar_intervalo(self, extrator, inicio: int, fim: int, prefiltro=None) -> List[int]:
+        """
+        Extrai e processa as páginas de índice [inicio, fim) com um extrator (e pré-filtro) já aberto.
+        Retorna os números das páginas que tinham o campo bancário.
+        """
+        paginas_com_campo = []
+        for indice in range(inicio, fim):
+            resultado = self._varrer_pagina_filtrada(extrator, prefiltro, indice)
+            if resultado is None:
+                continue
+            demonstrativos, funarpen, issqn = resultado
+            self.valores_demonstrativos.extend(demonstrativos)
+            self.valores_funarpen.extend(funarpen)
+            self.valores_issqn.extend(issqn)
+            paginas_com_campo.append(indice + 1)
+        return paginas_com_campo
+    
+    def _iterar_em_paralelo(self, total_paginas: int, primeira: int = 0) -> Iterator[ResultadoBloco]:
+        """
+        Distribui blocos das páginas de índice [primeira, total_paginas) entre processos e entrega
+        os resultados na ordem das páginas.
+        Só há alguns blocos em andamento por vez, para a memória não crescer com o documento.
+        Enquanto espera um bloco, consulta o TokenCancelamento; cancelada, a análise não espera
+        os blocos em andamento terminarem.
+        """
+        quantidade = total_paginas - primeira
+        workers = min(self.workers, quantidade)
+        # Blocos menores que total/workers equilibram a carga quando algumas páginas são mais pesadas
+        tamanho_bloco = max(1, -(-quantidade // (workers * 4)))
+        blocos = iter([(inicio, min(inicio + tamanho_bloco, total_paginas))
+                       for inicio in range(primeira, total_paginas, tamanho_bloco)])
         
+        config_cache = (self.cache.caminho, self.cache.limite_bytes) if self.cache else None
+        config_prefiltro = (self.usar_prefiltro, self.verificar_prefiltro)
+        # Páginas lentas por worker: o bastante para o ranking final sair certo
+        paginas_lentas = self.perfil.paginas_lentas if self.perfil is not None else None
+        medir_memoria = self._medidor_memoria is not None
+        mapear_arquivo = self._mapeamento is not None
+        cancelamento = self.cancelamento
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker,
+                                       initargs=(self.caminho_pdf, self.motores, config_cache, config_prefiltro,
+                                                 self.perfil_layout, mapear_arquivo))
+        # Os workers criados por fork herdam o mapeamento deste processo em vez de reabrir o arquivo
+        with compartilhar(self._mapeamento):
+            try:
+                def submeter(quantidade: int):
+                    for inicio, fim in islice(blocos, quantidade):
+                        pendentes.append(executor.submit(
+                            _analisar_bloco, self.caminho_pdf, self.motores, config_cache, config_prefiltro,
+                            inicio, fim, paginas_lentas, medir_memoria, self.perfil_layout, mapear_arquivo,
+                            self._hashes_bloco(inicio, fim)
+                        ))
+                
+                pendentes: deque = deque()
+                submeter(workers * 2)
+                # Os resultados são consumidos na ordem de submissão, que é a ordem das páginas
+                while pendentes:
+                    futuro = pendentes.popleft()
+                    while True:
+                        try:
+                            resultado = futuro.result(timeout=INTERVALO_CANCELAMENTO)
+                            break
+                        except TempoEsgotado:
+                            if cancelamento is not None:
+                                cancelamento.verificar()
+                    submeter(1)
+                    yield resultado
+            finally:
+                # Se o consumidor abandonar a iteração, os blocos ainda na fila são descartados
+                executor.shutdown(wait=not (cancelamento is not None and cancelamento.cancelado),
+                                  cancel_futures=True)
+    
+    def _hashes_bloco(self, inicio: int, fim: int) -> Optional[Dict[int, str]]:
+        """Hashes já calculados das páginas do bloco, enviados ao worker só se o cache for usá-los"""
+        if self.cache is None or not self._hashes_paginas:
+            return None
+        return {indice: self._hashes_paginas[indice] for indice in range(inicio, fim) if indice in self._hashes_paginas}
+    
+    def _abrir_cache(self) -> bool:
+        """Abre o cache configurado no construtor; retorna True se ele deve ser fechado ao final"""
+        if self.cache is not None or self._config_cache in (None, False):
+            return False
+        caminho = self._config_cache if isinstance(self._config_cache, str) else CAMINHO_CACHE_PADRAO
+        self.cache = CacheExtracao(caminho, self.limite_cache_mb)
         return True
     
-    def analisar_pdf(self) -> bool:
-        """Analisa o PDF completo, página por página"""
+    def _carregar_checkpoint(self, extrator) -> Tuple[Optional[str], Optional[CheckpointDocumento], int]:
+        """
+        Calcula o hash de cada página e procura o checkpoint do documento.
+        Retorna (identificador, checkpoint novo já com o prefixo reaproveitado, páginas reaproveitadas);
+        o identificador é None quando o checkpoint não pode ser usado nesta análise.
+        """
+        self._hashes_paginas = {}
+        if self.checkpoints is None or self.total_paginas == 0:
+            return None, None, 0
+        with self._medir(ETAPA_CHECKPOINT):
+            return self._comparar_checkpoint(extrator)
+    
+    def _comparar_checkpoint(self, extrator) -> Tuple[Optional[str], Optional[CheckpointDocumento], int]:
         try:
-            with open(self.caminho_pdf, 'rb') as arquivo:
-                leitor = PyPDF2.PdfReader(arquivo)
-                total_paginas = len(leitor.pages)
+            hashes = [hash_pagina(extrator.conteudo_pagina(indice)) for indice in range(self.total_paginas)]
+        except Exception as e:
+            logger.warning("Aviso: checkpoint desativado, conteúdo das páginas indisponível (%s)", e,
+                           extra={"documento": self.caminho_pdf})
+            return None, None, 0
+        motor = f"{extrator.nome}:{extrator.versao}"
+        perfil = f"{self.perfil_layout.nome}:{self.perfil_layout.assinatura()}"
+        identificador = ArmazemCheckpoints.identificador(hashes[0], motor, perfil)
+        anterior = self.checkpoints.carregar(identificador)
+        reaproveitadas = anterior.prefixo_comum(hashes) if anterior is not None else 0
+        if reaproveitadas:
+            novo = anterior.recortar(reaproveitadas)
+        else:
+            novo = CheckpointDocumento(motor=motor, total_paginas=0, hashes=[])
+        novo.total_paginas = self.total_paginas
+        novo.hashes = hashes
+        self._hashes_paginas = dict(enumerate(hashes))
+        return identificador, novo, reaproveitadas
+    
+    def _iterar_resultados(self) -> Iterator[Tuple[Sequence[ValorDemonstrativo], Sequence[ValorFunarpen],
+                                                    Sequence[ValorIssqn]]]:
+        """
+        Percorre o documento e entrega, em ordem, os registros de cada página (modo serial)
+        ou de cada bloco de páginas (modo paralelo), sem acumulá-los no analisador.
+        Com checkpoint, os registros das páginas reaproveitadas vêm primeiro, num único lote.
+        """
+        medidor = self._medidor_memoria
+        if medidor is not None:
+            medidor.iniciar()
+        progresso = self.progresso
+        cancelamento = self.cancelamento
+        registros = 0
+        fechar_cache = self._abrir_cache()
+        sessao = self.sessao
+        if sessao is not None:
+            self._mapeamento = sessao.emprestar_mapeamento()
+        elif self.mapear_arquivo:
+            self._mapeamento = mapear(self.caminho_pdf)
+        try:
+            extrator = criar_extrator(self.caminho_pdf, self.motores, self._mapeamento)
+            with self._medir(ETAPA_ABERTURA):
+                extrator.abrir()
+            with extrator:
+                self.total_paginas = extrator.total_paginas
+                self.paginas_processadas = 0
+                self.paginas_com_fallback = []
                 
-                print(f"PDF carregado: {total_paginas} páginas encontradas")
-                print("=" * 60)
+                documento = {"documento": self.caminho_pdf}
+                logger.info("PDF carregado: %d páginas encontradas (motor: %s)",
+                            self.total_paginas, extrator.motor_principal, extra=documento)
                 
-                paginas_processadas = 0
+                self._detectar_perfil_layout(extrator)
+                identificador, checkpoint, primeira = self._carregar_checkpoint(extrator)
+                self.paginas_reaproveitadas = primeira
+                if primeira:
+                    logger.info("Checkpoint: %d páginas reaproveitadas da análise anterior", primeira, extra=documento)
+                    self.paginas_processadas += len(checkpoint.paginas_com_campo)
+                    registros = len(checkpoint.demonstrativos) + len(checkpoint.funarpen) + len(checkpoint.issqn)
+                    if progresso is not None:
+                        progresso(ProgressoAnalise(primeira, self.total_paginas, registros))
+                    yield (
+                        [desserializar_registro(ValorDemonstrativo, r) for r in checkpoint.demonstrativos],
+                        [desserializar_registro(ValorFunarpen, r) for r in checkpoint.funarpen],
+                        [desserializar_registro(ValorIssqn, r) for r in checkpoint.issqn],
+                    )
                 
-                for num_pagina in range(total_paginas):
-                    pagina = leitor.pages[num_pagina]
-                    texto = pagina.extract_text()
-                    
-                    if self.processar_pagina(texto, num_pagina + 1):
-                        paginas_processadas += 1
+                restantes = self.total_paginas - primeira
+                if self.workers > 1 and restantes >= MIN_PAGINAS_PARALELO:
+                    # Cada processo abre o próprio documento; o extrator local não é mais necessário
+                    extrator.fechar()
+                    if self.perfil is not None:
+                        self.perfil.processos = min(self.workers, restantes)
+                    logger.info("Modo paralelo: %d processos", min(self.workers, restantes), extra=documento)
+                    for resultado in self._iterar_em_paralelo(self.total_paginas, primeira):
+                        # Cancelada, a iteração é abandonada e os blocos ainda na fila são descartados
+                        if cancelamento is not None:
+                            cancelamento.verificar()
+                        self.paginas_processadas += resultado.paginas_processadas
+                        self.paginas_com_fallback.extend(resultado.paginas_com_fallback)
+                        self.acertos_cache += resultado.acertos_cache
+                        self.falhas_cache += resultado.falhas_cache
+                        self.paginas_ignoradas_prefiltro += resultado.paginas_ignoradas_prefiltro
+                        self.falsos_negativos_prefiltro += resultado.falsos_negativos_prefiltro
+                        if self.perfil is not None and resultado.perfil is not None:
+                            self.perfil.mesclar(resultado.perfil)
+                        if medidor is not None:
+                            medidor.amostrar()
+                            medidor.amostrar_pss()
+                            medidor.registrar_worker(resultado.pico_rss, resultado.pss, resultado.pid)
+                        if checkpoint is not None:
+                            checkpoint.acrescentar(resultado.paginas_com_campo, resultado.valores_demonstrativos,
+                                                   resultado.valores_funarpen, resultado.valores_issqn)
+                        if progresso is not None:
+                            registros += (len(resultado.valores_demonstrativos) + len(resultado.valores_funarpen)
+                                          + len(resultado.valores_issqn))
+                            progresso(ProgressoAnalise(resultado.fim, self.total_paginas, registros))
+                        yield resultado.valores_demonstrativos, resultado.valores_funarpen, resultado.valores_issqn
+                else:
+                    prefiltro = self._criar_prefiltro(extrator.motor_principal)
+                    try:
+                        for indice in range(primeira, self.total_paginas):
+                            if cancelamento is not None:
+                                cancelamento.verificar()
+                            # O texto da página só vive até a varredura dela terminar
+                            resultado = self._varrer_pagina_filtrada(extrator, prefiltro, indice)
+                            if medidor is not None:
+                                medidor.amostrar()
+                            if resultado is not None:
+                                self.paginas_processadas += 1
+                                if checkpoint is not None:
+                                    checkpoint.acrescentar([indice + 1], *resultado)
+                                if progresso is not None:
+                                    registros += len(resultado[0]) + len(resultado[1]) + len(resultado[2])
+                            if progresso is not None:
+                                progresso(ProgressoAnalise(indice + 1, self.total_paginas, registros))
+                            if resultado is not None:
+                                yield resultado
+                    finally:
+                        if prefiltro is not None:
+                            prefiltro.fechar()
+                    self.paginas_com_fallback = list(extrator.paginas_com_fallback)
                 
-                print("=" * 60)
-                print(f"Análise concluída: {paginas_processadas} páginas processadas")
-                return True
+                # Só uma análise que chegou ao fim vira checkpoint
+                if checkpoint is not None:
+                    try:
+                        with self._medir(ETAPA_CHECKPOINT):
+                            self.checkpoints.gravar(identificador, checkpoint)
+                    except OSError as e:
+                        logger.warning("Aviso: não foi possível gravar o checkpoint (%s)", e, extra=documento)
                 
-        except FileNotFoundError:
-            print(f"Erro: Arquivo '{self.caminho_pdf}' não encontrado.")
+                if self.paginas_com_fallback:
+                    logger.info("Páginas extraídas pelo motor alternativo: %d", len(self.paginas_com_fallback),
+                                extra=documento)
+                if self.cache is not None:
+                    logger.info("Cache de páginas: %d acertos, %d falhas", self.acertos_cache, self.falhas_cache,
+                                extra=documento)
+                if self.paginas_ignoradas_prefiltro:
+                    logger.info("Pré-filtro: %d páginas descartadas sem extração completa",
+                                self.paginas_ignoradas_prefiltro, extra=documento)
+                if self.falsos_negativos_prefiltro:
+                    logger.warning("AVISO: pré-filtro descartou %d páginas com campo bancário",
+                                   self.falsos_negativos_prefiltro, extra=documento)
+                logger.info("Análise concluída: %d páginas processadas", self.paginas_processadas, extra=documento)
+        finally:
+            if fechar_cache:
+                self.cache.fechar()
+                self.cache = None
+            # Depois do extrator e do pré-filtro, que leem do mapeamento
+            if sessao is not None:
+                sessao.devolver_mapeamento()
+            elif self._mapeamento is not None:
+                self._mapeamento.fechar()
+            self._mapeamento = None
+            if medidor is not None:
+                self.memoria = medidor.finalizar()
+                logger.info("Memória: %s", self.memoria.resumo(), extra={"documento": self.caminho_pdf})
+    
+    def iterar_registros(self) -> Iterator[RegistroExtraido]:
+        """
+        Analisa o PDF entregando cada registro assim que a página dele é processada,
+        identificado pelo tipo ('demonstrativo', 'funarpen' ou 'issqn').
+        Os registros não são acumulados em valores_demonstrativos, valores_funarpen e
+        valores_issqn, então a memória fica constante qualquer que seja o tamanho do documento
+        (com checkpoint, a forma serializada dos registros é mantida até ele ser gravado).
+        Erros de leitura do PDF são propagados ao consumidor.
+        """
+        for demonstrativos, funarpen, issqn in self._iterar_resultados():
+            for registro in demonstrativos:
+                yield RegistroExtraido(TIPO_DEMONSTRATIVO, registro)
+            for registro in funarpen:
+                yield RegistroExtraido(TIPO_FUNARPEN, registro)
+            for registro in issqn:
+                yield RegistroExtraido(TIPO_ISSQN, registro)
+    
+    def analisar_pdf(self) -> bool:
+        """
+        Analisa o PDF completo, página por página.
+        Com workers > 1 e documentos de pelo menos MIN_PAGINAS_PARALELO páginas,
+        as páginas são processadas em blocos por um pool de processos.
+        """
+        self.erro = None
+        self.cancelada = False
+        try:
+            for demonstrativos, funarpen, issqn in self._iterar_resultados():
+                self.valores_demonstrativos.extend(demonstrativos)
+                self.valores_funarpen.extend(funarpen)
+                self.valores_issqn.extend(issqn)
+            return True
+                
+        except AnaliseCancelada:
+            self.cancelada = True
+            self.erro = "Análise cancelada."
+            logger.info(self.erro, extra={"documento": self.caminho_pdf})
             return False
+        except FileNotFoundError:
+            self.erro = f"Erro: Arquivo '{self.caminho_pdf}' não encontrado."
         except Exception as e:
-            print(f"Erro ao processar PDF: {e}")
-            return False
+            self.erro = f"Erro ao processar PDF: {e}"
+        logger.error(self.erro, extra={"documento": self.caminho_pdf})
+        return False
+    
+    def _estado_registros(self) -> tuple:
+        """
+        Identifica o estado atual dos registros: a versão de cada ArmazemRegistros muda a cada
+        inclusão. Para listas simples atribuídas de fora, só o tamanho é considerado.
+        """
+        return tuple(
+            (id(registros), getattr(registros, "versao", None), len(registros))
+            for registros in (self.valores_demonstrativos, self.valores_funarpen, self.valores_issqn)
+        )
+    
+    def _agregacao(self, nome: str, calcular):
+        """Resultado memorizado de uma agregação, recalculado só se os registros mudaram"""
+        estado = self._estado_registros()
+        memorizado = self._agregacoes.get(nome)
+        if memorizado is not None and memorizado[0] == estado:
+            return memorizado[1]
+        with self._medir(ETAPA_AGREGACAO):
+            resultado = calcular()
+        self.contagem_agregacoes[nome] += 1
+        self._agregacoes[nome] = (estado, resultado)
+        return resultado
+    
+    def indice_datas(self) -> IndiceDatas:
+        """
+        Totais diários indexados por data, para consultas por intervalo (totais_entre),
+        semana (totais_por_semana) e mês (totais_por_mes) sem percorrer os registros de novo.
+        """
+        return self._agregacao("indice_datas", lambda: IndiceDatas(
+            self.valores_demonstrativos, self.valores_funarpen, self.valores_issqn
+        ))
     
     def calcular_totais_diarios(self) -> List[TotalDiario]:
-        """Calcula totais diários agrupados por data de pagamento"""
-        totais_por_data = defaultdict(lambda: {
-            'demonstrativos': Decimal('0'),
-            'funarpen': Decimal('0'),
-            'issqn': Decimal('0')
-        })
-        
-        # Agrupa valores demonstrativos por data
-        for valor in self.valores_demonstrativos:
-            data = valor.data_pagamento if valor.data_pagamento else "Data não identificada"
-            totais_por_data[data]['demonstrativos'] += valor.valor
-        
-        # Agrupa valores FUNARPEN por data
-        for valor in self.valores_funarpen:
-            data = valor.data_pagamento if valor.data_pagamento else "Data não identificada"
-            totais_por_data[data]['funarpen'] += valor.valor
-        
-        # Agrupa valores ISSQN por data
-        for valor in self.valores_issqn:
-            if valor.valor:
-                data = valor.data_pagamento if valor.data_pagamento else "Data não identificada"
-                totais_por_data[data]['issqn'] += valor.valor
-        
-        # Converte para lista de TotalDiario
-        totais_diarios = []
-        for data, totais in sorted(totais_por_data.items()):
-            valor_liquido = totais['demonstrativos'] - totais['funarpen'] - totais['issqn']
-            totais_diarios.append(TotalDiario(
+        """Calcula totais diários agrupados por data de pagamento, em ordem cronológica"""
+        # Somas em centavos por dia, vetorizadas sobre as colunas dos registros (app/agregacao.py);
+        # registros sem data ou com data inválida vêm depois dos dias
+        totais_diarios = self._agregacao("totais_diarios", lambda: [
+            TotalDiario(
                 data=data,
-                demonstrativos=totais['demonstrativos'],
-                funarpen=totais['funarpen'],
-                issqn=totais['issqn'],
-                valor_liquido=valor_liquido
-            ))
-        
-        return totais_diarios
+                demonstrativos=demonstrativos,
+                funarpen=funarpen,
+                issqn=issqn,
+                valor_liquido=demonstrativos - funarpen - issqn
+            )
+            for data, demonstrativos, funarpen, issqn in self.indice_datas().dias()
+        ])
+        # Cópia da lista, para quem a alterar não mexer no resultado memorizado
+        return list(totais_diarios)
 
     def calcular_totais(self) -> Dict[str, Union[Decimal, int]]:
         """Calcula totais consolidados"""
-        total_demonstrativos = sum(v.valor for v in self.valores_demonstrativos)
-        total_funarpen = sum(v.valor for v in self.valores_funarpen)
-        total_issqn = sum(v.valor for v in self.valores_issqn if v.valor is not None)
-        valor_liquido = total_demonstrativos - total_funarpen - total_issqn
-        
-        return {
-            'total_demonstrativos': total_demonstrativos,
-            'total_funarpen': total_funarpen,
-            'total_issqn': total_issqn,
-            'valor_liquido': valor_liquido
-        }
-    
-    def gerar_relatorio(self, caminho_pdf=None) -> str:
-        """Gera relatório estruturado completo"""
-        totais = self.calcular_totais()
-        totais_diarios = self.calcular_totais_diarios()
-        
-        relatorio = []
-        relatorio.append("=" * 80)
-        relatorio.append("RELATÓRIO DE ANÁLISE DE PDF - VALORES FINANCEIROS")
-        relatorio.append("=" * 80)
-        relatorio.append("")
-        
-        # Seção 1: Valores Demonstrativos
-        relatorio.append("1. VALORES DEMONSTRATIVOS CONSIDERADOS")
-        relatorio.append("-" * 50)
-        if self.valores_demonstrativos:
-            for valor in self.valores_demonstrativos:
-                relatorio.append(f"Página {valor.pagina}: {valor.linha_completa}")
-                relatorio.append(f"  Valor: R$ {valor.valor:,.2f}")
-                relatorio.append(f"  Data de pagamento: {valor.data_pagamento}")
-                relatorio.append("")
-        else:
-            relatorio.append("Nenhum valor demonstrativo encontrado.")
-        relatorio.append("")
-        
-        # Seção 2: Valores FUNARPEN
-        relatorio.append("2. VALORES SUBTRAÍDOS POR FUNARPEN")
-        relatorio.append("-" * 50)
-        if self.valores_funarpen:
-            for valor in self.valores_funarpen:
-                relatorio.append(f"Página {valor.pagina}: {valor.linha_completa}")
-                relatorio.append(f"  Valor: R$ {valor.valor:,.2f}")
-                relatorio.append(f"  Data de pagamento: {valor.data_pagamento}")
-                relatorio.append("")
-        else:
-            relatorio.append("Nenhum valor FUNARPEN encontrado.")
-        relatorio.append("")
-        
-        # Seção 3: Valores ISSQN
-        relatorio.append("3. VALORES SUBTRAÍDOS POR CONTER ISSQN")
-        relatorio.append("-" * 50)
-        if self.valores_issqn:
-            for valor in self.valores_issqn:
-                relatorio.append(f"Página {valor.pagina}: {valor.linha_completa}")
-                if valor.valor:
-                    relatorio.append(f"  Valor: R$ {valor.valor:,.2f}")
-                    relatorio.append(f"  Data de pagamento: {valor.data_pagamento}")
-                else:
-                    relatorio.append("  Valor: Não identificado")
-                relatorio.append("")
-        else:
-            relatorio.append("Nenhum valor ISSQN encontrado.")
-        relatorio.append("")
-        
-        # Seção 4: Totais Diários
-        relatorio.append("4. TOTAIS DIÁRIOS")
-        relatorio.append("-" * 50)
-        if totais_diarios:
-            for total in totais_diarios:
-                relatorio.append(f"Data: {total.data}")
-                relatorio.append(f"  Demonstrativos: R$ {total.demonstrativos:,.2f}")
-                relatorio.append(f"  Subtrações FUNARPEN: R$ {total.funarpen:,.2f}")
-                relatorio.append(f"  Subtrações ISSQN: R$ {total.issqn:,.2f}")
-                relatorio.append(f"  Valor líquido diário: R$ {total.valor_liquido:,.2f}")
-                relatorio.append("")
-        else:
-            relatorio.append("Nenhum total diário calculado.")
-        relatorio.append("")
-        
-        # Seção 5: Resumo Consolidado
-        relatorio.append("5. RESUMO CONSOLIDADO")
-        relatorio.append("-" * 50)
-        relatorio.append(f"Total de valores demonstrativos: R$ {totais['total_demonstrativos']:,.2f}")
-        relatorio.append(f"Total de subtrações FUNARPEN: R$ {totais['total_funarpen']:,.2f}")
-        relatorio.append(f"Total de valores ISSQN: R$ {totais['total_issqn']:,.2f}")
-        relatorio.append(f"Valor líquido final: R$ {totais['valor_liquido']:,.2f}")
-        relatorio.append("")
-        
-        # Estatísticas
-        relatorio.append("6. ESTATÍSTICAS")
-        relatorio.append("-" * 50)
-        relatorio.append(f"Páginas com campo bancário válido: {len(set(v.pagina for v in self.valores_demonstrativos))}")
-        relatorio.append(f"Valores demonstrativos encontrados: {len(self.valores_demonstrativos)}")
-        relatorio.append(f"Valores FUNARPEN encontrados: {len(self.valores_funarpen)}")
-        relatorio.append(f"Valores ISSQN encontrados: {len(self.valores_issqn)}")
-        relatorio.append(f"Dias com movimentação: {len(totais_diarios)}")
-        relatorio.append("")
-        relatorio.append("=" * 80)
-        
-        relatorio_str = "\n".join(relatorio)
-
-        # Salva arquivos se caminho_pdf for fornecido
-        if caminho_pdf:
-            nome_arquivo_relatorio = Path(caminho_pdf).stem + "_relatorio.txt"
-            caminho_relatorio = Path("results") / nome_arquivo_relatorio
-            Path("results").mkdir(exist_ok=True)
-            with open(caminho_relatorio, 'w', encoding='utf-8') as f:
-                f.write(relatorio_str)
+        def calcular():
+            total_demonstrativos = somar(self.valores_demonstrativos)
+            total_funarpen = somar(self.valores_funarpen)
+            total_issqn = somar(self.valores_issqn, ignorar_none=True)
+            valor_liquido = total_demonstrativos - total_funarpen - total_issqn
+            
+            return {
+                'total_demonstrativos': total_demonstrativos,
+                'total_funarpen': total_funarpen,
+                'total_issqn': total_issqn,
+                'valor_liquido': valor_liquido
+            }
+        return dict(self._agregacao("totais", calcular))
+    
+    def gerar_relatorio(self, caminho_pdf=None, retornar_texto: bool = True,
+                        saida: Optional[TextIO] = None, nome_saida: Optional[str] = None) -> Optional[str]:
+        """
+        Gera relatório estruturado completo. Com caminho_pdf, o TXT e a planilha CSV são
+        escritos direto nos arquivos de results/, numa única passagem; saida recebe uma cópia
+        do TXT enquanto ele é escrito (o console, por exemplo). O texto completo só é montado
+        em memória se retornar_texto for True (sempre que não houver caminho_pdf nem saida).
+        nome_saida: nome base dos arquivos em results/ (padrão: o nome do PDF sem extensão).
+        """
+        texto = io.StringIO() if retornar_texto or not (caminho_pdf or saida) else None
+        saidas_txt = [s for s in (texto, saida) if s is not None]
+        caminho_csv = None
+        with ExitStack() as arquivos:
+            saida_csv = None
+            if caminho_pdf:
+                Path("results").mkdir(exist_ok=True)
+                nome_base = nome_saida or Path(caminho_pdf).stem
+                caminho_relatorio = Path("results") / (nome_base + "_relatorio.txt")
+                saidas_txt.append(arquivos.enter_context(open(caminho_relatorio, 'w', encoding='utf-8')))
+                try:
+                    caminho_csv = Path("results") / (nome_base + "_relatorio.csv")
+                    saida_csv = open(caminho_csv, 'w', newline='', encoding='utf-8')
+                except Exception as e:
+                    logger.error("Erro ao salvar planilha CSV: %s", e, extra={"documento": str(caminho_pdf)})
+            escritor = EscritorRelatorio(saidas_txt, saida_csv, str(caminho_pdf) if caminho_pdf else None)
+            # A planilha é fechada pelo escritor, que trata o erro sem interromper o TXT
+            arquivos.callback(escritor.fechar_csv)
+            with self._medir(ETAPA_RELATORIO):
+                escritor.escrever(self)
+        if escritor.falha_csv and caminho_csv is not None:
+            # Uma planilha pela metade não fica em results/ como se estivesse completa
             try:
-                caminho_csv = Path("results") / (Path(caminho_pdf).stem + "_relatorio.csv")
-                total_liquido_geral = sum(t.valor_liquido for t in totais_diarios)
-                with open(caminho_csv, 'w', newline='', encoding='utf-8') as csvfile:
-                    writer = csv.writer(csvfile, delimiter=';')
-                    writer.writerow(["Data", "Valor Demonstrativo", "Valor Funarpen", "Valor ISSQN", "Total Liquido", "Total Líquido Geral"])
-                    for idx, total in enumerate(totais_diarios):
-                        writer.writerow([
-                            total.data,
-                            f"{total.demonstrativos:.2f}",
-                            f"{total.funarpen:.2f}",
-                            f"{total.issqn:.2f}",
-                            f"{total.valor_liquido:.2f}",
-                            f"{total_liquido_geral:.2f}" if idx == 0 else ""
-                        ])
-            except Exception as e:
-                print(f"Erro ao salvar planilha CSV: {e}")
-        return relatorio_str
+                caminho_csv.unlink()
+            except OSError:
+                pass
+        return texto.getvalue() if texto is not None else None
+
+# Extrator, cache e pré-filtro abertos uma única vez em cada processo worker e reutilizados por todos os blocos dele
+# (o mapeamento do arquivo, quando usado, também fica aberto até o processo terminar)
+_mapeamento_worker = None
+_extrator_worker = None
+_cache_worker: Optional[CacheExtracao] = None
+_prefiltro_worker = None
+
+def _inicializar_worker(caminho_pdf: str, motores: List[str], config_cache: Optional[Tuple[str, int]] = None,
+                        config_prefiltro: Tuple[bool, bool] = (False, False),
+                        perfil_layout: PerfilLayout = PERFIL_EMBUTIDO, mapear_arquivo: bool = False):
+    """Inicializador do pool: abre o documento (e o cache e o pré-filtro, se usados) no processo worker"""
+    global _mapeamento_worker, _extrator_worker, _cache_worker, _prefiltro_worker
+    _mapeamento_worker = mapeamento_herdado(caminho_pdf) if mapear_arquivo else None
+    _extrator_worker = criar_extrator(caminho_pdf, motores, _mapeamento_worker).abrir()
+    if config_cache is not None:
+        caminho_cache, limite_bytes = config_cache
+        _cache_worker = CacheExtracao(caminho_cache, limite_bytes / (1024 * 1024))
+    if config_prefiltro[0]:
+        _prefiltro_worker = criar_prefiltro(caminho_pdf, perfil_layout.campo_bancario,
+                                            _extrator_worker.motor_principal, _mapeamento_worker)
+
+def _analisar_bloco(caminho_pdf: str, motores: List[str], config_cache: Optional[Tuple[str, int]],
+                    config_prefiltro: Tuple[bool, bool], inicio: int, fim: int,
+                    paginas_lentas: Optional[int] = None, medir_memoria: bool = False,
+                    perfil_layout: PerfilLayout = PERFIL_EMBUTIDO, mapear_arquivo: bool = False,
+                    hashes_paginas: Optional[Dict[int, str]] = None) -> ResultadoBloco:
+    """
+    Executado nos processos worker: analisa as páginas de índice [inicio, fim).
+    Com paginas_lentas, o bloco é perfilado e o perfil volta no resultado; com medir_memoria,
+    volta também o pico de RSS e o PSS do processo worker. hashes_paginas: hashes de conteúdo
+    já calculados pelo processo principal, usados na chave do cache.
+    """
+    if _extrator_worker is None:
+        _inicializar_worker(caminho_pdf, motores, config_cache, config_prefiltro, perfil_layout, mapear_arquivo)
+    extrator = _extrator_worker
+    usar_prefiltro, verificar_prefiltro = config_prefiltro
+    analisador = AnalisadorPDF(caminho_pdf, motor=motores, cache=_cache_worker,
+                               prefiltro=usar_prefiltro, verificar_prefiltro=verificar_prefiltro,
+                               perfilar=paginas_lentas is not None, paginas_lentas=paginas_lentas or 0,
+                               perfil_layout=perfil_layout)
+    if hashes_paginas:
+        analisador._hashes_paginas = hashes_paginas
+    inicio_fallback = len(extrator.paginas_com_fallback)
+    paginas_com_campo = analisador._processar_intervalo(extrator, inicio, fim, _prefiltro_worker)
+    return ResultadoBloco(
+        analisador.valores_demonstrativos,
+        analisador.valores_funarpen,
+        analisador.valores_issqn,
+        len(paginas_com_campo),
+        extrator.paginas_com_fallback[inicio_fallback:],
+        analisador.acertos_cache,
+        analisador.falhas_cache,
+        analisador.paginas_ignoradas_prefiltro,
+        analisador.falsos_negativos_prefiltro,
+        paginas_com_campo,
+        analisador.perfil,
+        pico_rss_processo() if medir_memoria else None,
+        pss_atual() if medir_memoria else None,
+        os.getpid() if medir_memoria else None,
+        fim,
+    )
+
+def executar_lote(entradas: List[str], motores: List[str], jobs: int, recursivo: bool,
+                  opcoes_analisador: Optional[Dict] = None) -> int:
+    """Modo lote da linha de comando; retorna o código de saída"""
+    from app.lote import STATUS_NAO_ENCONTRADO, analisar_lote
+    
+    def ao_concluir(resultado, concluidos, total):
+        detalhe = f" - {resultado.mensagem}" if resultado.mensagem else ""
+        print(f"[{concluidos}/{total}] {resultado.status.upper()}: {resultado.caminho}{detalhe}")
+    
+    print(f"Modo lote: até {max(1, jobs)} arquivo(s) simultâneo(s)")
+    print()
+    resumo = analisar_lote(entradas, motores, jobs=jobs, recursivo=recursivo, ao_concluir=ao_concluir,
+                           opcoes_analisador=opcoes_analisador)
+    for resultado in resumo.resultados:
+        if resultado.status == STATUS_NAO_ENCONTRADO:
+            print(f"AVISO: nenhum PDF encontrado para '{resultado.caminho}'")
+    
+    print()
+    print("=" * 50)
+    print(f"Arquivos analisados com sucesso: {resumo.sucessos}")
+    print(f"Arquivos com falha: {resumo.falhas}")
+    print(f"Tempo total: {resumo.duracao:.1f}s")
+    print(f"Resumo do lote salvo em: {resumo.caminho_resumo}")
+    return resumo.codigo_saida
 
 def main():
     """Função principal do programa"""
@@ -366,12 +987,146 @@ def main():
     print("=" * 50)
     
     # Verifica argumentos da linha de comando
-    if len(sys.argv) != 2:
-        print("Uso: python sergio.py <caminho_do_pdf>")
-        print("Exemplo: python sergio.py documento.pdf")
+    parser = argparse.ArgumentParser(
+        prog="python -m app.analise_pdf",
+        description="Analisa um demonstrativo financeiro em PDF e gera o relatório em results/.",
+    )
+    parser.add_argument(
+        "caminhos", nargs="*", metavar="caminho",
+        help="arquivo PDF a ser analisado; vários arquivos, pastas ou padrões glob ativam o modo lote",
+    )
+    parser.add_argument(
+        "--motor", default=MOTOR_PADRAO,
+        help=f"motor de extração ({', '.join(MOTORES)}) ou cadeia de fallback separada por vírgula, "
+             f"ex.: fitz,pypdf2 (padrão: {MOTOR_PADRAO})",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help=f"processos para extração em paralelo; documentos com menos de {MIN_PAGINAS_PARALELO} "
+             f"páginas são sempre processados em série (padrão: 1)",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=os.cpu_count() or 1,
+        help="modo lote: quantidade de arquivos analisados simultaneamente (padrão: número de CPUs)",
+    )
+    parser.add_argument("--recursivo", action="store_true", help="modo lote: inclui PDFs das subpastas")
+    parser.add_argument("--lote", action="store_true", help="força o modo lote mesmo com um único arquivo")
+    parser.add_argument(
+        "--sem-cache", action="store_true",
+        help=f"não usa o cache de texto extraído por página ({CAMINHO_CACHE_PADRAO})",
+    )
+    parser.add_argument("--limpar-cache", action="store_true", help="esvazia o cache de páginas antes de analisar")
+    parser.add_argument(
+        "--prefiltro", action="store_true",
+        help="descarta pelo texto do PyMuPDF as páginas sem o campo bancário, sem a extração completa",
+    )
+    parser.add_argument(
+        "--verificar-prefiltro", action="store_true",
+        help="liga o pré-filtro, mas extrai também as páginas descartadas e avisa se alguma tinha o campo bancário",
+    )
+    parser.add_argument(
+        "--sem-checkpoint", action="store_true",
+        help="analisa o documento do início, sem reaproveitar nem gravar o checkpoint em "
+             f"{PASTA_CHECKPOINTS_PADRAO}",
+    )
+    parser.add_argument(
+        "--checkpoint-max-mb", type=float, default=LIMITE_CHECKPOINTS_MB,
+        help=f"tamanho máximo da pasta de checkpoints em MB (padrão: {LIMITE_CHECKPOINTS_MB})",
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="count", default=0,
+        help="mostra o andamento da análise; repetido (-vv), mostra também cada página processada",
+    )
+    parser.add_argument(
+        "--log-formato", choices=FORMATOS, default=FORMATO_TEXTO,
+        help="formato das mensagens de log em stderr; json gera um objeto por linha, com página e "
+             "milissegundos (padrão: texto)",
+    )
+    parser.add_argument(
+        "--mostrar-relatorio", action="store_true",
+        help="exibe o relatório completo no console, além de salvá-lo em results/",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="mede o tempo de cada etapa e lista as páginas de extração mais lenta ao final",
+    )
+    parser.add_argument(
+        "--profile-paginas", type=int, default=PAGINAS_LENTAS_PADRAO, metavar="N",
+        help=f"--profile: quantidade de páginas mais lentas listadas (padrão: {PAGINAS_LENTAS_PADRAO})",
+    )
+    parser.add_argument(
+        "--profile-pstats", metavar="ARQUIVO",
+        help="grava as estatísticas do cProfile (formato pstats) em ARQUIVO; implica --profile",
+    )
+    parser.add_argument(
+        "--memoria", action="store_true",
+        help="mede o pico de memória (RSS) da análise e o exibe ao final; no modo lote, vai para o log (-v)",
+    )
+    parser.add_argument(
+        "--sem-mmap", action="store_true",
+        help="lê o PDF pelo arquivo em cada etapa e processo, sem o mapeamento em memória compartilhado",
+    )
+    parser.add_argument(
+        "--perfil", metavar="NOME",
+        help="perfil de layout do documento (ver --listar-perfis); sem ele, o perfil é detectado "
+             f"pelas primeiras {PAGINAS_DETECCAO} páginas",
+    )
+    parser.add_argument("--listar-perfis", action="store_true", help="lista os perfis de layout disponíveis e sai")
+    parser.add_argument(
+        "--cache-max-mb", type=float, default=LIMITE_PADRAO_MB,
+        help=f"tamanho máximo do cache de páginas em MB (padrão: {LIMITE_PADRAO_MB})",
+    )
+    args = parser.parse_args()
+    configurar_log(nivel_por_verbosidade(args.verbose), args.log_formato)
+    
+    try:
+        motores = normalizar_motores(args.motor)
+    except ValueError as e:
+        print(f"Erro: {e}")
+        sys.exit(1)
+    
+    try:
+        registro = registro_padrao()
+        if args.perfil is not None:
+            registro.obter(args.perfil)
+    except ValueError as e:
+        print(f"Erro: {e}")
         sys.exit(1)
+    if args.listar_perfis:
+        for perfil in registro:
+            print(f"{perfil.nome:<20} {perfil.campo_bancario}" + (f"  ({perfil.descricao})" if perfil.descricao else ""))
+        return
     
-    caminho_pdf = sys.argv[1]
+    if args.limpar_cache:
+        with CacheExtracao(CAMINHO_CACHE_PADRAO, args.cache_max_mb) as cache:
+            cache.limpar()
+        print(f"Cache de páginas esvaziado: {CAMINHO_CACHE_PADRAO}")
+        if not args.caminhos:
+            return
+    if not args.caminhos:
+        parser.error("informe ao menos um arquivo PDF")
+    
+    opcoes_analisador = {
+        'cache': not args.sem_cache,
+        'limite_cache_mb': args.cache_max_mb,
+        'prefiltro': args.prefiltro or args.verificar_prefiltro,
+        'verificar_prefiltro': args.verificar_prefiltro,
+        'checkpoint': not args.sem_checkpoint,
+        'limite_checkpoints_mb': args.checkpoint_max_mb,
+        'medir_memoria': args.memoria,
+        'perfil_layout': args.perfil,
+        'mapear_arquivo': not args.sem_mmap,
+    }
+    
+    from app.lote import eh_padrao_glob
+    if args.lote or len(args.caminhos) > 1 or any(
+        os.path.isdir(c) or eh_padrao_glob(c) for c in args.caminhos
+    ):
+        if args.profile or args.profile_pstats:
+            parser.error("--profile vale apenas para a análise de um único arquivo")
+        sys.exit(executar_lote(args.caminhos, motores, args.jobs, args.recursivo, opcoes_analisador))
+    
+    caminho_pdf = args.caminhos[0]
     
     # Verifica se o arquivo existe
     if not Path(caminho_pdf).exists():
@@ -379,19 +1134,43 @@ def main():
         sys.exit(1)
     
     # Cria analisador e executa análise
-    analisador = AnalisadorPDF(caminho_pdf)
+    perfilar = args.profile or bool(args.profile_pstats)
+    analisador = AnalisadorPDF(caminho_pdf, motor=motores, workers=args.workers, **opcoes_analisador,
+                               perfilar=perfilar, paginas_lentas=args.profile_paginas)
     
     print(f"Analisando arquivo: {caminho_pdf}")
     print()
     
-    if analisador.analisar_pdf():
-        # Gera e exibe relatório
-        relatorio = analisador.gerar_relatorio(caminho_pdf)
-        print(relatorio)
-        
-        print(f"\nRelatório salvo em: results/{Path(caminho_pdf).stem}_relatorio.txt")
+    inicio = time.perf_counter()
+    with perfil_cprofile(args.profile_pstats):
+        sucesso = analisador.analisar_pdf()
+        if sucesso:
+            # Gera o relatório; com --mostrar-relatorio ele vai para o console enquanto os arquivos são escritos
+            if args.mostrar_relatorio:
+                analisador.gerar_relatorio(caminho_pdf, retornar_texto=False, saida=sys.stdout)
+                print()
+                print()
+            else:
+                analisador.gerar_relatorio(caminho_pdf, retornar_texto=False)
+    duracao = time.perf_counter() - inicio
+    
+    if sucesso:
+        print(f"Relatório salvo em: results/{Path(caminho_pdf).stem}_relatorio.txt")
     else:
         print("Falha na análise do PDF.")
+    
+    if analisador.memoria is not None:
+        print(f"Memória: {analisador.memoria.resumo()}")
+    
+    if analisador.perfil is not None:
+        print()
+        print("PERFIL DA ANÁLISE")
+        print("=" * 60)
+        print(analisador.perfil.tabela(duracao))
+        if args.profile_pstats:
+            print(f"Estatísticas do cProfile salvas em: {args.profile_pstats}")
+    
+    if not sucesso:
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -0,0 +1,116 @@
+# app/cache_extracao.py
+# Cache persistente do texto extraído de cada página, em SQLite.
+# A chave combina o hash do conteúdo da página com o motor de extração e sua versão,
+# então o cache continua válido entre execuções e para arquivos renomeados.
+import hashlib
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+CAMINHO_CACHE_PADRAO = os.path.join("results", ".cache", "paginas.sqlite")
+LIMITE_PADRAO_MB = 256
+
+
+class CacheExtracao:
+    """
+    Cache LRU em disco: texto por página, limitado em bytes.
+    Quando o limite é ultrapassado, as entradas acessadas há mais tempo são removidas.
+    """
+
+    def __init__(self, caminho: str = CAMINHO_CACHE_PADRAO, limite_mb: float = LIMITE_PADRAO_MB):
+        self.caminho = caminho
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+        self.acertos = 0
+        self.falhas = 0
+        self.remocoes = 0
+        Path(caminho).parent.mkdir(parents=True, exist_ok=True)
+        # Vários processos (modo paralelo e modo lote) podem usar o mesmo arquivo: em modo
+        # autocommit com WAL cada escrita segura o bloqueio só pelo tempo da própria instrução
+        self._conexao = sqlite3.connect(caminho, timeout=30, isolation_level=None)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        self._conexao.execute(
+            """CREATE TABLE IF NOT EXISTS paginas (
+                chave TEXT PRIMARY KEY,
+                texto TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                ultimo_acesso REAL NOT NULL
+            )"""
+        )
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_paginas_acesso ON paginas (ultimo_acesso)")
+        self._tamanho_total = self._conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM paginas").fetchone()[0]
+
+    @staticmethod
+    def chave(hash_conteudo: str, motor: str, versao: str) -> str:
+        """
+        Chave do hash do conteúdo da página (checkpoint.hash_pagina, o mesmo que os checkpoints
+        guardam) mais o motor e a versão que extraíram o texto
+        """
+        h = hashlib.sha256()
+        h.update(f"{motor}\0{versao}\0{hash_conteudo}".encode("utf-8"))
+        return h.hexdigest()
+
+    def obter(self, chave: str) -> Optional[str]:
+        linha = self._conexao.execute("SELECT texto FROM paginas WHERE chave = ?", (chave,)).fetchone()
+        if linha is None:
+            self.falhas += 1
+            return None
+        self.acertos += 1
+        self._conexao.execute("UPDATE paginas SET ultimo_acesso = ? WHERE chave = ?", (time.time(), chave))
+        return linha[0]
+
+    def gravar(self, chave: str, texto: str):
+        tamanho = len(texto.encode("utf-8"))
+        if tamanho > self.limite_bytes:
+            return
+        anterior = self._conexao.execute("SELECT tamanho FROM paginas WHERE chave = ?", (chave,)).fetchone()
+        self._conexao.execute(
+            "INSERT OR REPLACE INTO paginas (chave, texto, tamanho, ultimo_acesso) VALUES (?, ?, ?, ?)",
+            (chave, texto, tamanho, time.time()),
+        )
+        self._tamanho_total += tamanho - (anterior[0] if anterior else 0)
+        if self._tamanho_total > self.limite_bytes:
+            self._remover_menos_usados()
+
+    def _remover_menos_usados(self):
+        """Remove as entradas menos recentes até ficar abaixo de 90% do limite"""
+        alvo = int(self.limite_bytes * 0.9)
+        # Outros processos podem ter gravado no mesmo arquivo: recalcula o total real
+        self._tamanho_total = self._conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM paginas").fetchone()[0]
+        cursor = self._conexao.execute("SELECT chave, tamanho FROM paginas ORDER BY ultimo_acesso")
+        remover = []
+        for chave, tamanho in cursor:
+            if self._tamanho_total <= alvo:
+                break
+            remover.append((chave,))
+            self._tamanho_total -= tamanho
+        self._conexao.executemany("DELETE FROM paginas WHERE chave = ?", remover)
+        self.remocoes += len(remover)
+
+    def limpar(self):
+        self._conexao.execute("DELETE FROM paginas")
+        self._conexao.execute("VACUUM")
+        self._tamanho_total = 0
+
+    def estatisticas(self) -> Dict[str, int]:
+        entradas = self._conexao.execute("SELECT COUNT(*) FROM paginas").fetchone()[0]
+        return {
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'remocoes': self.remocoes,
+            'entradas': entradas,
+            'tamanho_bytes': self._tamanho_total,
+        }
+
+    def fechar(self):
+        if self._conexao is not None:
+            self._conexao.close()
+            self._conexao = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
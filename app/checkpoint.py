@@ -0,0 +1,167 @@
+# app/checkpoint.py
+# Checkpoints de análise por documento: hashes de cada página e registros extraídos.
+# Quando o PDF é reemitido com páginas acrescentadas ao final, o prefixo em comum com a
+# versão anterior é reaproveitado e só as páginas novas são processadas. A pasta é limitada
+# em bytes, como o cache de páginas: os checkpoints usados há mais tempo são apagados.
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+PASTA_CHECKPOINTS_PADRAO = os.path.join("results", ".checkpoints")
+LIMITE_CHECKPOINTS_MB = 64
+
+# Incrementar quando a varredura das páginas mudar de forma a invalidar os registros gravados
+# (2: o documento passou a ser identificado pelo perfil de layout, não só pelo campo bancário)
+VERSAO_CHECKPOINT = 2
+
+
+def hash_pagina(conteudo: bytes) -> str:
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def serializar_registro(registro) -> list:
+    """[pagina, linha, valor, data] com o valor em texto para manter a precisão do Decimal"""
+    valor = None if registro.valor is None else str(registro.valor)
+    return [registro.pagina, registro.linha_completa, valor, registro.data_pagamento]
+
+
+def desserializar_registro(classe, dados: Sequence):
+    pagina, linha, valor, data = dados
+    return classe(pagina, linha, None if valor is None else Decimal(valor), data)
+
+
+@dataclass
+class CheckpointDocumento:
+    """Estado de uma análise completa: hashes por página e registros já serializados"""
+    motor: str
+    total_paginas: int
+    hashes: List[str]
+    paginas_com_campo: List[int] = field(default_factory=list)
+    demonstrativos: List[list] = field(default_factory=list)
+    funarpen: List[list] = field(default_factory=list)
+    issqn: List[list] = field(default_factory=list)
+
+    def prefixo_comum(self, hashes: Sequence[str]) -> int:
+        """Quantidade de páginas iniciais idênticas entre este checkpoint e os hashes dados"""
+        comum = 0
+        for anterior, atual in zip(self.hashes, hashes):
+            if anterior != atual:
+                break
+            comum += 1
+        return comum
+
+    def acrescentar(self, paginas_com_campo: Sequence[int], demonstrativos, funarpen, issqn):
+        """Inclui os registros de páginas recém-processadas"""
+        self.paginas_com_campo.extend(paginas_com_campo)
+        self.demonstrativos.extend(serializar_registro(r) for r in demonstrativos)
+        self.funarpen.extend(serializar_registro(r) for r in funarpen)
+        self.issqn.extend(serializar_registro(r) for r in issqn)
+
+    def recortar(self, paginas: int) -> "CheckpointDocumento":
+        """Checkpoint restrito às primeiras `paginas` páginas"""
+        return CheckpointDocumento(
+            motor=self.motor,
+            total_paginas=paginas,
+            hashes=self.hashes[:paginas],
+            paginas_com_campo=[p for p in self.paginas_com_campo if p <= paginas],
+            demonstrativos=[r for r in self.demonstrativos if r[0] <= paginas],
+            funarpen=[r for r in self.funarpen if r[0] <= paginas],
+            issqn=[r for r in self.issqn if r[0] <= paginas],
+        )
+
+
+class ArmazemCheckpoints:
+    """
+    Guarda um checkpoint JSON por documento em results/.checkpoints.
+    O documento é identificado pelo hash da primeira página, pelo motor e pelo perfil de layout
+    (nome e assinatura do conteúdo, então editar o perfil invalida os checkpoints dele),
+    então as reemissões acumuladas do mesmo demonstrativo caem no mesmo arquivo.
+    A data de modificação de cada arquivo serve de último acesso: carregar a atualiza e, passado
+    o limite, os checkpoints mais antigos são apagados até a pasta ficar abaixo de 90% dele.
+    """
+
+    def __init__(self, pasta: str = PASTA_CHECKPOINTS_PADRAO, limite_mb: float = LIMITE_CHECKPOINTS_MB):
+        self.pasta = pasta
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+        self.remocoes = 0
+
+    @staticmethod
+    def identificador(hash_primeira_pagina: str, motor: str, perfil: str) -> str:
+        h = hashlib.sha256()
+        h.update(f"{VERSAO_CHECKPOINT}\0{motor}\0{perfil}\0{hash_primeira_pagina}".encode("utf-8"))
+        return h.hexdigest()
+
+    def _caminho(self, identificador: str) -> Path:
+        return Path(self.pasta) / f"{identificador}.json"
+
+    def carregar(self, identificador: str) -> Optional[CheckpointDocumento]:
+        """Checkpoint gravado para o documento, ou None se não houver um válido"""
+        caminho = self._caminho(identificador)
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+            if dados.get('versao') != VERSAO_CHECKPOINT:
+                return None
+            os.utime(caminho)
+            return CheckpointDocumento(
+                motor=dados['motor'],
+                total_paginas=dados['total_paginas'],
+                hashes=dados['hashes'],
+                paginas_com_campo=dados['paginas_com_campo'],
+                demonstrativos=dados['demonstrativos'],
+                funarpen=dados['funarpen'],
+                issqn=dados['issqn'],
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            # Checkpoint ausente ou corrompido: o documento é analisado do início
+            return None
+
+    def gravar(self, identificador: str, checkpoint: CheckpointDocumento):
+        caminho = self._caminho(identificador)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        dados: Dict = {
+            'versao': VERSAO_CHECKPOINT,
+            'motor': checkpoint.motor,
+            'total_paginas': checkpoint.total_paginas,
+            'hashes': checkpoint.hashes,
+            'paginas_com_campo': checkpoint.paginas_com_campo,
+            'demonstrativos': checkpoint.demonstrativos,
+            'funarpen': checkpoint.funarpen,
+            'issqn': checkpoint.issqn,
+        }
+        # Grava num arquivo temporário e troca de uma vez, para um checkpoint nunca ficar pela metade
+        temporario = caminho.with_suffix(f".{os.getpid()}.tmp")
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temporario, caminho)
+        self._remover_menos_usados(manter=caminho)
+
+    def _remover_menos_usados(self, manter: Path):
+        """Passado o limite, apaga os checkpoints menos recentes (nunca o recém-gravado)"""
+        arquivos = []
+        total = 0
+        for caminho in Path(self.pasta).glob("*.json"):
+            try:
+                estado = caminho.stat()
+            except OSError:
+                continue
+            arquivos.append((estado.st_mtime, estado.st_size, caminho))
+            total += estado.st_size
+        if total <= self.limite_bytes:
+            return
+        alvo = int(self.limite_bytes * 0.9)
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= alvo:
+                break
+            if caminho == manter:
+                continue
+            try:
+                caminho.unlink()
+            except OSError:
+                continue
+            total -= tamanho
+            self.remocoes += 1
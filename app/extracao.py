@@ -0,0 +1,378 @@
+# app/extracao.py
+# Motores de extração de texto usados pelo AnalisadorPDF.
+# Cada motor abre o documento uma vez e entrega o texto página a página.
+# Com um DocumentoMapeado (app/mapeamento.py), os motores leem do mapeamento em vez do arquivo.
+import hashlib
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple, Type, Union
+
+try:
+    import PyPDF2  # type: ignore
+except ImportError:
+    PyPDF2 = None
+
+try:
+    import fitz  # type: ignore
+except ImportError:
+    fitz = None
+
+if TYPE_CHECKING:
+    from app.mapeamento import DocumentoMapeado
+
+
+# Limite de aninhamento ao serializar objetos do PyPDF2 (referências cíclicas ficam só como referência)
+PROFUNDIDADE_SERIALIZACAO = 8
+
+
+class ErroExtracao(Exception):
+    """Falha ao abrir o documento ou extrair o texto de uma página"""
+
+
+def _serializar_objeto_pdf(objeto, profundidade: int = 0) -> bytes:
+    """
+    Forma canônica de um objeto do PyPDF2 para o hash de conteúdo: referências resolvidas,
+    chaves de dicionário ordenadas e fluxos pelos bytes decodificados
+    """
+    if objeto is None:
+        return b"null"
+    if profundidade > PROFUNDIDADE_SERIALIZACAO:
+        return repr(objeto).encode("utf-8", "replace")
+    objeto = objeto.get_object()
+    if isinstance(objeto, PyPDF2.generic.StreamObject):
+        dicionario = b"".join(str(chave).encode("utf-8", "replace") + b" " +
+                              _serializar_objeto_pdf(valor, profundidade + 1)
+                              for chave, valor in sorted(objeto.items()) if chave not in ("/Length", "/Filter"))
+        return b"<<" + dicionario + b">>stream:" + objeto.get_data()
+    if isinstance(objeto, PyPDF2.generic.DictionaryObject):
+        return b"<<" + b" ".join(str(chave).encode("utf-8", "replace") + b" " +
+                                 _serializar_objeto_pdf(valor, profundidade + 1)
+                                 for chave, valor in sorted(objeto.items())) + b">>"
+    if isinstance(objeto, PyPDF2.generic.ArrayObject):
+        return b"[" + b" ".join(_serializar_objeto_pdf(valor, profundidade + 1) for valor in objeto) + b"]"
+    return str(objeto).encode("utf-8", "replace")
+
+
+class ExtratorTexto:
+    """
+    Interface comum dos motores de extração.
+    Subclasses implementam abrir(), total_paginas, extrair_texto() e fechar().
+    """
+    nome = ""
+
+    def __init__(self, caminho_pdf: str, mapeamento: Optional["DocumentoMapeado"] = None):
+        self.caminho_pdf = caminho_pdf
+        self.mapeamento = mapeamento
+
+    @classmethod
+    def disponivel(cls) -> bool:
+        return False
+
+    @property
+    def versao(self) -> str:
+        return ""
+
+    def abrir(self):
+        raise NotImplementedError
+
+    @property
+    def total_paginas(self) -> int:
+        raise NotImplementedError
+
+    def extrair_texto(self, indice: int) -> str:
+        """Extrai o texto da página de índice 0-based"""
+        raise NotImplementedError
+
+    def conteudo_pagina(self, indice: int) -> bytes:
+        """
+        Bytes que determinam o texto da página: o fluxo de conteúdo decodificado mais
+        a identificação das fontes usadas. Serve de chave para o cache de extração.
+        """
+        raise NotImplementedError
+
+    def fechar(self):
+        pass
+
+    def __enter__(self):
+        self.abrir()
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+
+class ExtratorPyPDF2(ExtratorTexto):
+    """Motor em Python puro baseado em PyPDF2 (comportamento original)"""
+    nome = "pypdf2"
+
+    def __init__(self, caminho_pdf: str, mapeamento: Optional["DocumentoMapeado"] = None):
+        super().__init__(caminho_pdf, mapeamento)
+        self._arquivo = None
+        self._leitor = None
+        # Descrição de cada fonte já vista, pelo objeto indireto (as páginas as compartilham)
+        self._fontes_descritas: Dict[Tuple[int, int], str] = {}
+
+    @classmethod
+    def disponivel(cls) -> bool:
+        return PyPDF2 is not None
+
+    @property
+    def versao(self) -> str:
+        return getattr(PyPDF2, "__version__", "")
+
+    def abrir(self):
+        if self._leitor is None:
+            self._arquivo = self.mapeamento.fluxo() if self.mapeamento is not None else open(self.caminho_pdf, 'rb')
+            try:
+                self._leitor = PyPDF2.PdfReader(self._arquivo)
+            except Exception:
+                self.fechar()
+                raise
+        return self
+
+    @property
+    def total_paginas(self) -> int:
+        return len(self._leitor.pages)
+
+    def extrair_texto(self, indice: int) -> str:
+        texto = self._leitor.pages[indice].extract_text()
+        # O PdfReader guarda todo objeto já lido (fluxos, fontes) até ser fechado; descartar
+        # esse cache após cada página mantém a memória constante, e os objetos compartilhados
+        # entre páginas são relidos do arquivo quando necessário
+        self._leitor.resolved_objects.clear()
+        return texto
+
+    def conteudo_pagina(self, indice: int) -> bytes:
+        pagina = self._leitor.pages[indice]
+        conteudo = pagina.get("/Contents")
+        conteudo = conteudo.get_object() if conteudo is not None else None
+        if conteudo is None:
+            dados = b""
+        elif isinstance(conteudo, PyPDF2.generic.ArrayObject):
+            dados = b"\n".join(fluxo.get_object().get_data() for fluxo in conteudo)
+        else:
+            dados = conteudo.get_data()
+        fontes = []
+        recursos = pagina.get("/Resources")
+        if recursos is not None:
+            recursos = recursos.get_object()
+            dicionario_fontes = recursos.get("/Font")
+            if dicionario_fontes is not None:
+                for nome, fonte in sorted(dicionario_fontes.get_object().items()):
+                    fontes.append(f"{nome}:{self._descrever_fonte(fonte)}")
+        self._leitor.resolved_objects.clear()
+        return dados + b"\0" + "|".join(fontes).encode("utf-8", "replace")
+
+    def _descrever_fonte(self, referencia) -> str:
+        """
+        /BaseFont e /Subtype mais o hash da /Encoding (com as /Differences) e do fluxo
+        /ToUnicode: documentos com o mesmo fluxo de conteúdo e os mesmos nomes de fonte, mas
+        outros mapas de caracteres, extraem outro texto e não podem ter a mesma chave
+        """
+        chave = (referencia.idnum, referencia.generation) if isinstance(referencia, PyPDF2.generic.IndirectObject) else None
+        if chave is not None and chave in self._fontes_descritas:
+            return self._fontes_descritas[chave]
+        fonte = referencia.get_object()
+        h = hashlib.sha256()
+        h.update(_serializar_objeto_pdf(fonte.get("/Encoding")))
+        h.update(b"\0")
+        h.update(_serializar_objeto_pdf(fonte.get("/ToUnicode")))
+        descricao = f"{fonte.get('/BaseFont')}:{fonte.get('/Subtype')}:{h.hexdigest()}"
+        if chave is not None:
+            self._fontes_descritas[chave] = descricao
+        return descricao
+
+    def fechar(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+        self._arquivo = None
+        self._leitor = None
+        self._fontes_descritas.clear()
+
+
+class ExtratorFitz(ExtratorTexto):
+    """Motor baseado em PyMuPDF (fitz), implementado em C"""
+    nome = "fitz"
+
+    def __init__(self, caminho_pdf: str, mapeamento: Optional["DocumentoMapeado"] = None):
+        super().__init__(caminho_pdf, mapeamento)
+        self._doc = None
+        self._fontes_descritas: Dict[int, str] = {}
+
+    @classmethod
+    def disponivel(cls) -> bool:
+        return fitz is not None
+
+    @property
+    def versao(self) -> str:
+        return getattr(fitz, "VersionBind", "")
+
+    def abrir(self):
+        if self._doc is None:
+            if self.mapeamento is not None:
+                self._doc = fitz.open(stream=self.mapeamento.dados(), filetype="pdf")
+            else:
+                self._doc = fitz.open(self.caminho_pdf)
+        return self
+
+    @property
+    def total_paginas(self) -> int:
+        return self._doc.page_count
+
+    def extrair_texto(self, indice: int) -> str:
+        texto = self._doc[indice].get_text("text")
+        # O fitz termina cada página com uma quebra de linha que o PyPDF2 não produz;
+        # removê-la mantém as mesmas linhas para o processamento de vizinhança
+        if texto.endswith("\n"):
+            texto = texto[:-1]
+        return texto
+
+    def conteudo_pagina(self, indice: int) -> bytes:
+        pagina = self._doc[indice]
+        # get_fonts() traz (xref, ext, tipo, nome base, nome do recurso, codificação);
+        # o xref varia entre documentos e fica de fora
+        fontes = sorted(f"{f[4]}:{f[3]}:{f[2]}:{f[5]}:{self._descrever_fonte(f[0])}" for f in pagina.get_fonts())
+        return pagina.read_contents() + b"\0" + "|".join(fontes).encode("utf-8", "replace")
+
+    def _descrever_fonte(self, xref: int) -> str:
+        """Hash da /Encoding e do fluxo /ToUnicode da fonte, como no ExtratorPyPDF2"""
+        if xref in self._fontes_descritas:
+            return self._fontes_descritas[xref]
+        h = hashlib.sha256()
+        for chave in ("Encoding", "ToUnicode"):
+            tipo, valor = self._doc.xref_get_key(xref, chave)
+            if tipo == "xref":
+                referencia = int(valor.split()[0])
+                h.update(self._doc.xref_object(referencia, compressed=True).encode("utf-8", "replace"))
+                if self._doc.xref_is_stream(referencia):
+                    h.update(self._doc.xref_stream(referencia) or b"")
+            else:
+                h.update(f"{tipo}:{valor}".encode("utf-8", "replace"))
+            h.update(b"\0")
+        descricao = h.hexdigest()
+        self._fontes_descritas[xref] = descricao
+        return descricao
+
+    def fechar(self):
+        if self._doc is not None:
+            self._doc.close()
+        self._doc = None
+        self._fontes_descritas.clear()
+
+
+MOTORES: Dict[str, Type[ExtratorTexto]] = {
+    ExtratorPyPDF2.nome: ExtratorPyPDF2,
+    ExtratorFitz.nome: ExtratorFitz,
+}
+
+MOTOR_PADRAO = ExtratorPyPDF2.nome
+
+
+class ExtratorEmCadeia(ExtratorTexto):
+    """
+    Encadeia vários motores: o primeiro que abrir o documento define o total de páginas,
+    e as páginas em que ele falhar são extraídas pelos motores seguintes, na ordem dada.
+    """
+
+    def __init__(self, caminho_pdf: str, motores: Sequence[str], mapeamento: Optional["DocumentoMapeado"] = None):
+        super().__init__(caminho_pdf, mapeamento)
+        self.nomes_motores = list(motores)
+        self._extratores: List[ExtratorTexto] = [MOTORES[nome](caminho_pdf, mapeamento) for nome in self.nomes_motores]
+        self._abertos: Dict[int, bool] = {}
+        self._erro_abertura: Optional[Exception] = None
+        self._principal: Optional[ExtratorTexto] = None
+        self.paginas_com_fallback: List[int] = []
+
+    @property
+    def nome(self) -> str:  # type: ignore[override]
+        return "+".join(self.nomes_motores)
+
+    @property
+    def versao(self) -> str:
+        return "+".join(e.versao for e in self._extratores)
+
+    @property
+    def motor_principal(self) -> str:
+        return self._principal.nome if self._principal else ""
+
+    def _abrir_extrator(self, posicao: int) -> bool:
+        if posicao not in self._abertos:
+            extrator = self._extratores[posicao]
+            try:
+                if not extrator.disponivel():
+                    raise ErroExtracao(f"motor '{extrator.nome}' não está instalado")
+                extrator.abrir()
+                self._abertos[posicao] = True
+            except Exception as e:
+                self._erro_abertura = e
+                self._abertos[posicao] = False
+        return self._abertos[posicao]
+
+    def abrir(self):
+        if self._principal is not None:
+            return self
+        for posicao, extrator in enumerate(self._extratores):
+            if self._abrir_extrator(posicao):
+                self._principal = extrator
+                return self
+        if isinstance(self._erro_abertura, FileNotFoundError):
+            raise self._erro_abertura
+        raise ErroExtracao(f"Nenhum motor conseguiu abrir '{self.caminho_pdf}' ({self.nome})")
+
+    @property
+    def total_paginas(self) -> int:
+        return self._principal.total_paginas
+
+    def extrair_texto(self, indice: int) -> str:
+        ultimo_erro: Optional[Exception] = None
+        for posicao, extrator in enumerate(self._extratores):
+            if not self._abrir_extrator(posicao):
+                continue
+            try:
+                texto = extrator.extrair_texto(indice)
+            except Exception as e:
+                ultimo_erro = e
+                continue
+            if extrator is not self._principal:
+                self.paginas_com_fallback.append(indice + 1)
+            return texto
+        raise ErroExtracao(f"Página {indice + 1}: nenhum motor conseguiu extrair o texto ({ultimo_erro})")
+
+    def conteudo_pagina(self, indice: int) -> bytes:
+        ultimo_erro: Optional[Exception] = None
+        for posicao, extrator in enumerate(self._extratores):
+            if not self._abrir_extrator(posicao):
+                continue
+            try:
+                return extrator.conteudo_pagina(indice)
+            except Exception as e:
+                ultimo_erro = e
+        raise ErroExtracao(f"Página {indice + 1}: conteúdo indisponível ({ultimo_erro})")
+
+    def fechar(self):
+        for posicao, extrator in enumerate(self._extratores):
+            if self._abertos.get(posicao):
+                extrator.fechar()
+        self._abertos.clear()
+        self._principal = None
+
+
+def normalizar_motores(motor: Union[str, Sequence[str], None]) -> List[str]:
+    """Converte 'fitz', 'fitz,pypdf2' ou ['fitz', 'pypdf2'] numa lista validada de motores"""
+    if motor is None:
+        nomes = [MOTOR_PADRAO]
+    elif isinstance(motor, str):
+        nomes = [parte.strip().lower() for parte in motor.split(",") if parte.strip()]
+    else:
+        nomes = [str(parte).strip().lower() for parte in motor]
+    if not nomes:
+        nomes = [MOTOR_PADRAO]
+    desconhecidos = [nome for nome in nomes if nome not in MOTORES]
+    if desconhecidos:
+        raise ValueError(f"Motor de extração desconhecido: {', '.join(desconhecidos)} "
+                         f"(disponíveis: {', '.join(MOTORES)})")
+    return nomes
+
+
+def criar_extrator(caminho_pdf: str, motor: Union[str, Sequence[str], None] = None,
+                   mapeamento: Optional["DocumentoMapeado"] = None) -> ExtratorEmCadeia:
+    """Cria o extrator para o documento a partir do nome do motor ou da cadeia de fallback"""
+    return ExtratorEmCadeia(caminho_pdf, normalizar_motores(motor), mapeamento)
@@ -0,0 +1,257 @@
+# app/fila.py
+# Fila de análise da interface: vários PDFs são acrescentados à fila e analisados por um pool
+# limitado de processos, cada arquivo com o mesmo trabalho do modo lote (lote.analisar_arquivo,
+# que grava os relatórios dele). Só há na fila tantos arquivos em análise quanto processos, então
+# o status de cada um é o real e arquivos podem ser acrescentados ou cancelados durante a análise.
+# Ao esvaziar, a fila grava o resumo combinado (gravar_resumo_lote) em results/.
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from app.lote import (
+    STATUS_FALHA, STATUS_SUCESSO, ResultadoArquivo, ResumoLote, analisar_arquivo, gravar_resumo_lote,
+    nome_relatorio_unico,
+)
+
+STATUS_PENDENTE = "pendente"
+STATUS_ANALISANDO = "analisando"
+STATUS_CANCELADO = "cancelado"
+
+# Um núcleo fica livre para a interface
+WORKERS_FILA_PADRAO = max(1, min(4, (os.cpu_count() or 1) - 1))
+
+
+@dataclass
+class ItemFila:
+    caminho: str
+    # Nome base dos relatórios em results/, único dentro da fila
+    nome_saida: str = ""
+    status: str = STATUS_PENDENTE
+    resultado: Optional[ResultadoArquivo] = None
+
+    @property
+    def finalizado(self) -> bool:
+        return self.status in (STATUS_SUCESSO, STATUS_FALHA, STATUS_CANCELADO)
+
+
+class EstatisticasFila(NamedTuple):
+    total: int
+    pendentes: int
+    analisando: int
+    sucessos: int
+    falhas: int
+    cancelados: int
+    paginas: int
+    duracao: float
+
+    @property
+    def concluidos(self) -> int:
+        return self.sucessos + self.falhas + self.cancelados
+
+    @property
+    def arquivos_por_minuto(self) -> float:
+        return (self.sucessos + self.falhas) * 60 / self.duracao if self.duracao > 0 else 0.0
+
+    @property
+    def paginas_por_segundo(self) -> float:
+        return self.paginas / self.duracao if self.duracao > 0 else 0.0
+
+
+class FilaAnalise:
+    """
+    Fila de PDFs analisados por até `workers` processos. ao_concluir_arquivo(item) é chamado,
+    numa thread do pool, assim que cada arquivo termina (a interface grava o histórico por ele);
+    o observador definido com acompanhar() é chamado a cada mudança de status.
+    """
+
+    def __init__(self, workers: int = WORKERS_FILA_PADRAO,
+                 ao_concluir_arquivo: Optional[Callable[[ItemFila], None]] = None,
+                 motores: Optional[List[str]] = None, opcoes_analisador: Optional[Dict] = None):
+        self.workers = max(1, workers)
+        self.ao_concluir_arquivo = ao_concluir_arquivo
+        self.motores = motores
+        self.opcoes_analisador = opcoes_analisador
+        self.itens: List[ItemFila] = []
+        # Resumo combinado, gravado sempre que a fila esvazia
+        self.resumo: Optional[ResumoLote] = None
+        self._trava = threading.RLock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Tempo em análise: as rodadas já terminadas mais a atual, sem os intervalos com a fila vazia
+        self._duracao_anterior = 0.0
+        self._inicio: Optional[float] = None
+        self._observador: Optional[Callable[["FilaAnalise"], None]] = None
+
+    def adicionar(self, caminhos: Sequence[str]) -> int:
+        """
+        Acrescenta os PDFs que ainda não estão na fila; retorna quantos entraram. Um PDF com o
+        mesmo nome de outro da fila (de outra pasta) tem os relatórios gravados com um sufixo
+        do hash do caminho, para não sobrescrever os do primeiro.
+        """
+        with self._trava:
+            presentes = {os.path.normcase(os.path.abspath(item.caminho)) for item in self.itens}
+            nomes = {os.path.normcase(item.nome_saida) for item in self.itens}
+            novos = 0
+            for caminho in caminhos:
+                chave = os.path.normcase(os.path.abspath(caminho))
+                if chave in presentes:
+                    continue
+                presentes.add(chave)
+                nome_saida = Path(caminho).stem
+                if os.path.normcase(nome_saida) in nomes:
+                    nome_saida = nome_relatorio_unico(caminho)
+                nomes.add(os.path.normcase(nome_saida))
+                self.itens.append(ItemFila(caminho, nome_saida))
+                novos += 1
+            if novos:
+                self.resumo = None
+                self._despachar()
+        if novos:
+            self._notificar()
+        return novos
+
+    def cancelar_pendentes(self) -> int:
+        """Tira da fila os arquivos que ainda não começaram; os em análise terminam normalmente"""
+        with self._trava:
+            cancelados = 0
+            for item in self.itens:
+                if item.status == STATUS_PENDENTE:
+                    item.status = STATUS_CANCELADO
+                    cancelados += 1
+            if cancelados:
+                self._verificar_fim()
+        if cancelados:
+            self._notificar()
+        return cancelados
+
+    def limpar_concluidos(self):
+        """Remove da lista os arquivos já finalizados, para começar uma nova rodada"""
+        with self._trava:
+            self.itens = [item for item in self.itens if not item.finalizado]
+            if not self.itens:
+                self.resumo = None
+                self._duracao_anterior = 0.0
+        self._notificar()
+
+    @property
+    def ativa(self) -> bool:
+        with self._trava:
+            return any(not item.finalizado for item in self.itens)
+
+    def estatisticas(self) -> EstatisticasFila:
+        with self._trava:
+            contagem = {STATUS_PENDENTE: 0, STATUS_ANALISANDO: 0, STATUS_SUCESSO: 0, STATUS_FALHA: 0,
+                        STATUS_CANCELADO: 0}
+            paginas = 0
+            for item in self.itens:
+                contagem[item.status] += 1
+                if item.status == STATUS_SUCESSO and item.resultado is not None:
+                    paginas += item.resultado.total_paginas
+            duracao = self._duracao_anterior
+            if self._inicio is not None:
+                duracao += time.perf_counter() - self._inicio
+            return EstatisticasFila(len(self.itens), contagem[STATUS_PENDENTE], contagem[STATUS_ANALISANDO],
+                                    contagem[STATUS_SUCESSO], contagem[STATUS_FALHA], contagem[STATUS_CANCELADO],
+                                    paginas, duracao)
+
+    def totais(self) -> Dict[str, Decimal]:
+        """Totais somados dos arquivos analisados com sucesso, nas chaves de calcular_totais()"""
+        with self._trava:
+            resultados = [item.resultado for item in self.itens
+                          if item.status == STATUS_SUCESSO and item.resultado is not None]
+        return {
+            'total_demonstrativos': sum((r.total_demonstrativos for r in resultados), Decimal('0')),
+            'total_funarpen': sum((r.total_funarpen for r in resultados), Decimal('0')),
+            'total_issqn': sum((r.total_issqn for r in resultados), Decimal('0')),
+            'valor_liquido': sum((r.valor_liquido for r in resultados), Decimal('0')),
+        }
+
+    def acompanhar(self, observador: Optional[Callable[["FilaAnalise"], None]]):
+        """Define quem é avisado das mudanças (um por vez)"""
+        self._observador = observador
+
+    def aguardar(self, timeout: Optional[float] = None) -> bool:
+        """Espera a fila esvaziar; False se o tempo acabou antes"""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while self.ativa:
+            if limite is not None and time.monotonic() >= limite:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def encerrar(self):
+        self.cancelar_pendentes()
+        with self._trava:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _despachar(self):
+        """Põe em análise os próximos pendentes, até ocupar todos os processos (com a trava)"""
+        em_analise = sum(1 for item in self.itens if item.status == STATUS_ANALISANDO)
+        for item in self.itens:
+            if em_analise >= self.workers:
+                break
+            if item.status != STATUS_PENDENTE:
+                continue
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            if self._inicio is None:
+                self._inicio = time.perf_counter()
+            item.status = STATUS_ANALISANDO
+            futuro = self._executor.submit(analisar_arquivo, item.caminho, self.motores, self.opcoes_analisador,
+                                          item.nome_saida)
+            futuro.add_done_callback(lambda f, item=item: self._ao_terminar(item, f))
+            em_analise += 1
+
+    def _ao_terminar(self, item: ItemFila, futuro: Future):
+        try:
+            resultado = futuro.result()
+        except Exception as e:
+            resultado = ResultadoArquivo(item.caminho, STATUS_FALHA, str(e))
+        with self._trava:
+            item.resultado = resultado
+            item.status = STATUS_SUCESSO if resultado.status == STATUS_SUCESSO else STATUS_FALHA
+        if self.ao_concluir_arquivo is not None:
+            try:
+                self.ao_concluir_arquivo(item)
+            except Exception:
+                # O histórico de um arquivo não pode parar a fila
+                pass
+        with self._trava:
+            self._despachar()
+            self._verificar_fim()
+        self._notificar()
+
+    def _verificar_fim(self):
+        """Com a fila vazia, grava o resumo combinado e libera os processos (com a trava)"""
+        if self._inicio is None or any(not item.finalizado for item in self.itens):
+            return
+        self._duracao_anterior += time.perf_counter() - self._inicio
+        self._inicio = None
+        resultados = [item.resultado if item.resultado is not None
+                      else ResultadoArquivo(item.caminho, STATUS_CANCELADO, "Cancelado na fila")
+                      for item in self.itens]
+        resumo = ResumoLote(resultados=resultados, duracao=self._duracao_anterior)
+        try:
+            resumo.caminho_resumo = gravar_resumo_lote(resumo)
+        except OSError:
+            pass
+        self.resumo = resumo
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            # Chamado de uma thread do próprio pool: não pode esperar por ela
+            executor.shutdown(wait=False)
+
+    def _notificar(self):
+        observador = self._observador
+        if observador is not None:
+            try:
+                observador(self)
+            except Exception:
+                # Um erro na tela não pode parar a fila
+                pass
@@ -0,0 +1,172 @@
+# app/historico.py
+# Histórico das análises da interface, em SQLite. Cada análise é uma linha com chave primária
+# própria (remover é uma busca pela chave, sem reescrever o resto) e índices pela data e pelo
+# nome do arquivo. Com WAL, a fila de análise pode gravar enquanto a tela do histórico lê.
+# Na primeira abertura, as entradas do antigo historico.json são importadas uma única vez.
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+CAMINHO_HISTORICO_PADRAO = "historico.sqlite"
+CAMINHO_HISTORICO_JSON = "historico.json"
+
+# PRAGMA user_version do banco: 1 depois que o historico.json foi importado (ou não existia)
+VERSAO_MIGRADA = 1
+
+ORDEM_MAIS_RECENTE = "mais_recente"
+ORDEM_MAIS_ANTIGO = "mais_antigo"
+
+
+class HistoricoAnalises:
+    """
+    Entradas do histórico no mesmo formato do antigo historico.json (data, hora, nome_arquivo,
+    resumo e timestamp), mais o "id" da linha, usado para removê-las. Uma conexão por instância,
+    compartilhada entre as threads da interface e da fila sob uma trava.
+    """
+
+    def __init__(self, caminho: str = CAMINHO_HISTORICO_PADRAO, caminho_json: Optional[str] = CAMINHO_HISTORICO_JSON):
+        self.caminho = caminho
+        if Path(caminho).parent != Path(""):
+            Path(caminho).parent.mkdir(parents=True, exist_ok=True)
+        self._trava = threading.Lock()
+        # Autocommit: cada escrita segura o bloqueio só pelo tempo da própria instrução
+        self._conexao = sqlite3.connect(caminho, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        self._conexao.execute(
+            """CREATE TABLE IF NOT EXISTS analises (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                data TEXT NOT NULL,
+                hora TEXT NOT NULL,
+                nome_arquivo TEXT NOT NULL,
+                resumo TEXT NOT NULL
+            )"""
+        )
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_analises_timestamp ON analises (timestamp)")
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_analises_nome ON analises (nome_arquivo, timestamp)")
+        if caminho_json is not None:
+            self._migrar_json(caminho_json)
+
+    def _migrar_json(self, caminho_json: str) -> int:
+        """
+        Importa o historico.json uma única vez, marcada no user_version do banco; o arquivo
+        fica onde está, sem ser mais lido nem gravado.
+        """
+        with self._trava:
+            if self._conexao.execute("PRAGMA user_version").fetchone()[0] >= VERSAO_MIGRADA:
+                return 0
+            try:
+                with open(caminho_json, "r", encoding="utf-8") as f:
+                    entradas = json.load(f)
+            except FileNotFoundError:
+                entradas = []
+            except (OSError, ValueError) as e:
+                # Arquivo ilegível: fica onde está, e a importação é tentada de novo na próxima vez
+                print(f"Erro ao importar histórico antigo: {e}")
+                return 0
+            linhas = [self._linha_da_entrada(e) for e in entradas if isinstance(e, dict)]
+            self._conexao.execute("BEGIN IMMEDIATE")
+            try:
+                # Outro processo pode ter migrado entre a verificação e o bloqueio
+                if self._conexao.execute("PRAGMA user_version").fetchone()[0] >= VERSAO_MIGRADA:
+                    self._conexao.execute("ROLLBACK")
+                    return 0
+                self._conexao.executemany(
+                    "INSERT INTO analises (timestamp, data, hora, nome_arquivo, resumo) VALUES (?, ?, ?, ?, ?)",
+                    linhas,
+                )
+                self._conexao.execute(f"PRAGMA user_version = {VERSAO_MIGRADA}")
+                self._conexao.execute("COMMIT")
+            except Exception:
+                self._conexao.execute("ROLLBACK")
+                raise
+        return len(linhas)
+
+    @staticmethod
+    def _linha_da_entrada(entrada: Dict) -> tuple:
+        data = entrada.get("data", "")
+        hora = entrada.get("hora", "")
+        timestamp = entrada.get("timestamp")
+        if not timestamp:
+            # Entradas antigas sem timestamp: o momento vem da data e da hora exibidas
+            try:
+                timestamp = datetime.strptime(f"{data} {hora}", "%d/%m/%Y %H:%M").isoformat()
+            except ValueError:
+                timestamp = ""
+        return (timestamp, data, hora, entrada.get("nome_arquivo", ""),
+                json.dumps(entrada.get("resumo", {}), ensure_ascii=False))
+
+    def adicionar(self, nome_arquivo: str, resumo: Dict) -> Dict:
+        agora = datetime.now()
+        entrada = {
+            "data": agora.strftime("%d/%m/%Y"),
+            "hora": agora.strftime("%H:%M"),
+            "nome_arquivo": nome_arquivo,
+            "resumo": resumo,
+            "timestamp": agora.isoformat(),
+        }
+        with self._trava:
+            cursor = self._conexao.execute(
+                "INSERT INTO analises (timestamp, data, hora, nome_arquivo, resumo) VALUES (?, ?, ?, ?, ?)",
+                self._linha_da_entrada(entrada),
+            )
+        entrada["id"] = cursor.lastrowid
+        return entrada
+
+    def listar(self, ordem: str = ORDEM_MAIS_RECENTE, nome_arquivo: Optional[str] = None,
+               limite: Optional[int] = None) -> List[Dict]:
+        """Entradas ordenadas pelo momento da análise, opcionalmente só as de um arquivo"""
+        direcao = "ASC" if ordem == ORDEM_MAIS_ANTIGO else "DESC"
+        sql = "SELECT id, timestamp, data, hora, nome_arquivo, resumo FROM analises"
+        parametros: list = []
+        if nome_arquivo is not None:
+            sql += " WHERE nome_arquivo = ?"
+            parametros.append(nome_arquivo)
+        sql += f" ORDER BY timestamp {direcao}, id {direcao}"
+        if limite is not None:
+            sql += " LIMIT ?"
+            parametros.append(limite)
+        with self._trava:
+            linhas = self._conexao.execute(sql, parametros).fetchall()
+        return [
+            {"id": id_, "data": data, "hora": hora, "nome_arquivo": nome, "resumo": json.loads(resumo),
+             "timestamp": timestamp}
+            for id_, timestamp, data, hora, nome, resumo in linhas
+        ]
+
+    def remover(self, id_entrada: int) -> bool:
+        with self._trava:
+            cursor = self._conexao.execute("DELETE FROM analises WHERE id = ?", (id_entrada,))
+        return cursor.rowcount > 0
+
+    def contar(self) -> int:
+        with self._trava:
+            return self._conexao.execute("SELECT COUNT(*) FROM analises").fetchone()[0]
+
+    def fechar(self):
+        with self._trava:
+            if self._conexao is not None:
+                self._conexao.close()
+                self._conexao = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+
+_historico: Optional[HistoricoAnalises] = None
+_trava_historico = threading.Lock()
+
+
+def historico_padrao() -> HistoricoAnalises:
+    global _historico
+    with _trava_historico:
+        if _historico is None:
+            _historico = HistoricoAnalises()
+        return _historico
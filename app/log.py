@@ -0,0 +1,76 @@
+# app/log.py
+# Canal de log da aplicação: os módulos registram eventos no logger "app" (logging padrão),
+# que fica em silêncio até alguém configurá-lo; a linha de comando o configura com
+# configurar_log, em texto ou em JSON (uma linha por evento).
+import json
+import logging
+import sys
+from datetime import datetime
+from typing import Optional, TextIO
+
+LOGGER_APP = "app"
+
+FORMATO_TEXTO = "texto"
+FORMATO_JSON = "json"
+FORMATOS = (FORMATO_TEXTO, FORMATO_JSON)
+
+# Campos opcionais (passados em extra=) que o formato JSON inclui quando presentes
+CAMPOS_EXTRAS = ("documento", "pagina", "duracao_ms")
+
+# Sem configuração, nem avisos vão para o console (a GUI e o modo lote ficam quietos)
+logging.getLogger(LOGGER_APP).addHandler(logging.NullHandler())
+
+
+class FormatadorJSON(logging.Formatter):
+    """
+    Um objeto JSON por linha: instante, nível, origem, mensagem e milissegundos decorridos
+    desde o início do processo, mais documento, página e duração do evento quando houver.
+    """
+
+    def format(self, registro: logging.LogRecord) -> str:
+        evento = {
+            "tempo": datetime.fromtimestamp(registro.created).isoformat(timespec="milliseconds"),
+            "nivel": registro.levelname,
+            "origem": registro.name,
+            "mensagem": registro.getMessage(),
+            "decorrido_ms": round(registro.relativeCreated, 1),
+        }
+        for campo in CAMPOS_EXTRAS:
+            valor = getattr(registro, campo, None)
+            if valor is not None:
+                evento[campo] = valor
+        if registro.exc_info:
+            evento["excecao"] = self.formatException(registro.exc_info)
+        return json.dumps(evento, ensure_ascii=False)
+
+
+def configurar_log(nivel: int = logging.WARNING, formato: str = FORMATO_TEXTO,
+                   destino: Optional[TextIO] = None) -> logging.Logger:
+    """
+    Envia os eventos do logger "app" a partir de nivel para destino (padrão: stderr).
+    Chamadas repetidas substituem a configuração anterior em vez de duplicar as linhas.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"formato de log desconhecido: {formato} (use {' ou '.join(FORMATOS)})")
+    logger = logging.getLogger(LOGGER_APP)
+    for manipulador in list(logger.handlers):
+        if getattr(manipulador, "_configurado_pelo_app", False):
+            logger.removeHandler(manipulador)
+    manipulador = logging.StreamHandler(destino if destino is not None else sys.stderr)
+    manipulador._configurado_pelo_app = True
+    if formato == FORMATO_JSON:
+        manipulador.setFormatter(FormatadorJSON())
+    else:
+        manipulador.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(manipulador)
+    logger.setLevel(nivel)
+    return logger
+
+
+def nivel_por_verbosidade(verbosidade: int) -> int:
+    """0: só avisos e erros; 1 (-v): andamento da análise; 2 ou mais (-vv): cada página"""
+    if verbosidade <= 0:
+        return logging.WARNING
+    if verbosidade == 1:
+        return logging.INFO
+    return logging.DEBUG
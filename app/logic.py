@@ -1,9 +1,14 @@
 # app/logic.py
 import os
-import json
 from pathlib import Path
 from datetime import datetime
 from app.analise_pdf import AnalisadorPDF
+from app.fila import FilaAnalise
+from app.historico import ORDEM_MAIS_RECENTE, historico_padrao
+from app.lote import STATUS_SUCESSO, expandir_entradas
+from app.miniaturas import gerador_padrao
+from app.sessao import abrir_sessao, fechar_sessoes
+from app.tarefas import cancelar_analise_especulativa
 import fitz
 import flet as ft
 
@@ -12,6 +17,7 @@ estado = {"etapa": None, "file_path": None, "resumo": None}
 historico_navegacao = []
 flet_page = None
 pick_file = None  # Será definida no main_flet.py
+pick_files_fila = None  # Será definida no main_flet.py
 save_txt_dialog_func = None  # Será definida no main_flet.py
 save_csv_dialog_func = None  # Será definida no main_flet.py  
 
@@ -22,87 +28,29 @@ save_csv_dialog_func = None  # Será definida no main_flet.py
 
 
 def carregar_historico():
-    try:
-        if os.path.exists("historico.json"):
-            with open("historico.json", "r", encoding="utf-8") as f:
-                return json.load(f)
-        return []
-    except Exception as e:
-        print(f"Erro ao carregar histórico: {e}")
-        return []
+    """Entradas do histórico (app/historico.py), da mais recente para a mais antiga"""
+    return carregar_historico_ordenado()
 
-def carregar_historico_ordenado(ordem="mais_recente"):
+def carregar_historico_ordenado(ordem=ORDEM_MAIS_RECENTE):
     """
     Carrega histórico ordenado por data.
     ordem: 'mais_recente' ou 'mais_antigo'
     """
-    historico = carregar_historico()
-    if not historico:
-        return []
-    
     try:
-        # Ordenar por timestamp se disponível, senão por data
-        if ordem == "mais_recente":
-            if 'timestamp' in historico[0]:
-                return sorted(historico, key=lambda x: x.get('timestamp', ''), reverse=True)
-            else:
-                return sorted(historico, key=lambda x: x.get('data', ''), reverse=True)
-        else:  # mais_antigo
-            if 'timestamp' in historico[0]:
-                return sorted(historico, key=lambda x: x.get('timestamp', ''))
-            else:
-                return sorted(historico, key=lambda x: x.get('data', ''))
+        return historico_padrao().listar(ordem)
     except Exception as e:
-        print(f"Erro ao ordenar histórico: {e}")
-        return historico
+        print(f"Erro ao carregar histórico: {e}")
+        return []
 
 def remover_entrada_historico(entrada_para_remover):
     """
-    Remove uma entrada específica do histórico usando múltiplos critérios de identificação
+    Remove uma entrada do histórico pelo id dela (as entradas vêm de carregar_historico)
     """
     try:
-        historico = carregar_historico()
-        
-        # Filtrar histórico removendo a entrada específica
-        historico_filtrado = []
-        entrada_removida = False
-        
-        for i, entrada in enumerate(historico):
-            deve_manter = True
-            
-            # Critério 1: Timestamp (mais preciso)
-            if ('timestamp' in entrada and 'timestamp' in entrada_para_remover and 
-                entrada['timestamp'] == entrada_para_remover['timestamp']):
-                deve_manter = False
-                entrada_removida = True
-            
-            # Critério 2: Combinação exata de campos críticos
-            elif (entrada.get('data') == entrada_para_remover.get('data') and
-                  entrada.get('hora') == entrada_para_remover.get('hora') and
-                  entrada.get('nome_arquivo') == entrada_para_remover.get('nome_arquivo')):
-                
-                # Verificação adicional: comparar resumo se disponível
-                if ('resumo' in entrada and 'resumo' in entrada_para_remover):
-                    resumo_entrada = entrada['resumo']
-                    resumo_remover = entrada_para_remover['resumo']
-                    
-                    # Comparar alguns valores chave do resumo para garantir que é a mesma entrada
-                    if (resumo_entrada.get('valor_liquido') == resumo_remover.get('valor_liquido') and
-                        resumo_entrada.get('qtd_pgs') == resumo_remover.get('qtd_pgs')):
-                        deve_manter = False
-                        entrada_removida = True
-                else:
-                    # Se não tem resumo, remover mesmo assim pela combinação data+hora+nome
-                    deve_manter = False
-                    entrada_removida = True
-            
-            if deve_manter:
-                historico_filtrado.append(entrada)
+        entrada_removida = ('id' in entrada_para_remover
+                            and historico_padrao().remover(entrada_para_remover['id']))
         
         if entrada_removida:
-            # Salvar histórico atualizado
-            salvar_historico(historico_filtrado)
-            
             # Mostrar confirmação
             if flet_page and hasattr(flet_page, 'add') and callable(flet_page.add):
                 flet_page.add(ft.SnackBar(ft.Text("✓ Entrada removida do histórico"), bgcolor="#4caf50"))
@@ -124,29 +72,37 @@ def remover_entrada_historico(entrada_para_remover):
                 flet_page.update()
         return False
 
-def salvar_historico(historico):
-    try:
-        with open("historico.json", "w", encoding="utf-8") as f:
-            json.dump(historico, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"Erro ao salvar histórico: {e}")
 
 
+def formatar_moeda(valor):
+    return f"R$ {valor:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
 
-def adicionar_ao_historico(nome_arquivo, resumo_dados):
-    historico = carregar_historico()
-    nova_entrada = {
-        "data": datetime.now().strftime("%d/%m/%Y"),
-        "hora": datetime.now().strftime("%H:%M"),
-        "nome_arquivo": nome_arquivo,
-        "resumo": resumo_dados,
-        "timestamp": datetime.now().isoformat()
+def montar_resumo(total_paginas, intervalo, totais):
+    """
+    Resumo de uma análise no formato da tela de resumo e do histórico.
+    intervalo: (primeira, última) data com movimento ou None; totais: como em calcular_totais().
+    """
+    if intervalo:
+        primeira, ultima = intervalo
+        intervalo_datas = f"{primeira} - {ultima}" if primeira != ultima else primeira
+    else:
+        intervalo_datas = "Não identificado"
+    return {
+        "qtd_pgs": str(total_paginas) if total_paginas else "Não identificado",
+        "intervalo_datas": intervalo_datas,
+        "valor_liquido": formatar_moeda(totais['valor_liquido']),
+        "valor_demonstrativo": formatar_moeda(totais['total_demonstrativos']),
+        "valor_funarpen": formatar_moeda(totais['total_funarpen']),
+        "valor_issqn": formatar_moeda(totais['total_issqn'])
     }
-    historico.insert(0, nova_entrada)
-    if len(historico) > 50:
-        historico = historico[:50]
-    salvar_historico(historico)
-    return historico
+
+def adicionar_ao_historico(nome_arquivo, resumo_dados):
+    """Grava a análise no histórico e retorna a entrada criada (com o id dela)"""
+    try:
+        return historico_padrao().adicionar(nome_arquivo, resumo_dados)
+    except Exception as e:
+        print(f"Erro ao salvar histórico: {e}")
+        return None
 
 def validar_arquivo_pdf(file_path):
     try:
@@ -163,21 +119,27 @@ def validar_arquivo_pdf(file_path):
             header = f.read(8)
             if not header.startswith(b'%PDF-'):
                 return False, "Arquivo não é um PDF válido (cabeçalho inválido)."
-        if fitz:
-            try:
-                doc = fitz.open(file_path)
-                if doc.page_count == 0:
-                    doc.close()
-                    return False, "PDF não contém páginas."
-                doc.close()
-            except Exception as e:
-                return False, f"PDF corrompido ou inválido: {str(e)}"
-        return True, "PDF válido."
+        # A sessão aberta aqui é reaproveitada pela miniatura e pela análise
+        sessao = abrir_sessao(file_path)
+        valido, mensagem = sessao.validar()
+        if not valido:
+            fechar_sessoes(file_path)
+        return valido, mensagem
     except Exception as e:
         return False, f"Erro ao validar arquivo: {str(e)}"
 
+# Etapas fora do fluxo de um documento (início, histórico, upload): ao chegar nelas, a análise
+# especulativa é cancelada e a sessão do documento é fechada
+ETAPAS_FORA_DO_FLUXO = (1, 2, 3, 8)
+
+def sair_do_fluxo_se_preciso(etapa):
+    if etapa in ETAPAS_FORA_DO_FLUXO:
+        cancelar_analise_especulativa()
+        fechar_sessoes()
+
 def set_etapa(etapa):
     global estado, historico_navegacao, flet_page
+    sair_do_fluxo_se_preciso(etapa)
     if estado["etapa"] != etapa:
         if estado["etapa"] is not None:  # Só adiciona ao histórico se não for a primeira inicialização
             historico_navegacao.append(estado["etapa"])
@@ -186,7 +148,7 @@ def set_etapa(etapa):
     estado["etapa"] = etapa
     if flet_page is not None and hasattr(flet_page, 'controls') and flet_page.controls is not None:
         flet_page.controls.clear()
-    from app.screens import tela_boas_vindas, tela_historico, tela_upload, tela_confirmacao, tela_analisando, tela_resumo, tela_exportacao
+    from app.screens import tela_boas_vindas, tela_historico, tela_upload, tela_confirmacao, tela_analisando, tela_resumo, tela_exportacao, tela_fila
     if flet_page is not None and hasattr(flet_page, 'add'):
         if etapa == 1:
             flet_page.add(tela_boas_vindas())
@@ -202,6 +164,8 @@ def set_etapa(etapa):
             flet_page.add(tela_resumo())
         elif etapa == 7:
             flet_page.add(tela_exportacao())
+        elif etapa == 8:
+            flet_page.add(tela_fila())
         if hasattr(flet_page, 'update'):
             flet_page.update()
 
@@ -233,15 +197,18 @@ def voltar_pagina_anterior(e=None):
             etapa_anterior = 5
         elif etapa_atual == 7:  # Exportação -> Resumo
             etapa_anterior = 6
+        elif etapa_atual == 8:  # Fila -> Home
+            etapa_anterior = 1
         else:
             # Para qualquer outro caso, ir para home
             etapa_anterior = 1
     
     # Navegar para a etapa anterior
+    sair_do_fluxo_se_preciso(etapa_anterior)
     estado["etapa"] = etapa_anterior  # type: ignore
     if flet_page is not None and hasattr(flet_page, 'controls') and flet_page.controls is not None:
         flet_page.controls.clear()
-    from app.screens import tela_boas_vindas, tela_historico, tela_upload, tela_confirmacao, tela_analisando, tela_resumo, tela_exportacao
+    from app.screens import tela_boas_vindas, tela_historico, tela_upload, tela_confirmacao, tela_analisando, tela_resumo, tela_exportacao, tela_fila
     if flet_page is not None and hasattr(flet_page, 'add') and callable(flet_page.add):
         if etapa_anterior == 1:
             flet_page.add(tela_boas_vindas())
@@ -257,6 +224,8 @@ def voltar_pagina_anterior(e=None):
             flet_page.add(tela_resumo())
         elif etapa_anterior == 7:
             flet_page.add(tela_exportacao())
+        elif etapa_anterior == 8:
+            flet_page.add(tela_fila())
         if hasattr(flet_page, 'update') and callable(flet_page.update):
             flet_page.update()
 
@@ -438,25 +407,55 @@ def abrir_historico(e=None):
 def abrir_upload(e=None):
     set_etapa(3)
 
+def abrir_fila(e=None):
+    set_etapa(8)
+
+_fila = None
+
+def obter_fila():
+    """Fila de análise de vários arquivos; continua rodando quando o usuário sai da tela dela"""
+    global _fila
+    if _fila is None:
+        _fila = FilaAnalise(ao_concluir_arquivo=registrar_arquivo_da_fila)
+    return _fila
+
+def registrar_arquivo_da_fila(item):
+    """Entrada no histórico de cada arquivo analisado pela fila, como na análise de um arquivo"""
+    resultado = item.resultado
+    if resultado is None or resultado.status != STATUS_SUCESSO:
+        return
+    totais = {
+        'total_demonstrativos': resultado.total_demonstrativos,
+        'total_funarpen': resultado.total_funarpen,
+        'total_issqn': resultado.total_issqn,
+        'valor_liquido': resultado.valor_liquido,
+    }
+    resumo_dados = montar_resumo(resultado.total_paginas, resultado.intervalo_datas, totais)
+    adicionar_ao_historico(Path(resultado.caminho).stem, resumo_dados)
+
+def adicionar_arquivos_fila(caminhos):
+    arquivos, _ = expandir_entradas(caminhos)
+    novos = obter_fila().adicionar(arquivos)
+    if novos < len(caminhos) and flet_page is not None and hasattr(flet_page, 'add'):
+        ignorados = len(caminhos) - novos
+        flet_page.add(ft.SnackBar(ft.Text(f"{ignorados} arquivo(s) ignorado(s): já estão na fila ou não são PDF"),
+                                  bgcolor="#ff9800"))
+        if hasattr(flet_page, 'update'):
+            flet_page.update()
+    return novos
+
 def gerar_miniatura_pdf(pdf_path):
+    """Caminho do PNG da primeira página (do cache de miniaturas), gerado na hora se preciso"""
     if not fitz:
         return None
     try:
-        doc = fitz.open(pdf_path)
-        if doc.page_count == 0:
-            doc.close()
-            return None
-        page = doc[0]
-        matriz = fitz.Matrix(0.4, 0.4)
-        pixmap = page.get_pixmap(matrix=matriz)  # type: ignore
-        img_data = pixmap.tobytes("png")
-        doc.close()
-        import tempfile
-        temp_dir = tempfile.gettempdir()
-        nome_arquivo = Path(pdf_path).stem
-        temp_path = os.path.join(temp_dir, f"miniatura_{nome_arquivo}.png")
-        with open(temp_path, "wb") as f:
-            f.write(img_data)
-        return temp_path
+        return gerador_padrao().gerar(pdf_path)
     except Exception as e:
-        return None 
\ No newline at end of file
+        return None
+
+def solicitar_miniatura(pdf_path, ao_concluir):
+    """Gera a miniatura em segundo plano e chama ao_concluir(caminho ou None) quando terminar"""
+    if not fitz:
+        ao_concluir(None)
+        return
+    gerador_padrao().solicitar(pdf_path, ao_concluir)
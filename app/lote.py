@@ -0,0 +1,248 @@
+# app/lote.py
+# Análise em lote: expande caminhos, pastas e padrões glob em uma lista de PDFs,
+# analisa os arquivos em paralelo e grava o resumo do lote em results/.
+import csv
+import glob
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.analise_pdf import AnalisadorPDF
+
+# Códigos de saída do modo lote
+EXIT_SUCESSO = 0
+EXIT_FALHA_TOTAL = 1
+EXIT_FALHA_PARCIAL = 2
+
+STATUS_SUCESSO = "sucesso"
+STATUS_FALHA = "falha"
+STATUS_NAO_ENCONTRADO = "não encontrado"
+
+
+@dataclass
+class ResultadoArquivo:
+    caminho: str
+    status: str
+    mensagem: str = ""
+    paginas_com_valores: int = 0
+    qtd_demonstrativos: int = 0
+    qtd_funarpen: int = 0
+    qtd_issqn: int = 0
+    total_demonstrativos: Decimal = Decimal('0')
+    total_funarpen: Decimal = Decimal('0')
+    total_issqn: Decimal = Decimal('0')
+    valor_liquido: Decimal = Decimal('0')
+    duracao: float = 0.0
+    caminho_relatorio: str = ""
+    # Para o histórico da interface (fila de análise); não vão para o CSV do resumo
+    total_paginas: int = 0
+    intervalo_datas: Optional[Tuple[str, str]] = None
+
+
+@dataclass
+class ResumoLote:
+    resultados: List[ResultadoArquivo] = field(default_factory=list)
+    duracao: float = 0.0
+    caminho_resumo: str = ""
+
+    @property
+    def sucessos(self) -> int:
+        return sum(1 for r in self.resultados if r.status == STATUS_SUCESSO)
+
+    @property
+    def falhas(self) -> int:
+        return len(self.resultados) - self.sucessos
+
+    @property
+    def codigo_saida(self) -> int:
+        if not self.resultados or self.sucessos == 0:
+            return EXIT_FALHA_TOTAL
+        if self.falhas:
+            return EXIT_FALHA_PARCIAL
+        return EXIT_SUCESSO
+
+
+def eh_padrao_glob(entrada: str) -> bool:
+    return any(c in entrada for c in "*?[")
+
+
+def expandir_entradas(entradas: Sequence[str], recursivo: bool = False) -> Tuple[List[str], List[str]]:
+    """
+    Converte arquivos, pastas e padrões glob em uma lista ordenada e sem repetições de PDFs.
+    Retorna (pdfs, entradas_sem_correspondencia).
+    """
+    arquivos: List[str] = []
+    nao_encontradas: List[str] = []
+    vistos = set()
+
+    def adicionar(caminho: str):
+        chave = os.path.normcase(os.path.abspath(caminho))
+        if chave not in vistos:
+            vistos.add(chave)
+            arquivos.append(caminho)
+
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            padrao = "**/*" if recursivo else "*"
+            encontrados = sorted(
+                str(p) for p in Path(entrada).glob(padrao)
+                if p.is_file() and p.suffix.lower() == ".pdf"
+            )
+        elif eh_padrao_glob(entrada):
+            encontrados = sorted(
+                p for p in glob.glob(entrada, recursive=recursivo)
+                if os.path.isfile(p) and p.lower().endswith(".pdf")
+            )
+        elif os.path.isfile(entrada):
+            encontrados = [entrada]
+        else:
+            encontrados = []
+
+        if not encontrados:
+            nao_encontradas.append(entrada)
+        for caminho in encontrados:
+            adicionar(caminho)
+    return arquivos, nao_encontradas
+
+
+def nome_relatorio_unico(caminho_pdf: str) -> str:
+    """Nome do PDF com um sufixo curto do hash do caminho completo, para PDFs de mesmo nome em pastas diferentes"""
+    chave = os.path.normcase(os.path.abspath(caminho_pdf))
+    return f"{Path(caminho_pdf).stem}_{hashlib.sha1(chave.encode('utf-8')).hexdigest()[:8]}"
+
+
+def nomes_relatorio(arquivos: Sequence[str]) -> Dict[str, str]:
+    """
+    Nome base dos relatórios de cada PDF em results/: o nome do arquivo ou, quando dois PDFs do
+    lote têm o mesmo nome (pastas diferentes com --recursivo), nome_relatorio_unico para todos eles.
+    """
+    contagem: Dict[str, int] = {}
+    for caminho in arquivos:
+        chave = os.path.normcase(Path(caminho).stem)
+        contagem[chave] = contagem.get(chave, 0) + 1
+    return {
+        caminho: nome_relatorio_unico(caminho) if contagem[os.path.normcase(Path(caminho).stem)] > 1
+        else Path(caminho).stem
+        for caminho in arquivos
+    }
+
+
+def analisar_arquivo(caminho_pdf: str, motores: Optional[List[str]] = None,
+                     opcoes_analisador: Optional[Dict[str, Any]] = None,
+                     nome_saida: Optional[str] = None) -> ResultadoArquivo:
+    """
+    Analisa um PDF e grava seus relatórios; executado nos processos do pool do lote.
+    opcoes_analisador são repassadas ao construtor do AnalisadorPDF (ex.: cache).
+    nome_saida: nome base dos relatórios em results/ (padrão: o nome do PDF sem extensão).
+    """
+    nome_saida = nome_saida or Path(caminho_pdf).stem
+    inicio = time.perf_counter()
+    try:
+        analisador = AnalisadorPDF(caminho_pdf, motor=motores, **(opcoes_analisador or {}))
+        if not analisador.analisar_pdf():
+            mensagem = analisador.erro or "Falha na análise do PDF"
+            return ResultadoArquivo(caminho_pdf, STATUS_FALHA, mensagem, duracao=time.perf_counter() - inicio)
+        analisador.gerar_relatorio(caminho_pdf, retornar_texto=False, nome_saida=nome_saida)
+
+        totais = analisador.calcular_totais()
+        return ResultadoArquivo(
+            caminho=caminho_pdf,
+            status=STATUS_SUCESSO,
+            paginas_com_valores=len(set(v.pagina for v in analisador.valores_demonstrativos)),
+            qtd_demonstrativos=len(analisador.valores_demonstrativos),
+            qtd_funarpen=len(analisador.valores_funarpen),
+            qtd_issqn=len(analisador.valores_issqn),
+            total_demonstrativos=Decimal(totais['total_demonstrativos']),
+            total_funarpen=Decimal(totais['total_funarpen']),
+            total_issqn=Decimal(totais['total_issqn']),
+            valor_liquido=Decimal(totais['valor_liquido']),
+            duracao=time.perf_counter() - inicio,
+            caminho_relatorio=str(Path("results") / (nome_saida + "_relatorio.txt")),
+            total_paginas=analisador.total_paginas or 0,
+            intervalo_datas=analisador.indice_datas().intervalo(),
+        )
+    except Exception as e:
+        return ResultadoArquivo(caminho_pdf, STATUS_FALHA, str(e), duracao=time.perf_counter() - inicio)
+
+
+def gravar_resumo_lote(resumo: ResumoLote, pasta: str = "results") -> str:
+    """Grava o resumo do lote (um arquivo por linha, com status) em CSV separado por ';'"""
+    Path(pasta).mkdir(exist_ok=True)
+    nome = f"resumo_lote_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    caminho = Path(pasta) / nome
+    with open(caminho, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile, delimiter=';')
+        writer.writerow([
+            "Arquivo", "Status", "Mensagem", "Páginas com valores", "Qtde Demonstrativos",
+            "Qtde FUNARPEN", "Qtde ISSQN", "Valor Demonstrativo", "Valor Funarpen",
+            "Valor ISSQN", "Total Liquido", "Duração (s)", "Relatório",
+        ])
+        for r in resumo.resultados:
+            writer.writerow([
+                r.caminho,
+                r.status,
+                r.mensagem,
+                r.paginas_com_valores,
+                r.qtd_demonstrativos,
+                r.qtd_funarpen,
+                r.qtd_issqn,
+                f"{r.total_demonstrativos:.2f}",
+                f"{r.total_funarpen:.2f}",
+                f"{r.total_issqn:.2f}",
+                f"{r.valor_liquido:.2f}",
+                f"{r.duracao:.2f}",
+                r.caminho_relatorio,
+            ])
+        total_liquido = sum((r.valor_liquido for r in resumo.resultados if r.status == STATUS_SUCESSO), Decimal('0'))
+        writer.writerow([])
+        writer.writerow(["Total", f"{resumo.sucessos} sucesso(s), {resumo.falhas} falha(s)", "",
+                         "", "", "", "", "", "", "", f"{total_liquido:.2f}", f"{resumo.duracao:.2f}", ""])
+    return str(caminho)
+
+
+def analisar_lote(
+    entradas: Sequence[str],
+    motores: Optional[List[str]] = None,
+    jobs: int = 1,
+    recursivo: bool = False,
+    ao_concluir: Optional[Callable[[ResultadoArquivo, int, int], None]] = None,
+    opcoes_analisador: Optional[Dict[str, Any]] = None,
+) -> ResumoLote:
+    """
+    Analisa todos os PDFs das entradas com até `jobs` arquivos simultâneos.
+    ao_concluir(resultado, concluidos, total) é chamado à medida que cada arquivo termina.
+    """
+    inicio = time.perf_counter()
+    arquivos, nao_encontradas = expandir_entradas(entradas, recursivo)
+    nomes = nomes_relatorio(arquivos)
+    resultados = {caminho: None for caminho in arquivos}
+    total = len(arquivos)
+
+    concluidos = 0
+    if arquivos:
+        with ProcessPoolExecutor(max_workers=max(1, min(jobs, total))) as executor:
+            futuros = {executor.submit(analisar_arquivo, caminho, motores, opcoes_analisador, nomes[caminho]): caminho for caminho in arquivos}
+            for futuro in as_completed(futuros):
+                caminho = futuros[futuro]
+                try:
+                    resultado = futuro.result()
+                except Exception as e:
+                    resultado = ResultadoArquivo(caminho, STATUS_FALHA, str(e))
+                resultados[caminho] = resultado
+                concluidos += 1
+                if ao_concluir:
+                    ao_concluir(resultado, concluidos, total)
+
+    resumo = ResumoLote(
+        resultados=[resultados[c] for c in arquivos]
+        + [ResultadoArquivo(e, STATUS_NAO_ENCONTRADO, "Nenhum PDF encontrado") for e in nao_encontradas],
+        duracao=time.perf_counter() - inicio,
+    )
+    resumo.caminho_resumo = gravar_resumo_lote(resumo)
+    return resumo
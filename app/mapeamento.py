@@ -0,0 +1,111 @@
+# app/mapeamento.py
+# Entrada do PDF mapeada em memória: o arquivo é aberto uma vez e mapeado com mmap (somente
+# leitura). O PyMuPDF lê do mapeamento sem cópia (fitz.open(stream=...)), o PyPDF2 lê de um
+# mapeamento próprio do mesmo descritor (as mesmas páginas físicas, com posição de leitura
+# independente) e os processos worker criados por fork herdam descritor e mapeamento do
+# processo principal em vez de abrir o arquivo de novo.
+import mmap
+import os
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class DocumentoMapeado:
+    """
+    Mapeamento somente leitura de um PDF. dados() entrega uma visão sem cópia (para o fitz) e
+    fluxo() um arquivo com posição independente (para o PyPDF2); fechar() só deve ser chamado
+    depois que os extratores que usam o mapeamento forem fechados.
+    """
+
+    def __init__(self, caminho_pdf: str):
+        self.caminho_pdf = caminho_pdf
+        self._descritor: Optional[int] = None
+        self._mapa: Optional[mmap.mmap] = None
+        self._visoes: List[memoryview] = []
+
+    def abrir(self) -> "DocumentoMapeado":
+        if self._mapa is None:
+            self._descritor = os.open(self.caminho_pdf, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+            try:
+                self._mapa = mmap.mmap(self._descritor, 0, access=mmap.ACCESS_READ)
+            except Exception:
+                self.fechar()
+                raise
+        return self
+
+    @property
+    def tamanho(self) -> int:
+        return len(self._mapa) if self._mapa is not None else 0
+
+    def dados(self) -> memoryview:
+        visao = memoryview(self._mapa)
+        self._visoes.append(visao)
+        return visao
+
+    def fluxo(self) -> mmap.mmap:
+        """Outro mapeamento do mesmo arquivo: read/seek/tell em C, fechado pelo consumidor"""
+        return mmap.mmap(self._descritor, 0, access=mmap.ACCESS_READ)
+
+    def fechar(self):
+        for visao in self._visoes:
+            try:
+                visao.release()
+            except BufferError:
+                pass
+        self._visoes.clear()
+        if self._mapa is not None:
+            try:
+                self._mapa.close()
+            except BufferError:
+                # Alguma visão ainda está em uso: o mapeamento é desfeito quando ela for coletada
+                pass
+        self._mapa = None
+        if self._descritor is not None:
+            os.close(self._descritor)
+            self._descritor = None
+
+    def __enter__(self):
+        return self.abrir()
+
+    def __exit__(self, *args):
+        self.fechar()
+
+
+def mapear(caminho_pdf: str) -> Optional[DocumentoMapeado]:
+    """
+    Mapeia o arquivo; None se o mapeamento não for possível (arquivo vazio, sistema de arquivos
+    sem suporte), caso em que os extratores leem o arquivo pelo caminho, como antes.
+    Um arquivo inexistente continua gerando FileNotFoundError na abertura pelo extrator.
+    """
+    try:
+        return DocumentoMapeado(caminho_pdf).abrir()
+    except (OSError, ValueError):
+        return None
+
+
+# Mapeamentos do processo principal disponíveis aos workers: com o fork, o processo filho herda
+# este dicionário e os próprios mapeamentos, sem reabrir nem copiar o arquivo
+_compartilhados: Dict[str, DocumentoMapeado] = {}
+
+
+@contextmanager
+def compartilhar(mapeamento: Optional[DocumentoMapeado]):
+    """Deixa o mapeamento disponível, pelo caminho, aos processos criados dentro do bloco"""
+    if mapeamento is None:
+        yield
+        return
+    chave = os.path.abspath(mapeamento.caminho_pdf)
+    _compartilhados[chave] = mapeamento
+    try:
+        yield
+    finally:
+        if _compartilhados.get(chave) is mapeamento:
+            del _compartilhados[chave]
+
+
+def mapeamento_herdado(caminho_pdf: str) -> Optional[DocumentoMapeado]:
+    """Mapeamento herdado do processo principal (fork) ou, se não houver (spawn), um novo"""
+    herdado = _compartilhados.get(os.path.abspath(caminho_pdf))
+    if herdado is not None and herdado.tamanho:
+        return herdado
+    return mapear(caminho_pdf)
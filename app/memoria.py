@@ -0,0 +1,149 @@
+# app/memoria.py
+# Medição de memória de uma análise: RSS do processo (atual e pico) e, opcionalmente, o pico
+# de alocações Python pelo tracemalloc. Usa o psutil se estiver instalado; sem ele, lê
+# /proc/self/statm (Linux) e o módulo resource (Unix). Onde nada disso existe, os campos
+# ficam None. No modo paralelo, o PSS (páginas compartilhadas divididas entre os processos
+# que as usam) dá a memória do conjunto sem contar várias vezes o arquivo mapeado.
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+try:
+    import psutil  # type: ignore
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_TAMANHO_PAGINA_MEMORIA = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_atual() -> Optional[int]:
+    """Memória residente atual do processo, em bytes"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm", "rb") as arquivo:
+            return int(arquivo.read().split()[1]) * _TAMANHO_PAGINA_MEMORIA
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def pss_atual() -> Optional[int]:
+    """Memória proporcional (PSS) do processo, em bytes; só no Linux"""
+    if psutil is not None:
+        try:
+            return psutil.Process().memory_full_info().pss
+        except (AttributeError, psutil.Error):
+            pass
+    try:
+        with open("/proc/self/smaps_rollup", "rb") as arquivo:
+            for linha in arquivo:
+                if linha.startswith(b"Pss:"):
+                    return int(linha.split()[1]) * 1024
+    except (OSError, IndexError, ValueError):
+        pass
+    return None
+
+
+def pico_rss_processo() -> Optional[int]:
+    """Maior memória residente já atingida pelo processo desde o início, em bytes"""
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss vem em KB no Linux e em bytes no macOS
+        return pico if sys.platform == "darwin" else pico * 1024
+    if psutil is not None:
+        return getattr(psutil.Process().memory_info(), "peak_wset", None)
+    return None
+
+
+@dataclass
+class MedicaoMemoria:
+    """Memória de uma análise, em bytes (None quando a plataforma não informa)"""
+    rss_inicial: Optional[int] = None
+    rss_final: Optional[int] = None
+    # Maior RSS observado nas amostras feitas durante a análise
+    pico_rss: Optional[int] = None
+    # Pico do processo inteiro (ru_maxrss), que inclui o que veio antes da análise
+    pico_rss_processo: Optional[int] = None
+    # Pico das alocações Python, só com rastrear_alocacoes
+    pico_tracemalloc: Optional[int] = None
+    # Maior pico de RSS entre os processos worker, no modo paralelo
+    pico_rss_workers: Optional[int] = None
+    # PSS do processo principal e soma do maior PSS de cada worker, amostrados a cada bloco
+    # no modo paralelo (no serial, só ao fim); a soma dos dois é a memória do conjunto
+    pico_pss: Optional[int] = None
+    pss_workers: Optional[int] = None
+
+    def resumo(self) -> str:
+        def mb(valor: Optional[int]) -> str:
+            return f"{valor / 1024 / 1024:.1f} MB" if valor is not None else "n/d"
+        partes = [f"pico RSS {mb(self.pico_rss)}", f"RSS final {mb(self.rss_final)}",
+                  f"pico do processo {mb(self.pico_rss_processo)}"]
+        if self.pico_tracemalloc is not None:
+            partes.append(f"pico tracemalloc {mb(self.pico_tracemalloc)}")
+        if self.pico_rss_workers is not None:
+            partes.append(f"pico RSS dos workers {mb(self.pico_rss_workers)}")
+        if self.pico_pss is not None and self.pss_workers is not None:
+            partes.append(f"PSS total com os workers {mb(self.pico_pss + self.pss_workers)}")
+        return ", ".join(partes)
+
+
+class MedidorMemoria:
+    """
+    Acompanha a memória de uma análise: iniciar() antes, amostrar() a cada página ou bloco,
+    finalizar() ao fim. Com rastrear_alocacoes, liga o tracemalloc (se já não estiver ligado),
+    o que deixa a análise bem mais lenta.
+    """
+
+    def __init__(self, rastrear_alocacoes: bool = False):
+        self.rastrear_alocacoes = rastrear_alocacoes
+        self.medicao = MedicaoMemoria()
+        self._parar_tracemalloc = False
+        self._pss_workers: Dict[int, int] = {}
+
+    def iniciar(self) -> "MedidorMemoria":
+        self.medicao = MedicaoMemoria()
+        self._pss_workers = {}
+        if self.rastrear_alocacoes:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._parar_tracemalloc = True
+            tracemalloc.reset_peak()
+        self.medicao.rss_inicial = self.medicao.pico_rss = rss_atual()
+        return self
+
+    def amostrar(self):
+        rss = rss_atual()
+        if rss is not None and (self.medicao.pico_rss is None or rss > self.medicao.pico_rss):
+            self.medicao.pico_rss = rss
+
+    def amostrar_pss(self):
+        """Mais cara que amostrar() (lê /proc/self/smaps_rollup): feita por bloco, não por página"""
+        pss = pss_atual()
+        if pss is not None and (self.medicao.pico_pss is None or pss > self.medicao.pico_pss):
+            self.medicao.pico_pss = pss
+
+    def registrar_worker(self, pico_rss: Optional[int], pss: Optional[int] = None, pid: Optional[int] = None):
+        if pico_rss is not None and (self.medicao.pico_rss_workers is None or pico_rss > self.medicao.pico_rss_workers):
+            self.medicao.pico_rss_workers = pico_rss
+        if pss is not None and pid is not None:
+            self._pss_workers[pid] = max(pss, self._pss_workers.get(pid, 0))
+            self.medicao.pss_workers = sum(self._pss_workers.values())
+
+    def finalizar(self) -> MedicaoMemoria:
+        self.amostrar()
+        self.amostrar_pss()
+        self.medicao.rss_final = rss_atual()
+        self.medicao.pico_rss_processo = pico_rss_processo()
+        if self.rastrear_alocacoes and tracemalloc.is_tracing():
+            self.medicao.pico_tracemalloc = tracemalloc.get_traced_memory()[1]
+            if self._parar_tracemalloc:
+                tracemalloc.stop()
+                self._parar_tracemalloc = False
+        return self.medicao
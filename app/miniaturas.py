@@ -0,0 +1,136 @@
+# app/miniaturas.py
+# Miniaturas da primeira página para a tela de confirmação. Cada PNG é guardado numa pasta de
+# cache própria do aplicativo, dentro da pasta temporária do sistema, com o hash do conteúdo do
+# PDF no nome, então arquivos diferentes com o mesmo nome não se sobrescrevem e o mesmo
+# documento, renomeado ou movido, reaproveita a miniatura. A pasta é limitada em bytes: as
+# miniaturas usadas há mais tempo são apagadas, e nada fora dela é tocado. A geração roda numa
+# thread à parte, para a tela aparecer na hora com um marcador no lugar da imagem.
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+from app.sessao import abrir_sessao
+
+PASTA_MINIATURAS_PADRAO = os.path.join(tempfile.gettempdir(), "analisador_pdf_miniaturas")
+LIMITE_PADRAO_MB = 20
+ESCALA_PADRAO = 0.4
+
+
+class CacheMiniaturas:
+    """
+    Pasta de PNGs limitada em bytes, com a data de modificação de cada arquivo como último
+    acesso: um acerto a atualiza e, passado o limite, os arquivos mais antigos são apagados.
+    """
+
+    def __init__(self, pasta: str = PASTA_MINIATURAS_PADRAO, limite_mb: float = LIMITE_PADRAO_MB):
+        self.pasta = Path(pasta).resolve()
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+        self.remocoes = 0
+        self._trava = threading.Lock()
+
+    def caminho(self, chave: str) -> Path:
+        return self.pasta / f"{chave}.png"
+
+    def obter(self, chave: str) -> Optional[str]:
+        caminho = self.caminho(chave)
+        try:
+            os.utime(caminho)
+        except OSError:
+            return None
+        return str(caminho)
+
+    def gravar(self, chave: str, png: bytes) -> str:
+        caminho = self.caminho(chave)
+        with self._trava:
+            self.pasta.mkdir(parents=True, exist_ok=True)
+            # Gravação atômica: a tela nunca lê uma miniatura pela metade
+            temporario = caminho.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            temporario.write_bytes(png)
+            os.replace(temporario, caminho)
+            self._despejar(manter=caminho)
+        return str(caminho)
+
+    def _despejar(self, manter: Path):
+        arquivos = []
+        total = 0
+        for caminho in self.pasta.glob("*.png"):
+            try:
+                estado = caminho.stat()
+            except OSError:
+                continue
+            arquivos.append((estado.st_mtime, estado.st_size, caminho))
+            total += estado.st_size
+        arquivos.sort()
+        for _, tamanho, caminho in arquivos:
+            if total <= self.limite_bytes:
+                break
+            if caminho == manter:
+                continue
+            try:
+                caminho.unlink()
+            except OSError:
+                continue
+            total -= tamanho
+            self.remocoes += 1
+
+    def limpar(self):
+        with self._trava:
+            for caminho in self.pasta.glob("*.png"):
+                try:
+                    caminho.unlink()
+                except OSError:
+                    pass
+
+
+class GeradorMiniaturas:
+    """
+    Gera as miniaturas numa única thread em segundo plano, pela sessão do documento
+    (app/sessao.py), sem abrir o PDF de novo. solicitar() retorna na hora e chama ao_concluir
+    com o caminho do PNG (ou None, se não houver miniatura) quando ele estiver pronto.
+    """
+
+    def __init__(self, cache: Optional[CacheMiniaturas] = None, escala: float = ESCALA_PADRAO):
+        self.cache = cache if cache is not None else CacheMiniaturas()
+        self.escala = escala
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="miniaturas")
+
+    def gerar(self, caminho_pdf: str) -> Optional[str]:
+        """Caminho da miniatura do PDF, renderizada agora se não estiver no cache"""
+        sessao = abrir_sessao(caminho_pdf)
+        chave = f"{sessao.hash_conteudo()}_{self.escala:g}"
+        caminho = self.cache.obter(chave)
+        if caminho is not None:
+            return caminho
+        png = sessao.miniatura_png(self.escala)
+        if png is None:
+            return None
+        return self.cache.gravar(chave, png)
+
+    def solicitar(self, caminho_pdf: str, ao_concluir: Callable[[Optional[str]], None]) -> Future:
+        def tarefa():
+            try:
+                caminho = self.gerar(caminho_pdf)
+            except Exception:
+                caminho = None
+            ao_concluir(caminho)
+            return caminho
+        return self._executor.submit(tarefa)
+
+    def encerrar(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_gerador: Optional[GeradorMiniaturas] = None
+_trava_gerador = threading.Lock()
+
+
+def gerador_padrao() -> GeradorMiniaturas:
+    global _gerador
+    with _trava_gerador:
+        if _gerador is None:
+            _gerador = GeradorMiniaturas()
+        return _gerador
+
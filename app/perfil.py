@@ -0,0 +1,119 @@
+# app/perfil.py
+# Perfil de uma análise: tempo gasto em cada etapa (abertura do PDF, extração do texto,
+# pré-filtro, varredura, agregação, relatório) e as páginas de extração mais lenta.
+# Ativado pelo AnalisadorPDF(perfilar=True) ou pela opção --profile da linha de comando.
+import cProfile
+import heapq
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+ETAPA_ABERTURA = "abertura do PDF"
+ETAPA_DETECCAO = "detecção do layout"
+ETAPA_CHECKPOINT = "checkpoint"
+ETAPA_PREFILTRO = "pré-filtro"
+ETAPA_EXTRACAO = "extração do texto"
+ETAPA_VARREDURA = "varredura"
+ETAPA_AGREGACAO = "agregação"
+ETAPA_RELATORIO = "relatório"
+
+# Ordem das linhas na tabela; etapas fora da lista vêm depois, na ordem em que apareceram
+ORDEM_ETAPAS = (ETAPA_ABERTURA, ETAPA_DETECCAO, ETAPA_CHECKPOINT, ETAPA_PREFILTRO, ETAPA_EXTRACAO,
+                ETAPA_VARREDURA, ETAPA_AGREGACAO, ETAPA_RELATORIO)
+
+PAGINAS_LENTAS_PADRAO = 10
+
+
+class PerfilAnalise:
+    """
+    Acumula segundos e chamadas por etapa e guarda as paginas_lentas páginas com maior
+    tempo de extração. Perfis dos processos worker são somados com mesclar.
+    """
+
+    def __init__(self, paginas_lentas: int = PAGINAS_LENTAS_PADRAO):
+        self.paginas_lentas = paginas_lentas
+        self.etapas: Dict[str, List[float]] = {}
+        # Heap mínimo de (segundos, página): a raiz é a mais rápida entre as mais lentas
+        self._paginas: List[Tuple[float, int]] = []
+        self.processos = 1
+        self._ativas = set()
+
+    def registrar(self, etapa: str, segundos: float, chamadas: int = 1):
+        acumulado = self.etapas.get(etapa)
+        if acumulado is None:
+            self.etapas[etapa] = [segundos, chamadas]
+        else:
+            acumulado[0] += segundos
+            acumulado[1] += chamadas
+
+    @contextmanager
+    def medir(self, etapa: str) -> Iterator[None]:
+        """Mede o bloco como uma chamada da etapa; chamadas aninhadas da mesma etapa não contam de novo"""
+        if etapa in self._ativas:
+            yield
+            return
+        self._ativas.add(etapa)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._ativas.discard(etapa)
+            self.registrar(etapa, time.perf_counter() - inicio)
+
+    def registrar_pagina(self, pagina: int, segundos: float):
+        """Tempo de extração de uma página: entra na etapa de extração e no ranking das mais lentas"""
+        self.registrar(ETAPA_EXTRACAO, segundos)
+        self._ranquear(pagina, segundos)
+
+    def _ranquear(self, pagina: int, segundos: float):
+        if len(self._paginas) < self.paginas_lentas:
+            heapq.heappush(self._paginas, (segundos, pagina))
+        elif self._paginas and segundos > self._paginas[0][0]:
+            heapq.heapreplace(self._paginas, (segundos, pagina))
+
+    def mesclar(self, outro: "PerfilAnalise"):
+        for etapa, (segundos, chamadas) in outro.etapas.items():
+            self.registrar(etapa, segundos, chamadas)
+        for segundos, pagina in outro._paginas:
+            self._ranquear(pagina, segundos)
+
+    def paginas_mais_lentas(self) -> List[Tuple[int, float]]:
+        """(página, segundos de extração), da mais lenta para a mais rápida"""
+        return [(pagina, segundos) for segundos, pagina in sorted(self._paginas, reverse=True)]
+
+    def tabela(self, tempo_total: Optional[float] = None) -> str:
+        """Tabela compacta com as etapas e as páginas mais lentas; tempo_total é o tempo de relógio da execução"""
+        etapas = sorted(self.etapas.items(), key=lambda item: (
+            ORDEM_ETAPAS.index(item[0]) if item[0] in ORDEM_ETAPAS else len(ORDEM_ETAPAS)
+        ))
+        soma = sum(segundos for segundos, _ in self.etapas.values()) or 1.0
+        linhas = [f"{'Etapa':<20} {'Tempo (s)':>10} {'%':>6} {'Chamadas':>9} {'ms/chamada':>11}",
+                  "-" * 60]
+        for etapa, (segundos, chamadas) in etapas:
+            linhas.append(f"{etapa:<20} {segundos:>10.3f} {segundos / soma * 100:>6.1f} {int(chamadas):>9} "
+                          f"{segundos / chamadas * 1000 if chamadas else 0:>11.2f}")
+        if self.processos > 1:
+            linhas.append(f"(tempos das páginas somados entre {self.processos} processos)")
+        if tempo_total is not None:
+            linhas.append(f"{'total (relógio)':<20} {tempo_total:>10.3f}")
+        paginas = self.paginas_mais_lentas()
+        if paginas:
+            linhas.append("")
+            linhas.append("Páginas de extração mais lenta:")
+            linhas.extend(f"  Página {pagina:>6}: {segundos * 1000:9.2f} ms" for pagina, segundos in paginas)
+        return "\n".join(linhas)
+
+
+@contextmanager
+def perfil_cprofile(caminho: Optional[str]) -> Iterator[Optional[cProfile.Profile]]:
+    """Executa o bloco sob o cProfile e grava as estatísticas (formato pstats) em caminho; sem caminho, nada é feito"""
+    if not caminho:
+        yield None
+        return
+    perfil = cProfile.Profile()
+    perfil.enable()
+    try:
+        yield perfil
+    finally:
+        perfil.disable()
+        perfil.dump_stats(caminho)
@@ -0,0 +1,146 @@
+# app/perfis.py
+# Perfis de layout: para cada cedente/layout, o campo bancário que identifica as páginas do
+# demonstrativo e os gatilhos das linhas de valor. Os perfis são lidos dos arquivos JSON de
+# perfis/ e o perfil de cada documento é detectado pelas primeiras páginas, com um único
+# padrão pré-compilado que procura os campos bancários de todos os perfis de uma vez.
+import hashlib
+import json
+import re
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+PASTA_PERFIS_PADRAO = Path(__file__).resolve().parent.parent / "perfis"
+NOME_PERFIL_PADRAO = "padrao"
+
+# Páginas examinadas, no máximo, até alguma conter o campo bancário de um perfil
+PAGINAS_DETECCAO = 10
+
+_CAMPOS_OBRIGATORIOS = ("nome", "campo_bancario", "gatilho_demonstrativo", "gatilho_funarpen", "gatilho_issqn")
+
+
+@dataclass(frozen=True)
+class PerfilLayout:
+    nome: str
+    campo_bancario: str
+    gatilho_demonstrativo: str
+    gatilho_funarpen: str
+    gatilho_issqn: str
+    descricao: str = ""
+
+    def assinatura(self) -> str:
+        """Hash do conteúdo do perfil: muda se qualquer campo usado na varredura mudar"""
+        dados = json.dumps(asdict(self), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(dados.encode("utf-8")).hexdigest()[:16]
+
+
+# Layout original do demonstrativo, usado se a pasta de perfis não tiver o perfil padrão
+PERFIL_EMBUTIDO = PerfilLayout(
+    nome=NOME_PERFIL_PADRAO,
+    campo_bancario="Ag./Cod. Cedente: 3162/730791-8",
+    gatilho_demonstrativo="Valor Demonstrativo:",
+    gatilho_funarpen="FUNARPEN",
+    gatilho_issqn="ISSQN - Imposto sobre Serviços de Qualquer Natureza",
+    descricao="Demonstrativo de boletos do cedente 3162/730791-8",
+)
+
+
+def carregar_perfil(caminho: Union[str, Path]) -> PerfilLayout:
+    """Lê um perfil JSON; ValueError se o arquivo não tiver os campos esperados"""
+    caminho = Path(caminho)
+    try:
+        dados = json.loads(caminho.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        raise ValueError(f"perfil inválido em {caminho}: {e}") from e
+    if not isinstance(dados, dict):
+        raise ValueError(f"perfil inválido em {caminho}: esperado um objeto JSON")
+    faltando = [campo for campo in _CAMPOS_OBRIGATORIOS if not isinstance(dados.get(campo), str) or not dados[campo]]
+    if faltando:
+        raise ValueError(f"perfil inválido em {caminho}: faltam {', '.join(faltando)}")
+    return PerfilLayout(**{campo: dados[campo] for campo in _CAMPOS_OBRIGATORIOS},
+                        descricao=str(dados.get("descricao", "")))
+
+
+class RegistroPerfis:
+    """
+    Conjunto de perfis por nome. O detector é uma única expressão regular com a alternância
+    dos campos bancários (os mais longos primeiro, para um campo que é prefixo de outro não
+    vencer), então cada página é percorrida uma vez qualquer que seja a quantidade de perfis.
+    """
+
+    def __init__(self, perfis: Iterable[PerfilLayout]):
+        self.perfis: Dict[str, PerfilLayout] = {}
+        self._por_campo: Dict[str, PerfilLayout] = {}
+        for perfil in perfis:
+            if perfil.nome in self.perfis:
+                raise ValueError(f"perfil duplicado: {perfil.nome}")
+            if perfil.campo_bancario in self._por_campo:
+                raise ValueError(f"os perfis {self._por_campo[perfil.campo_bancario].nome} e {perfil.nome} "
+                                 f"têm o mesmo campo bancário")
+            self.perfis[perfil.nome] = perfil
+            self._por_campo[perfil.campo_bancario] = perfil
+        campos = sorted(self._por_campo, key=len, reverse=True)
+        self._detector = re.compile("|".join(map(re.escape, campos))) if campos else None
+
+    @classmethod
+    def da_pasta(cls, pasta: Union[str, Path] = PASTA_PERFIS_PADRAO) -> "RegistroPerfis":
+        """Perfis de todos os *.json da pasta; o perfil embutido entra se não houver um 'padrao'"""
+        perfis = [carregar_perfil(caminho) for caminho in sorted(Path(pasta).glob("*.json"))]
+        if not any(perfil.nome == NOME_PERFIL_PADRAO for perfil in perfis):
+            perfis.insert(0, PERFIL_EMBUTIDO)
+        return cls(perfis)
+
+    def __len__(self) -> int:
+        return len(self.perfis)
+
+    def __iter__(self):
+        return iter(self.perfis.values())
+
+    def obter(self, nome: str) -> PerfilLayout:
+        try:
+            return self.perfis[nome]
+        except KeyError:
+            raise ValueError(f"perfil desconhecido: {nome} (disponíveis: {', '.join(self.perfis)})") from None
+
+    @property
+    def padrao(self) -> PerfilLayout:
+        return self.perfis.get(NOME_PERFIL_PADRAO) or next(iter(self.perfis.values()))
+
+    def contagem_campos(self, texto: str) -> Dict[str, int]:
+        """Ocorrências do campo bancário de cada perfil no texto, numa única passagem"""
+        contagem: Dict[str, int] = {}
+        if self._detector is not None:
+            for casamento in self._detector.finditer(texto):
+                nome = self._por_campo[casamento.group(0)].nome
+                contagem[nome] = contagem.get(nome, 0) + 1
+        return contagem
+
+    def detectar(self, textos: Iterable[str]) -> Tuple[Optional[PerfilLayout], int]:
+        """
+        Examina os textos das páginas em ordem até o primeiro com algum campo bancário e
+        devolve o perfil com mais ocorrências nele (no empate, o de ocorrência mais cedo),
+        junto com a quantidade de páginas examinadas. (None, n) se nenhum perfil apareceu.
+        """
+        examinadas = 0
+        for texto in textos:
+            examinadas += 1
+            contagem = self.contagem_campos(texto)
+            if contagem:
+                # dict preserva a ordem de inserção, que é a ordem da primeira ocorrência
+                nome = max(contagem, key=contagem.get)
+                return self.perfis[nome], examinadas
+        return None, examinadas
+
+    def nomes(self) -> List[str]:
+        return list(self.perfis)
+
+
+@lru_cache(maxsize=8)
+def _registro_da_pasta(pasta: str) -> RegistroPerfis:
+    return RegistroPerfis.da_pasta(pasta)
+
+
+def registro_padrao(pasta: Union[str, Path, None] = None) -> RegistroPerfis:
+    """Registro da pasta de perfis, lido uma vez por processo"""
+    return _registro_da_pasta(str(pasta if pasta is not None else PASTA_PERFIS_PADRAO))
@@ -0,0 +1,105 @@
+# app/prefiltro.py
+# Pré-filtro de páginas: decide de forma barata se uma página pode conter o campo
+# bancário antes de pagar a extração completa pelo motor principal.
+import unicodedata
+from contextlib import nullcontext
+from typing import Optional
+
+try:
+    import fitz  # type: ignore
+except ImportError:
+    fitz = None
+
+# O get_text padrão do fitz só devolve o texto dentro da CropBox, e o PyPDF2 lê a página inteira:
+# sem TEXT_MEDIABOX_CLIP e com um recorte infinito, o filtro vê todo o texto que o motor principal vê
+FLAGS_TEXTO_COMPLETO = (fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_MEDIABOX_CLIP) if fitz is not None else 0
+
+
+def compactar_texto(texto: str) -> str:
+    """
+    Forma normalizada usada na comparação: NFKC, sem diferença de maiúsculas e sem espaços.
+    Cada transformação só torna a comparação mais permissiva, nunca mais restritiva.
+    """
+    return "".join(unicodedata.normalize("NFKC", texto).casefold().split())
+
+
+class PreFiltroPaginas:
+    """
+    Usa o texto do PyMuPDF (em C, muito mais rápido que o PyPDF2) para descartar páginas
+    que não podem conter o termo. A página é descartada se o termo compactado não aparecer
+    no texto compactado dela, extraído da página inteira, inclusive fora da CropBox; em
+    qualquer erro ela é mantida como candidata. Os motores costumam diferir só em espaços e
+    quebras de linha, que a compactação ignora, mas a leitura do PyMuPDF não é garantidamente
+    a mesma do PyPDF2: o modo de verificação do AnalisadorPDF extrai as páginas descartadas
+    mesmo assim e conta qualquer divergência.
+    Com uma SessaoDocumento (app/sessao.py), o documento do PyMuPDF dela é usado, sob a trava
+    da sessão, em vez de o PDF ser interpretado de novo; fechar() só fecha o documento que o
+    próprio filtro abriu.
+    """
+
+    def __init__(self, caminho_pdf: str, termo: str, mapeamento=None, sessao=None):
+        self.caminho_pdf = caminho_pdf
+        self.mapeamento = mapeamento
+        self.sessao = sessao
+        self.termo = termo
+        self._termo_compacto = compactar_texto(termo)
+        self._doc = None
+        self._doc_proprio = False
+        self.paginas_descartadas = 0
+
+    @staticmethod
+    def disponivel() -> bool:
+        return fitz is not None
+
+    def abrir(self):
+        if self._doc is None:
+            if self.sessao is not None:
+                self._doc = self.sessao.documento()
+                return self
+            if self.mapeamento is not None:
+                self._doc = fitz.open(stream=self.mapeamento.dados(), filetype="pdf")
+            else:
+                self._doc = fitz.open(self.caminho_pdf)
+            self._doc_proprio = True
+        return self
+
+    def pode_conter(self, indice: int) -> bool:
+        """False quando o termo não aparece no texto do PyMuPDF da página inteira"""
+        try:
+            # O documento da sessão também é usado pela miniatura, em outra thread
+            with self.sessao.trava if self.sessao is not None else nullcontext():
+                texto = self._doc[indice].get_text("text", flags=FLAGS_TEXTO_COMPLETO, clip=fitz.INFINITE_RECT())
+        except Exception:
+            return True
+        if self._termo_compacto in compactar_texto(texto):
+            return True
+        self.paginas_descartadas += 1
+        return False
+
+    def fechar(self):
+        if self._doc is not None and self._doc_proprio:
+            self._doc.close()
+        self._doc = None
+        self._doc_proprio = False
+
+    def __enter__(self):
+        return self.abrir()
+
+    def __exit__(self, *args):
+        self.fechar()
+
+
+def criar_prefiltro(caminho_pdf: str, termo: str, motor_principal: str,
+                    mapeamento=None, sessao=None) -> Optional[PreFiltroPaginas]:
+    """
+    Cria o pré-filtro quando ele compensa: com o fitz como motor principal a extração completa
+    já custa o mesmo que o filtro, então não há pré-filtro. Com a sessão do documento, o
+    pré-filtro usa o documento já interpretado dela; com o mapeamento, lê dele em vez de abrir
+    o arquivo de novo.
+    """
+    if motor_principal == "fitz" or not PreFiltroPaginas.disponivel():
+        return None
+    try:
+        return PreFiltroPaginas(caminho_pdf, termo, mapeamento, sessao).abrir()
+    except Exception:
+        return None
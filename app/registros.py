@@ -0,0 +1,180 @@
+# app/registros.py
+# Armazenamento compacto dos registros extraídos: uma coluna por campo em arrays da
+# biblioteca padrão, em vez de uma instância de dataclass (com Decimal e string próprios)
+# por registro. Os dataclasses continuam disponíveis, criados sob demanda na leitura.
+from array import array
+from collections.abc import Sequence
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, Optional
+
+# Marcadores da coluna de datas (ordinais válidos de date começam em 1)
+DATA_VAZIA = 0
+DATA_EXCECAO = -1
+
+# Maior valor em centavos que cabe na coluna de inteiros de 64 bits
+_LIMITE_CENTAVOS = 2 ** 63 - 1
+
+
+def data_para_ordinal(data: str) -> Optional[int]:
+    """'DD/MM/AAAA' para o ordinal de datetime.date; None se não for uma data válida"""
+    try:
+        dia, mes, ano = data.split("/")
+        if len(dia) != 2 or len(mes) != 2 or len(ano) != 4:
+            return None
+        return date(int(ano), int(mes), int(dia)).toordinal()
+    except ValueError:
+        return None
+
+
+def ordinal_para_data(ordinal: int) -> str:
+    d = date.fromordinal(ordinal)
+    return f"{d.day:02d}/{d.month:02d}/{d.year:04d}"
+
+
+def decimal_para_centavos(valor: Optional[Decimal]) -> Optional[int]:
+    """Centavos exatos de valores com duas casas (o formato R$ 1.234,56); None nos demais casos"""
+    if valor is None or not valor.is_finite() or valor.as_tuple().exponent != -2:
+        return None
+    centavos = int(valor.scaleb(2))
+    if abs(centavos) > _LIMITE_CENTAVOS:
+        return None
+    return centavos
+
+
+class ArmazemRegistros(Sequence):
+    """
+    Lista de registros (ValorDemonstrativo, ValorFunarpen ou ValorIssqn) guardada em colunas:
+    página, valor em centavos, data como ordinal e índice da linha de origem. As linhas ficam
+    num único buffer UTF-8 com a posição inicial de cada uma; linhas repetidas na mesma página
+    (como a linha vizinha usada por mais de um registro FUNARPEN) são guardadas uma vez só.
+    Indexar ou iterar devolve instâncias novas do dataclass, iguais às que foram incluídas.
+
+    Valores que não têm exatamente duas casas decimais (ou None, no ISSQN) e datas fora do
+    formato DD/MM/AAAA ficam num dicionário de exceções, para a leitura ser sempre exata.
+
+    `versao` aumenta a cada alteração, para quem guarda resultados calculados sobre os registros.
+    """
+
+    def __init__(self, classe, registros: Iterable = ()):
+        self.classe = classe
+        self.versao = 0
+        self._inicializar_colunas()
+        self.extend(registros)
+
+    def _inicializar_colunas(self):
+        self.paginas = array('i')
+        self.centavos = array('q')
+        self.datas = array('i')
+        self._linhas = array('i')
+        self._buffer_textos = bytearray()
+        self._inicios_textos = array('q')
+        # Só as linhas da página atual são consultadas ao internar, para o índice não crescer
+        self._pagina_textos = None
+        self._textos_pagina: Dict[str, int] = {}
+        self.valores_excecao: Dict[int, Optional[Decimal]] = {}
+        self.datas_excecao: Dict[int, str] = {}
+        self._ordinais: Dict[str, int] = {}
+        self._datas_por_ordinal: Dict[int, str] = {}
+
+    def _ordinal(self, data: str) -> Optional[int]:
+        ordinal = self._ordinais.get(data)
+        if ordinal is None:
+            ordinal = DATA_VAZIA if data == "" else data_para_ordinal(data)
+            if ordinal is None:
+                return None
+            self._ordinais[data] = ordinal
+            self._datas_por_ordinal[ordinal] = data
+        return ordinal
+
+    def _internar(self, linha: str, pagina: int) -> int:
+        if pagina != self._pagina_textos:
+            self._pagina_textos = pagina
+            self._textos_pagina = {}
+        indice = self._textos_pagina.get(linha)
+        if indice is None:
+            indice = len(self._inicios_textos)
+            self._inicios_textos.append(len(self._buffer_textos))
+            self._buffer_textos += linha.encode("utf-8")
+            self._textos_pagina[linha] = indice
+        return indice
+
+    def _texto(self, indice: int) -> str:
+        inicio = self._inicios_textos[indice]
+        fim = self._inicios_textos[indice + 1] if indice + 1 < len(self._inicios_textos) else len(self._buffer_textos)
+        return self._buffer_textos[inicio:fim].decode("utf-8")
+
+    def append(self, registro):
+        self.versao += 1
+        posicao = len(self.paginas)
+        self.paginas.append(registro.pagina)
+
+        centavos = decimal_para_centavos(registro.valor)
+        if centavos is None:
+            self.valores_excecao[posicao] = registro.valor
+            centavos = 0
+        self.centavos.append(centavos)
+
+        ordinal = self._ordinal(registro.data_pagamento)
+        if ordinal is None:
+            self.datas_excecao[posicao] = registro.data_pagamento
+            ordinal = DATA_EXCECAO
+        self.datas.append(ordinal)
+
+        self._linhas.append(self._internar(registro.linha_completa, registro.pagina))
+
+    def extend(self, registros: Iterable):
+        for registro in registros:
+            self.append(registro)
+
+    def clear(self):
+        self.versao += 1
+        self._inicializar_colunas()
+
+    def valor(self, posicao: int) -> Optional[Decimal]:
+        if posicao in self.valores_excecao:
+            return self.valores_excecao[posicao]
+        return Decimal(self.centavos[posicao]).scaleb(-2)
+
+    def data(self, posicao: int) -> str:
+        ordinal = self.datas[posicao]
+        if ordinal == DATA_EXCECAO:
+            return self.datas_excecao[posicao]
+        if ordinal == DATA_VAZIA:
+            return ""
+        data = self._datas_por_ordinal.get(ordinal)
+        if data is None:
+            data = self._datas_por_ordinal[ordinal] = ordinal_para_data(ordinal)
+        return data
+
+    def _registro(self, posicao: int):
+        return self.classe(
+            self.paginas[posicao],
+            self._texto(self._linhas[posicao]),
+            self.valor(posicao),
+            self.data(posicao),
+        )
+
+    def __len__(self) -> int:
+        return len(self.paginas)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self._registro(p) for p in range(*indice.indices(len(self)))]
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError("índice de registro fora do intervalo")
+        return self._registro(indice)
+
+    def __iter__(self) -> Iterator:
+        for posicao in range(len(self.paginas)):
+            yield self._registro(posicao)
+
+    def __eq__(self, outro) -> bool:
+        if isinstance(outro, (ArmazemRegistros, list)):
+            return len(self) == len(outro) and all(a == b for a, b in zip(self, outro))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ArmazemRegistros({self.classe.__name__}, {len(self)} registros)"
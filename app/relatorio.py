@@ -0,0 +1,155 @@
+# app/relatorio.py
+# Escrita do relatório em fluxo: cada linha do TXT vai direto para os arquivos de saída e as
+# linhas da planilha CSV são gravadas na mesma passagem, durante a seção de totais diários,
+# sem montar o relatório inteiro em memória.
+import csv
+import logging
+from typing import Optional, Sequence, TextIO
+
+logger = logging.getLogger("app.relatorio")
+
+CABECALHO_CSV = ["Data", "Valor Demonstrativo", "Valor Funarpen", "Valor ISSQN", "Total Liquido", "Total Líquido Geral"]
+
+
+def _paginas_distintas(registros) -> int:
+    # O ArmazemRegistros tem a coluna de páginas; listas simples são percorridas
+    paginas = getattr(registros, "paginas", None)
+    if paginas is None:
+        paginas = (v.pagina for v in registros)
+    return len(set(paginas))
+
+
+class EscritorRelatorio:
+    """
+    Escreve o relatório TXT em uma ou mais saídas de texto (arquivo, console, StringIO) e,
+    se houver, a planilha CSV dos totais diários, tudo numa única passagem pelos registros.
+    O texto produzido é o mesmo de "\\n".join das linhas, sem quebra de linha no final.
+    Um erro ao gravar ou fechar a planilha é registrado no log e encerra só a planilha
+    (falha_csv fica True); o TXT continua sendo escrito.
+    """
+
+    def __init__(self, saidas_txt: Sequence[TextIO], saida_csv: Optional[TextIO] = None,
+                 documento: Optional[str] = None):
+        self.saidas_txt = list(saidas_txt)
+        self.saida_csv = saida_csv
+        self.documento = documento
+        self.falha_csv = False
+        self._escritor_csv = csv.writer(saida_csv, delimiter=';') if saida_csv is not None else None
+        self._primeira_linha = True
+
+    def _linha(self, texto: str = ""):
+        if not self._primeira_linha:
+            texto = "\n" + texto
+        self._primeira_linha = False
+        for saida in self.saidas_txt:
+            saida.write(texto)
+
+    def _linha_csv(self, linha: list):
+        if self._escritor_csv is None:
+            return
+        try:
+            self._escritor_csv.writerow(linha)
+        except (OSError, csv.Error) as e:
+            self._abandonar_csv(e)
+
+    def _abandonar_csv(self, erro: Exception):
+        logger.error("Erro ao salvar planilha CSV: %s", erro, extra={"documento": self.documento})
+        self.falha_csv = True
+        self._escritor_csv = None
+        saida, self.saida_csv = self.saida_csv, None
+        if saida is not None:
+            try:
+                saida.close()
+            except OSError:
+                # O mesmo erro, ao descarregar o buffer: já registrado
+                pass
+
+    def fechar_csv(self):
+        """Fecha a planilha; um erro ao fechar (gravando o fim do buffer) é tratado como os de escrita"""
+        if self.saida_csv is None:
+            return
+        try:
+            self.saida_csv.close()
+            self.saida_csv = None
+        except OSError as e:
+            self._abandonar_csv(e)
+
+    def _secao_registros(self, titulo: str, registros, vazio: str, valor_opcional: bool = False):
+        self._linha(titulo)
+        self._linha("-" * 50)
+        if registros:
+            for valor in registros:
+                self._linha(f"Página {valor.pagina}: {valor.linha_completa}")
+                if valor_opcional and not valor.valor:
+                    self._linha("  Valor: Não identificado")
+                else:
+                    self._linha(f"  Valor: R$ {valor.valor:,.2f}")
+                    self._linha(f"  Data de pagamento: {valor.data_pagamento}")
+                self._linha()
+        else:
+            self._linha(vazio)
+        self._linha()
+
+    def escrever(self, analisador):
+        """Escreve o relatório completo do analisador (após analisar_pdf)"""
+        totais = analisador.calcular_totais()
+        totais_diarios = analisador.calcular_totais_diarios()
+
+        self._linha_csv(CABECALHO_CSV)
+
+        self._linha("=" * 80)
+        self._linha("RELATÓRIO DE ANÁLISE DE PDF - VALORES FINANCEIROS")
+        self._linha("=" * 80)
+        self._linha()
+
+        # Seções 1 a 3: registros extraídos
+        self._secao_registros("1. VALORES DEMONSTRATIVOS CONSIDERADOS", analisador.valores_demonstrativos,
+                              "Nenhum valor demonstrativo encontrado.")
+        self._secao_registros("2. VALORES SUBTRAÍDOS POR FUNARPEN", analisador.valores_funarpen,
+                              "Nenhum valor FUNARPEN encontrado.")
+        self._secao_registros("3. VALORES SUBTRAÍDOS POR CONTER ISSQN", analisador.valores_issqn,
+                              "Nenhum valor ISSQN encontrado.", valor_opcional=True)
+
+        # Seção 4: Totais Diários, que também são as linhas da planilha
+        self._linha("4. TOTAIS DIÁRIOS")
+        self._linha("-" * 50)
+        if totais_diarios:
+            for indice, total in enumerate(totais_diarios):
+                self._linha(f"Data: {total.data}")
+                self._linha(f"  Demonstrativos: R$ {total.demonstrativos:,.2f}")
+                self._linha(f"  Subtrações FUNARPEN: R$ {total.funarpen:,.2f}")
+                self._linha(f"  Subtrações ISSQN: R$ {total.issqn:,.2f}")
+                self._linha(f"  Valor líquido diário: R$ {total.valor_liquido:,.2f}")
+                self._linha()
+                self._linha_csv([
+                    total.data,
+                    f"{total.demonstrativos:.2f}",
+                    f"{total.funarpen:.2f}",
+                    f"{total.issqn:.2f}",
+                    f"{total.valor_liquido:.2f}",
+                    # A soma dos líquidos diários é o próprio líquido consolidado
+                    f"{totais['valor_liquido']:.2f}" if indice == 0 else ""
+                ])
+        else:
+            self._linha("Nenhum total diário calculado.")
+        self._linha()
+
+        # Seção 5: Resumo Consolidado
+        self._linha("5. RESUMO CONSOLIDADO")
+        self._linha("-" * 50)
+        self._linha(f"Total de valores demonstrativos: R$ {totais['total_demonstrativos']:,.2f}")
+        self._linha(f"Total de subtrações FUNARPEN: R$ {totais['total_funarpen']:,.2f}")
+        self._linha(f"Total de valores ISSQN: R$ {totais['total_issqn']:,.2f}")
+        self._linha(f"Valor líquido final: R$ {totais['valor_liquido']:,.2f}")
+        self._linha()
+
+        # Estatísticas
+        self._linha("6. ESTATÍSTICAS")
+        self._linha("-" * 50)
+        self._linha(f"Páginas com campo bancário válido: {_paginas_distintas(analisador.valores_demonstrativos)}")
+        self._linha(f"Valores demonstrativos encontrados: {len(analisador.valores_demonstrativos)}")
+        self._linha(f"Valores FUNARPEN encontrados: {len(analisador.valores_funarpen)}")
+        self._linha(f"Valores ISSQN encontrados: {len(analisador.valores_issqn)}")
+        self._linha(f"Dias com movimentação: {len(totais_diarios)}")
+        self._linha()
+        self._linha("=" * 80)
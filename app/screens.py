@@ -3,9 +3,9 @@ import flet as ft
 from app.components import *
 from pathlib import Path
 from app.logic import (
-    abrir_historico, abrir_upload, baixar_txt, baixar_csv,
+    abrir_historico, abrir_upload, abrir_fila, obter_fila, baixar_txt, baixar_csv,
     voltar_nova_analise, ir_para_exportacao, voltar_pagina_anterior, ir_para_home,
-    estado, gerar_miniatura_pdf, set_etapa, carregar_historico, carregar_historico_ordenado, remover_entrada_historico
+    estado, solicitar_miniatura, set_etapa, carregar_historico, carregar_historico_ordenado, remover_entrada_historico
 )
 
 # Função local para copiar valor para a área de transferência
@@ -57,6 +57,7 @@ def tela_boas_vindas():
         ft.Row([
             BotaoCardMenu("Histórico de", "análises", "images/historyiconsvg.svg", on_click=abrir_historico),
             BotaoCardMenu("Analisar um", "Documento", "images/searchiconsvg.svg", on_click=abrir_upload),
+            BotaoCardMenu("Analisar vários", "Documentos", "images/searchiconsvg.svg", on_click=abrir_fila),
         ], alignment=ft.MainAxisAlignment.CENTER, spacing=32),
     ], alignment=ft.MainAxisAlignment.CENTER, horizontal_alignment=ft.CrossAxisAlignment.CENTER, expand=True)
 
@@ -111,17 +112,44 @@ def tela_upload():
 def tela_confirmacao():
     nome_arquivo = Path(estado["file_path"]).name if estado["file_path"] else "(nenhum arquivo)"
     nome_sem_extensao = Path(estado["file_path"]).stem if estado["file_path"] else "(nenhum arquivo)"
-    miniatura_path = None
+    # A tela aparece com o marcador e a miniatura entra no lugar dele quando ficar pronta
+    miniatura = ft.Container(
+        ft.Text("MINIATURA\nPRIMEIRA\nPAGINA", color="#004054", size=16, font_family="Gotham", weight=ft.FontWeight.BOLD, text_align=ft.TextAlign.CENTER),
+        width=220,
+        height=280,
+        bgcolor="#FFFFFF",
+        border_radius=24,
+        shadow=ft.BoxShadow(blur_radius=18, color="#00000022", offset=ft.Offset(0, 6)),
+        alignment=ft.alignment.center,
+    )
     if estado["file_path"]:
-        miniatura_path = gerar_miniatura_pdf(estado["file_path"])
+        arquivo_da_tela = estado["file_path"]
+        
+        def mostrar_miniatura(miniatura_path):
+            # Descarta a miniatura se o usuário já saiu desta tela ou trocou de arquivo
+            if not miniatura_path or estado["etapa"] != 4 or estado["file_path"] != arquivo_da_tela:
+                return
+            miniatura.content = ft.Image(src=miniatura_path, width=180, height=240, fit=ft.ImageFit.CONTAIN)
+            try:
+                miniatura.update()
+            except Exception:
+                # Ainda não está na página: a imagem aparece quando a tela for montada
+                pass
+        
+        solicitar_miniatura(arquivo_da_tela, mostrar_miniatura)
     
     def avancar_para_analise(e=None):
         import threading
         import time
-        from app.logic import adicionar_ao_historico
-        from app.analise_pdf import AnalisadorPDF
+        from app.logic import adicionar_ao_historico, montar_resumo
+        from app.tarefas import iniciar_analise_especulativa
         from pathlib import Path
         
+        # A tarefa já existe antes da tela de análise, que acompanha o progresso dela
+        if estado["file_path"]:
+            iniciar_analise_especulativa(estado["file_path"])
+        arquivo_da_analise = estado["file_path"]
+        
         # Ir para tela de análise
         set_etapa(5)
         
@@ -131,49 +159,28 @@ def tela_confirmacao():
                 if not estado["file_path"]:
                     raise ValueError("Nenhum arquivo selecionado")
                 
-                # Criar analisador PDF
-                analisador = AnalisadorPDF(estado["file_path"])
-                
-                # Executar análise
-                sucesso = analisador.analisar_pdf()
+                # A análise começou em segundo plano quando o arquivo foi validado: aqui só se
+                # espera por ela (se o arquivo mudou desde então, uma nova análise começa)
+                tarefa = iniciar_analise_especulativa(estado["file_path"])
+                tarefa.aguardar()
+                # Cancelada, ou o usuário saiu da tela de análise: o resultado não muda a tela
+                if tarefa.cancelada or estado["etapa"] != 5 or estado["file_path"] != arquivo_da_analise:
+                    return
+                analisador = tarefa.analisador
+                sucesso = tarefa.sucesso
+                if not sucesso and analisador is None:
+                    raise RuntimeError(tarefa.erro or "falha na análise")
                 
                 if sucesso:
-                    # Obter totais da análise
-                    totais = analisador.calcular_totais()
-                    totais_diarios = analisador.calcular_totais_diarios()
-                    
-                    # Calcular intervalo de datas
-                    datas = [t.data for t in totais_diarios if t.data != "Data não identificada"]
-                    if datas:
-                        datas_ordenadas = sorted(datas)
-                        intervalo_datas = f"{datas_ordenadas[0]} - {datas_ordenadas[-1]}" if len(datas_ordenadas) > 1 else datas_ordenadas[0]
-                    else:
-                        intervalo_datas = "Não identificado"
-                    
-                    # Contar páginas do PDF
-                    try:
-                        import PyPDF2
-                        with open(estado["file_path"], 'rb') as arquivo:
-                            leitor = PyPDF2.PdfReader(arquivo)
-                            qtd_pgs = str(len(leitor.pages))
-                    except:
-                        qtd_pgs = "Não identificado"
-                    
-                    # Formatar valores para exibição
-                    resumo_dados = {
-                        "qtd_pgs": qtd_pgs,
-                        "intervalo_datas": intervalo_datas,
-                        "valor_liquido": f"R$ {totais['valor_liquido']:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'),
-                        "valor_demonstrativo": f"R$ {totais['total_demonstrativos']:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'),
-                        "valor_funarpen": f"R$ {totais['total_funarpen']:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'),
-                        "valor_issqn": f"R$ {totais['total_issqn']:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                    }
+                    # Totais, intervalo de datas e páginas, já calculados pela tarefa
+                    resumo_dados = montar_resumo(analisador.total_paginas, analisador.indice_datas().intervalo(),
+                                                 analisador.calcular_totais())
                     
                     estado["resumo"] = resumo_dados  # type: ignore
                     adicionar_ao_historico(nome_sem_extensao, resumo_dados)
                     
                     # Gerar relatório
-                    analisador.gerar_relatorio(estado["file_path"])
+                    analisador.gerar_relatorio(estado["file_path"], retornar_texto=False)
                     
                     # Ir para tela de resumo
                     set_etapa(6)
@@ -205,15 +212,7 @@ def tela_confirmacao():
         ft.Container(
             ft.Column([
                 ft.Container(height=120),
-                ft.Container(
-                    ft.Image(src=miniatura_path if miniatura_path else "images/placeholder.png", width=180, height=240, fit=ft.ImageFit.CONTAIN) if miniatura_path else ft.Text("MINIATURA\nPRIMEIRA\nPAGINA", color="#004054", size=16, font_family="Gotham", weight=ft.FontWeight.BOLD, text_align=ft.TextAlign.CENTER),
-                    width=220,
-                    height=280,
-                    bgcolor="#FFFFFF",
-                    border_radius=24,
-                    shadow=ft.BoxShadow(blur_radius=18, color="#00000022", offset=ft.Offset(0, 6)),
-                    alignment=ft.alignment.center,
-                ),
+                miniatura,
                 ft.Text(f'"{nome_sem_extensao}"', color="#004054", size=18, font_family="Gotham", text_align=ft.TextAlign.CENTER),
                 ft.Container(height=24),
                 BotaoPrincipal("ANALISAR", on_click=avancar_para_analise),
@@ -241,6 +240,43 @@ def tela_confirmacao():
     ])
 
 def tela_analisando():
+    import time
+    from app.tarefas import cancelar_analise_especulativa, tarefa_atual
+    
+    # Barra indeterminada até o primeiro aviso de progresso da análise
+    barra_progresso = ft.ProgressBar(width=400, value=None, color="#008EBC", bgcolor="#E0F4FA")
+    texto_progresso = ft.Text("", color="#004054", size=14, font_family="Gotham", text_align=ft.TextAlign.CENTER)
+    ultima_atualizacao = [0.0]
+    
+    def mostrar_progresso(progresso):
+        # A análise avisa a cada página: a tela é redesenhada no máximo a cada 100 ms
+        agora = time.monotonic()
+        concluiu = progresso.paginas_concluidas >= progresso.total_paginas
+        if not concluiu and agora - ultima_atualizacao[0] < 0.1:
+            return
+        ultima_atualizacao[0] = agora
+        if estado["etapa"] != 5:
+            return
+        if progresso.total_paginas:
+            barra_progresso.value = progresso.paginas_concluidas / progresso.total_paginas
+        texto_progresso.value = (f"{progresso.paginas_concluidas} de {progresso.total_paginas} páginas"
+                                 f" • {progresso.registros} registros")
+        try:
+            barra_progresso.update()
+            texto_progresso.update()
+        except Exception:
+            # Ainda não está na página: o valor aparece quando a tela for montada
+            pass
+    
+    tarefa = tarefa_atual()
+    if tarefa is not None:
+        tarefa.acompanhar(mostrar_progresso)
+    
+    def cancelar_analise(e=None):
+        # A análise para na próxima página e o usuário volta para a confirmação do arquivo
+        cancelar_analise_especulativa()
+        set_etapa(4)
+    
     return ft.Stack([
         # Conteúdo principal da tela
         ft.Container(
@@ -257,6 +293,11 @@ def tela_analisando():
                     margin=ft.margin.only(bottom=20)
                 ),
                 ft.Text("Analisando documentos...", color="#004054", size=20, font_family="Gotham", text_align=ft.TextAlign.CENTER),
+                ft.Container(height=16),
+                barra_progresso,
+                texto_progresso,
+                ft.Container(height=24),
+                BotaoSecundario("CANCELAR", on_click=cancelar_analise, width=280, height=54),
             ], alignment=ft.MainAxisAlignment.CENTER, horizontal_alignment=ft.CrossAxisAlignment.CENTER),
             expand=True,
             margin=ft.margin.only(top=80, left=80, right=80, bottom=20)
@@ -629,4 +670,155 @@ def tela_historico():
             margin=ft.margin.only(top=24, left=24, right=24),
             height=56,
         ),
-    ]) 
\ No newline at end of file
+    ])
+
+
+def tela_fila():
+    import time
+    from app.fila import STATUS_ANALISANDO, STATUS_CANCELADO, STATUS_PENDENTE
+    from app.lote import STATUS_FALHA, STATUS_SUCESSO
+    from app.logic import formatar_moeda, pick_files_fila
+    
+    fila = obter_fila()
+    cores_status = {
+        STATUS_PENDENTE: "#B0B0B0",
+        STATUS_ANALISANDO: "#008EBC",
+        STATUS_SUCESSO: "#4caf50",
+        STATUS_FALHA: "#d32f2f",
+        STATUS_CANCELADO: "#ff9800",
+    }
+    
+    lista_arquivos = ft.ListView(controls=[], spacing=4, auto_scroll=False, padding=ft.padding.all(16))
+    barra_progresso = ft.ProgressBar(width=600, value=0, color="#008EBC", bgcolor="#E0F4FA")
+    texto_andamento = ft.Text("", color="#004054", size=14, font_family="Gotham", text_align=ft.TextAlign.CENTER)
+    resumo_combinado = ft.Column([], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=4)
+    ultima_atualizacao = [0.0]
+    
+    def criar_linha_arquivo(item):
+        resultado = item.resultado
+        if resultado is None:
+            detalhe = ""
+        elif item.status == STATUS_SUCESSO:
+            detalhe = f"{resultado.total_paginas} págs • {formatar_moeda(resultado.valor_liquido)} • {resultado.duracao:.1f} s"
+        else:
+            detalhe = resultado.mensagem
+        return ft.Container(
+            ft.Row([
+                ft.Text(f"\"{Path(item.caminho).stem}\"", color="#004054", size=14, font_family="Gotham", expand=True),
+                ft.Text(detalhe, color="#004054", size=12, font_family="Gotham"),
+                ft.Text(item.status.upper(), color=cores_status.get(item.status, "#004054"), size=12,
+                        font_family="Gotham", weight=ft.FontWeight.BOLD, width=100, text_align=ft.TextAlign.RIGHT),
+            ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN, vertical_alignment=ft.CrossAxisAlignment.CENTER),
+            padding=ft.padding.symmetric(horizontal=16, vertical=8),
+            border_radius=8,
+            bgcolor="#F8F8F8",
+        )
+    
+    def atualizar_fila():
+        """Redesenha a lista, o andamento e, com a fila vazia, o resumo combinado"""
+        estatisticas = fila.estatisticas()
+        lista_arquivos.controls = [criar_linha_arquivo(item) for item in list(fila.itens)]
+        if not lista_arquivos.controls:
+            lista_arquivos.controls.append(
+                ft.Container(
+                    ft.Text("Nenhum arquivo na fila.", color="#B0B0B0", size=16, font_family="Gotham", text_align=ft.TextAlign.CENTER),
+                    alignment=ft.alignment.center,
+                    padding=ft.padding.all(20)
+                )
+            )
+        barra_progresso.value = estatisticas.concluidos / estatisticas.total if estatisticas.total else 0
+        texto_andamento.value = (
+            f"{estatisticas.concluidos} de {estatisticas.total} arquivos • {estatisticas.analisando} em análise"
+            f" • {estatisticas.arquivos_por_minuto:.1f} arquivos/min • {estatisticas.paginas_por_segundo:.0f} páginas/s"
+        )
+        resumo_combinado.controls.clear()
+        resumo = fila.resumo
+        if resumo is not None:
+            totais = fila.totais()
+            resumo_combinado.controls.extend([
+                ft.Text(f"{resumo.sucessos} analisado(s), {estatisticas.falhas} com falha, {estatisticas.cancelados} cancelado(s)"
+                        f" em {resumo.duracao:.1f} s • {estatisticas.paginas} páginas",
+                        color="#004054", size=14, font_family="Gotham", weight=ft.FontWeight.BOLD),
+                ft.Text(f"Demonstrativos {formatar_moeda(totais['total_demonstrativos'])} • FUNARPEN "
+                        f"{formatar_moeda(totais['total_funarpen'])} • ISSQN {formatar_moeda(totais['total_issqn'])}",
+                        color="#004054", size=14, font_family="Gotham"),
+                ft.Text(f"Valor líquido total: {formatar_moeda(totais['valor_liquido'])}",
+                        color="#004054", size=16, font_family="Gotham", weight=ft.FontWeight.BOLD),
+            ])
+            if resumo.caminho_resumo:
+                resumo_combinado.controls.append(
+                    ft.Text(f"Resumo do lote: {resumo.caminho_resumo}", color="#B0B0B0", size=12, font_family="Gotham"))
+    
+    def ao_mudar_fila(fila_alterada):
+        # Chamado pelas threads da fila: redesenha no máximo a cada 200 ms, e sempre ao terminar
+        agora = time.monotonic()
+        if fila_alterada.ativa and agora - ultima_atualizacao[0] < 0.2:
+            return
+        ultima_atualizacao[0] = agora
+        if estado["etapa"] != 8:
+            return
+        atualizar_fila()
+        try:
+            from app.logic import flet_page
+            if flet_page and hasattr(flet_page, 'update') and callable(flet_page.update):
+                flet_page.update()
+        except Exception:
+            pass
+    
+    def cancelar_pendentes(e=None):
+        fila.cancelar_pendentes()
+    
+    def limpar_concluidos(e=None):
+        fila.limpar_concluidos()
+    
+    fila.acompanhar(ao_mudar_fila)
+    atualizar_fila()
+    
+    return ft.Stack([
+        # Conteúdo principal da tela
+        ft.Container(
+            ft.Column([
+                ft.Container(height=60),
+                ft.Text("Fila de Análise", color="#004054", size=28, font_family="Gotham", weight=ft.FontWeight.BOLD, text_align=ft.TextAlign.CENTER),
+                ft.Container(height=12),
+                ft.Row([
+                    BotaoPrincipal("ADICIONAR PDFs", on_click=pick_files_fila, width=220, height=54),
+                    BotaoSecundario("CANCELAR PENDENTES", on_click=cancelar_pendentes, width=240, height=54),
+                    BotaoSecundario("LIMPAR", on_click=limpar_concluidos, width=140, height=54),
+                ], alignment=ft.MainAxisAlignment.CENTER, spacing=16),
+                ft.Container(height=12),
+                barra_progresso,
+                texto_andamento,
+                ft.Container(height=8),
+                # Lista da fila
+                ft.Container(
+                    lista_arquivos,
+                    bgcolor="#FFFFFF",
+                    border_radius=24,
+                    height=300,
+                    shadow=ft.BoxShadow(blur_radius=18, color="#00000022", offset=ft.Offset(0, 6)),
+                ),
+                ft.Container(height=12),
+                resumo_combinado,
+            ], alignment=ft.MainAxisAlignment.START, horizontal_alignment=ft.CrossAxisAlignment.CENTER),
+            expand=True,
+            margin=ft.margin.only(top=80, left=40, right=40, bottom=20)
+        ),
+        # Logo
+        ft.Container(
+            ft.Image(src="images/Logotipo-LumaLector.png", width=260, height=60),
+            alignment=ft.alignment.top_center,
+            margin=ft.margin.only(top=32)
+        ),
+        # Botões de navegação com z-index mais alto
+        ft.Container(
+            ft.Row([
+                BotaoIconeCircular("arrow_back", on_click=voltar_pagina_anterior, bgcolor="#008EBC", icon_color="#FFFFFF", size=56),
+                ft.Container(expand=True),  # Espaçador
+                BotaoIconeCircular("home", on_click=ir_para_home, bgcolor="#008EBC", icon_color="#FFFFFF", size=56),
+            ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+            alignment=ft.alignment.top_center,
+            margin=ft.margin.only(top=24, left=24, right=24),
+            height=56,
+        ),
+    ])
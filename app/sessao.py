@@ -0,0 +1,193 @@
+# app/sessao.py
+# Sessão de um documento na interface: o PDF escolhido é mapeado e interpretado uma única vez,
+# e a validação, a miniatura, a contagem de páginas e a análise usam a mesma sessão em vez de
+# cada etapa abrir o arquivo de novo. As sessões ficam guardadas pelo caminho e são trocadas
+# quando o arquivo muda (data de modificação ou tamanho diferentes); fechar_sessoes() as
+# encerra quando o usuário sai do fluxo de análise.
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.mapeamento import DocumentoMapeado, mapear
+
+try:
+    import fitz  # type: ignore
+except ImportError:
+    fitz = None
+
+# Sessões mantidas abertas ao mesmo tempo; a menos usada é fechada ao abrir uma nova
+MAXIMO_SESSOES = 4
+
+
+class SessaoDocumento:
+    """
+    Um PDF aberto para a interface. O mapeamento do arquivo é compartilhado com a análise
+    (AnalisadorPDF(caminho, sessao=...)) e o documento do PyMuPDF, usado na validação, na
+    miniatura e na contagem de páginas, é interpretado uma vez; as operações sobre ele passam
+    pela trava da sessão, já que a miniatura e a análise podem rodar em threads diferentes.
+    Quem lê do mapeamento fora da trava (a análise) o toma com emprestar_mapeamento() e o
+    devolve com devolver_mapeamento(); fechar() durante o empréstimo só libera o arquivo
+    quando o último empréstimo for devolvido.
+    """
+
+    def __init__(self, caminho_pdf: str):
+        self.caminho_pdf = caminho_pdf
+        self.assinatura_arquivo = assinatura_arquivo(caminho_pdf)
+        self.trava = threading.RLock()
+        self._mapeamento: Optional[DocumentoMapeado] = None
+        self._documento = None
+        self._total_paginas: Optional[int] = None
+        self._hash_conteudo: Optional[str] = None
+        self._emprestimos = 0
+        self.fechada = False
+
+    @property
+    def mapeamento(self) -> Optional[DocumentoMapeado]:
+        """Mapeamento do arquivo, criado no primeiro uso; None onde o mmap não é possível"""
+        with self.trava:
+            if self._mapeamento is None and not self.fechada:
+                self._mapeamento = mapear(self.caminho_pdf)
+            return self._mapeamento
+
+    def emprestar_mapeamento(self) -> Optional[DocumentoMapeado]:
+        with self.trava:
+            if self.fechada:
+                raise ValueError(f"sessão de '{self.caminho_pdf}' já foi fechada")
+            self._emprestimos += 1
+            return self.mapeamento
+
+    def devolver_mapeamento(self):
+        with self.trava:
+            self._emprestimos -= 1
+            if self.fechada and self._emprestimos == 0:
+                self._liberar()
+
+    def documento(self):
+        """Documento do PyMuPDF, interpretado no primeiro uso; use-o dentro de `with sessao.trava`"""
+        with self.trava:
+            if self.fechada:
+                raise ValueError(f"sessão de '{self.caminho_pdf}' já foi fechada")
+            if self._documento is None:
+                if fitz is None:
+                    raise RuntimeError("PyMuPDF (fitz) não está instalado")
+                mapeamento = self.mapeamento
+                if mapeamento is not None:
+                    self._documento = fitz.open(stream=mapeamento.dados(), filetype="pdf")
+                else:
+                    self._documento = fitz.open(self.caminho_pdf)
+            return self._documento
+
+    @property
+    def total_paginas(self) -> int:
+        with self.trava:
+            if self._total_paginas is None:
+                self._total_paginas = self.documento().page_count
+            return self._total_paginas
+
+    def hash_conteudo(self) -> str:
+        """SHA-256 do arquivo inteiro, calculado uma vez por sessão"""
+        with self.trava:
+            if self._hash_conteudo is None:
+                h = hashlib.sha256()
+                mapeamento = self.mapeamento
+                if mapeamento is not None:
+                    h.update(mapeamento.dados())
+                else:
+                    with open(self.caminho_pdf, 'rb') as arquivo:
+                        for bloco in iter(lambda: arquivo.read(1024 * 1024), b""):
+                            h.update(bloco)
+                self._hash_conteudo = h.hexdigest()
+            return self._hash_conteudo
+
+    def validar(self) -> Tuple[bool, str]:
+        """Confere se o PyMuPDF interpreta o documento e se ele tem páginas"""
+        if fitz is None:
+            return True, "PDF válido."
+        try:
+            if self.total_paginas == 0:
+                return False, "PDF não contém páginas."
+        except Exception as e:
+            return False, f"PDF corrompido ou inválido: {str(e)}"
+        return True, "PDF válido."
+
+    def miniatura_png(self, escala: float = 0.4) -> Optional[bytes]:
+        """PNG da primeira página na escala dada; None sem o PyMuPDF ou sem páginas"""
+        if fitz is None:
+            return None
+        with self.trava:
+            documento = self.documento()
+            if documento.page_count == 0:
+                return None
+            pixmap = documento[0].get_pixmap(matrix=fitz.Matrix(escala, escala))  # type: ignore
+            return pixmap.tobytes("png")
+
+    def atual(self) -> bool:
+        """False se o arquivo mudou (ou sumiu) desde que a sessão foi aberta"""
+        return not self.fechada and assinatura_arquivo(self.caminho_pdf) == self.assinatura_arquivo
+
+    def fechar(self):
+        with self.trava:
+            self.fechada = True
+            if self._emprestimos == 0:
+                self._liberar()
+
+    def _liberar(self):
+        if self._documento is not None:
+            self._documento.close()
+            self._documento = None
+        # Depois do documento, que lê do mapeamento
+        if self._mapeamento is not None:
+            self._mapeamento.fechar()
+            self._mapeamento = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+
+def assinatura_arquivo(caminho_pdf: str) -> Optional[Tuple[int, int]]:
+    """(data de modificação em ns, tamanho) do arquivo; None se ele não existir"""
+    try:
+        estado = os.stat(caminho_pdf)
+    except OSError:
+        return None
+    return estado.st_mtime_ns, estado.st_size
+
+
+_sessoes: "OrderedDict[str, SessaoDocumento]" = OrderedDict()
+_trava_sessoes = threading.Lock()
+
+
+def abrir_sessao(caminho_pdf: str) -> SessaoDocumento:
+    """Sessão do arquivo: a já aberta, se ele não mudou desde então, ou uma nova"""
+    chave = os.path.abspath(caminho_pdf)
+    with _trava_sessoes:
+        sessao = _sessoes.get(chave)
+        if sessao is not None and sessao.atual():
+            _sessoes.move_to_end(chave)
+            return sessao
+        if sessao is not None:
+            del _sessoes[chave]
+            sessao.fechar()
+        sessao = SessaoDocumento(caminho_pdf)
+        _sessoes[chave] = sessao
+        while len(_sessoes) > MAXIMO_SESSOES:
+            _sessoes.popitem(last=False)[1].fechar()
+        return sessao
+
+
+def fechar_sessoes(caminho_pdf: Optional[str] = None):
+    """Fecha a sessão do arquivo, ou todas as sessões abertas se nenhum for indicado"""
+    with _trava_sessoes:
+        if caminho_pdf is None:
+            chaves = list(_sessoes)
+        else:
+            chaves = [os.path.abspath(caminho_pdf)]
+        for chave in chaves:
+            sessao = _sessoes.pop(chave, None)
+            if sessao is not None:
+                sessao.fechar()
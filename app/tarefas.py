@@ -0,0 +1,123 @@
+# app/tarefas.py
+# Análise especulativa na interface: assim que o arquivo escolhido é validado, a análise começa
+# numa thread em segundo plano, enquanto o usuário ainda está na tela de confirmação. O botão
+# "ANALISAR" só se junta à tarefa em andamento (ou já concluída) do mesmo arquivo. Voltar do
+# fluxo ou escolher outro arquivo cancela a tarefa, que para entre uma página e outra, e o
+# resultado dela é descartado. A tela de análise acompanha o progresso da tarefa.
+import os
+import threading
+from typing import Callable, Optional
+
+from app.analise_pdf import AnalisadorPDF, ProgressoAnalise, TokenCancelamento
+from app.sessao import abrir_sessao, assinatura_arquivo
+
+
+class TarefaAnalise:
+    """
+    Análise de um PDF numa thread daemon. Além de analisar_pdf, já calcula os totais e o
+    índice de datas (memorizados no analisador), para a tela de resumo sair sem espera.
+    Relatório e histórico ficam para quem usar o resultado: uma tarefa especulativa que
+    ninguém aproveita não deixa rastro.
+    """
+
+    def __init__(self, caminho_pdf: str):
+        self.caminho_pdf = caminho_pdf
+        self.assinatura_arquivo = assinatura_arquivo(caminho_pdf)
+        self.analisador: Optional[AnalisadorPDF] = None
+        self.sucesso = False
+        self.erro: Optional[str] = None
+        self.cancelada = False
+        self.token = TokenCancelamento()
+        self.progresso: Optional[ProgressoAnalise] = None
+        self._observador: Optional[Callable[[ProgressoAnalise], None]] = None
+        self._concluida = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def iniciar(self) -> "TarefaAnalise":
+        self._thread = threading.Thread(target=self._executar, name=f"analise:{os.path.basename(self.caminho_pdf)}",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def _executar(self):
+        try:
+            analisador = AnalisadorPDF(self.caminho_pdf, sessao=abrir_sessao(self.caminho_pdf),
+                                       progresso=self._ao_progredir, cancelamento=self.token)
+            self.analisador = analisador
+            self.sucesso = analisador.analisar_pdf()
+            if self.sucesso:
+                analisador.calcular_totais()
+                analisador.indice_datas()
+            else:
+                self.erro = analisador.erro
+        except Exception as e:
+            self.sucesso = False
+            self.erro = str(e)
+        finally:
+            self._concluida.set()
+
+    def _ao_progredir(self, progresso: ProgressoAnalise):
+        self.progresso = progresso
+        observador = self._observador
+        if observador is not None:
+            try:
+                observador(progresso)
+            except Exception:
+                # Um erro na tela não pode derrubar a análise
+                pass
+
+    def acompanhar(self, observador: Optional[Callable[[ProgressoAnalise], None]]):
+        """Define quem recebe o progresso (um por vez); já recebe o último, se houver"""
+        self._observador = observador
+        progresso = self.progresso
+        if observador is not None and progresso is not None:
+            observador(progresso)
+
+    @property
+    def concluida(self) -> bool:
+        return self._concluida.is_set()
+
+    def aguardar(self, timeout: Optional[float] = None) -> bool:
+        """Espera a análise terminar; False se o tempo acabou antes"""
+        return self._concluida.wait(timeout)
+
+    def cancelar(self):
+        """Pede à análise que pare na próxima página; aguardar() retorna logo depois"""
+        self.cancelada = True
+        self._observador = None
+        self.token.cancelar()
+
+    def serve_para(self, caminho_pdf: str) -> bool:
+        """True se a tarefa é do mesmo arquivo, sem alteração desde o início, e não foi cancelada"""
+        return (not self.cancelada
+                and os.path.abspath(caminho_pdf) == os.path.abspath(self.caminho_pdf)
+                and assinatura_arquivo(caminho_pdf) == self.assinatura_arquivo)
+
+
+# Tarefa do arquivo em confirmação; há no máximo uma por vez
+_tarefa_atual: Optional[TarefaAnalise] = None
+_trava_tarefa = threading.Lock()
+
+
+def iniciar_analise_especulativa(caminho_pdf: str) -> TarefaAnalise:
+    """Começa a análise do arquivo, cancelando a de qualquer outro; reaproveita a do mesmo arquivo"""
+    global _tarefa_atual
+    with _trava_tarefa:
+        if _tarefa_atual is not None:
+            if _tarefa_atual.serve_para(caminho_pdf):
+                return _tarefa_atual
+            _tarefa_atual.cancelar()
+        _tarefa_atual = TarefaAnalise(caminho_pdf).iniciar()
+        return _tarefa_atual
+
+
+def tarefa_atual() -> Optional[TarefaAnalise]:
+    return _tarefa_atual
+
+
+def cancelar_analise_especulativa():
+    global _tarefa_atual
+    with _trava_tarefa:
+        if _tarefa_atual is not None:
+            _tarefa_atual.cancelar()
+            _tarefa_atual = None
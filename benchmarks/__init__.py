@@ -0,0 +1,3 @@
+"""
+Benchmarks do Analisador PDF Financeiro
+"""
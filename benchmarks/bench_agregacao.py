@@ -0,0 +1,126 @@
+# benchmarks/bench_agregacao.py
+# Agregação dos totais diários e consolidados: confere, com entradas aleatórias, que o motor
+# vetorizado (app/agregacao.py) devolve exatamente os mesmos Decimal da soma registro a registro
+# e compara os tempos dos dois caminhos.
+# Uso: python -m benchmarks.bench_agregacao [--registros N] [--casos N]
+import argparse
+import random
+import time
+from decimal import Decimal
+from typing import List, Tuple
+
+from app import agregacao
+from app.analise_pdf import AnalisadorPDF, ValorDemonstrativo, ValorFunarpen, ValorIssqn
+from app.registros import ArmazemRegistros
+
+
+def _valor_aleatorio(rnd: random.Random, permitir_none: bool, fora_do_padrao: float):
+    """Na maior parte valores com duas casas, como no PDF, mas também os casos fora do padrão"""
+    sorteio = rnd.random() / fora_do_padrao * 0.2
+    if permitir_none and sorteio < 0.05:
+        return None
+    if sorteio < 0.10:
+        return Decimal("0.00")
+    if sorteio < 0.15:
+        return Decimal(str(rnd.randint(0, 10**6)))
+    if sorteio < 0.20:
+        return Decimal(rnd.randint(0, 10**7)).scaleb(-rnd.randint(1, 4))
+    return Decimal(rnd.randint(1, 10**9)).scaleb(-2)
+
+
+def _data_aleatoria(rnd: random.Random, fora_do_padrao: float) -> str:
+    sorteio = rnd.random() / fora_do_padrao * 0.2
+    if sorteio < 0.05:
+        return ""
+    if sorteio < 0.08:
+        return rnd.choice(["31/02/2024", "00/01/2024", "1/1/2024"])
+    return f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/{rnd.choice([2023, 2024])}"
+
+
+def gerar_registros(rnd: random.Random, quantidade: int,
+                    fora_do_padrao: float = 0.2) -> Tuple[list, list, list]:
+    """fora_do_padrao: fração aproximada de valores e datas nos casos especiais (None, zero, outras casas)"""
+    def registro(classe, permitir_none: bool):
+        return classe(rnd.randint(1, 500), "linha", _valor_aleatorio(rnd, permitir_none, fora_do_padrao),
+                      _data_aleatoria(rnd, fora_do_padrao))
+    demonstrativos = [registro(ValorDemonstrativo, False) for _ in range(quantidade)]
+    funarpen = [registro(ValorFunarpen, False) for _ in range(quantidade // 2)]
+    issqn = [registro(ValorIssqn, True) for _ in range(quantidade // 2)]
+    return demonstrativos, funarpen, issqn
+
+
+def _analisador(demonstrativos, funarpen, issqn, colunas: bool) -> AnalisadorPDF:
+    """Analisador com os registros em listas simples (caminho Decimal) ou em colunas"""
+    analisador = AnalisadorPDF("benchmark.pdf")
+    if colunas:
+        analisador.valores_demonstrativos = ArmazemRegistros(ValorDemonstrativo, demonstrativos)
+        analisador.valores_funarpen = ArmazemRegistros(ValorFunarpen, funarpen)
+        analisador.valores_issqn = ArmazemRegistros(ValorIssqn, issqn)
+    else:
+        analisador.valores_demonstrativos = list(demonstrativos)
+        analisador.valores_funarpen = list(funarpen)
+        analisador.valores_issqn = list(issqn)
+    return analisador
+
+
+def _forma_exata(totais_diarios, totais) -> List[str]:
+    """str() distingue Decimal('1.5') de Decimal('1.50'): a comparação inclui o expoente"""
+    return ([f"{t.data}|{t.demonstrativos}|{t.funarpen}|{t.issqn}|{t.valor_liquido}" for t in totais_diarios]
+            + [f"{chave}={type(valor).__name__}:{valor}" for chave, valor in totais.items()])
+
+
+def verificar_equivalencia(casos: int, semente: int = 7) -> int:
+    """Propriedade: para qualquer entrada, os dois caminhos dão os mesmos totais, com o mesmo expoente"""
+    rnd = random.Random(semente)
+    motores = [agregacao.np] + ([None] if agregacao.np is not None else [])
+    for caso in range(casos):
+        # Tamanhos pequenos exercitam listas vazias e datas com um único tipo de registro
+        registros = gerar_registros(rnd, rnd.choice([0, 1, 2, 5, 20, 200]))
+        referencia = _analisador(*registros, colunas=False)
+        esperado = _forma_exata(referencia.calcular_totais_diarios(), referencia.calcular_totais())
+        for motor in motores:
+            agregacao.np, original = motor, agregacao.np
+            try:
+                vetorizado = _analisador(*registros, colunas=True)
+                obtido = _forma_exata(vetorizado.calcular_totais_diarios(), vetorizado.calcular_totais())
+            finally:
+                agregacao.np = original
+            assert obtido == esperado, f"caso {caso} ({'numpy' if motor is not None else 'python'}) divergiu"
+    return casos
+
+
+def executar(quantidade: int, casos: int, semente: int = 42):
+    verificados = verificar_equivalencia(casos)
+    print(f"Equivalência exata verificada em {verificados} entradas aleatórias")
+
+    # Para a medição, a proporção de casos especiais de um demonstrativo real
+    registros = gerar_registros(random.Random(semente), quantidade, fora_do_padrao=0.01)
+    referencia = _analisador(*registros, colunas=False)
+    vetorizado = _analisador(*registros, colunas=True)
+
+    inicio = time.perf_counter()
+    esperado = _forma_exata(referencia.calcular_totais_diarios(), referencia.calcular_totais())
+    tempo_decimal = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    obtido = _forma_exata(vetorizado.calcular_totais_diarios(), vetorizado.calcular_totais())
+    tempo_vetorizado = time.perf_counter() - inicio
+    assert obtido == esperado
+
+    total = sum(len(r) for r in registros)
+    print(f"Registros: {total} | motor de agregação: {agregacao.motor_agregacao()}")
+    print(f"Soma Decimal:     {tempo_decimal * 1000:8.1f} ms")
+    print(f"Vetorizada:       {tempo_vetorizado * 1000:8.1f} ms")
+    print(f"Ganho:            {tempo_decimal / tempo_vetorizado:8.2f}x")
+    return tempo_decimal, tempo_vetorizado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agregação vetorizada x soma Decimal")
+    parser.add_argument("--registros", type=int, default=500_000)
+    parser.add_argument("--casos", type=int, default=300)
+    args = parser.parse_args()
+    executar(args.registros, args.casos)
+
+
+if __name__ == "__main__":
+    main()
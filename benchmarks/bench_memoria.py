@@ -0,0 +1,144 @@
+# benchmarks/bench_memoria.py
+# Memória da análise em documentos sintéticos de tamanho crescente: para cada tamanho, um
+# processo novo analisa o PDF medindo o RSS (e, numa segunda execução, o pico do tracemalloc),
+# e a curva de memória por página é exibida e gravada em JSON, com a estimativa para um PDF
+# do tamanho máximo aceito pela interface (100 MB). Com --workers, a coluna PSS soma o processo
+# principal e os workers, contando uma vez só as páginas compartilhadas (como o PDF mapeado).
+# Uso: python -m benchmarks.bench_memoria [--paginas N ...] [--motor MOTOR] [--sem-tracemalloc]
+#      [--workers N] [--sem-mmap]
+import argparse
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.analise_pdf import AnalisadorPDF
+from app.extracao import MOTOR_PADRAO
+from benchmarks.gerador_pdf import gerar_pdf
+from benchmarks.suite import PASTA_PDFS, PASTA_RESULTADOS
+
+PAGINAS_PADRAO = [10, 100, 500, 1000, 2500, 5000]
+# Limite de validar_arquivo_pdf (app/logic.py)
+TAMANHO_MAXIMO_PDF = 100 * 1024 * 1024
+MB = 1024 * 1024
+
+
+def _medir_em_processo(caminho_pdf: str, motor: str, rastrear_alocacoes: bool, workers: int = 1,
+                       mapear_arquivo: bool = True) -> Dict[str, Optional[int]]:
+    """Executado num processo novo, para o pico de RSS ser só o desta análise"""
+    analisador = AnalisadorPDF(caminho_pdf, motor=motor, workers=workers, medir_memoria=True,
+                               rastrear_alocacoes=rastrear_alocacoes, mapear_arquivo=mapear_arquivo)
+    if not analisador.analisar_pdf():
+        raise RuntimeError(f"falha ao analisar {caminho_pdf}: {analisador.erro}")
+    return asdict(analisador.memoria)
+
+
+def medir(caminho_pdf: str, motor: str, rastrear_alocacoes: bool, workers: int = 1,
+          mapear_arquivo: bool = True) -> Dict[str, Optional[int]]:
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+        return executor.submit(_medir_em_processo, caminho_pdf, motor, rastrear_alocacoes,
+                               workers, mapear_arquivo).result()
+
+
+def _mb(valor: Optional[int]) -> str:
+    return f"{valor / MB:9.1f}" if valor is not None else f"{'n/d':>9}"
+
+
+def executar(paginas: List[int], motor: str, proporcao_sem_campo: float, tracemalloc: bool,
+             semente: int = 42, workers: int = 1, mapear_arquivo: bool = True) -> Dict:
+    PASTA_PDFS.mkdir(parents=True, exist_ok=True)
+    pontos = []
+    print(f"{'Páginas':>8} {'PDF (MB)':>9} {'RSS (MB)':>9} {'Δ RSS (MB)':>11} {'KB/página':>10} "
+          f"{'tracemalloc (MB)':>17} {'PSS total (MB)':>15}")
+    print("-" * 86)
+    for quantidade in paginas:
+        caminho = PASTA_PDFS / f"demonstrativo_{quantidade}p_{proporcao_sem_campo:g}_{semente}.pdf"
+        if not caminho.exists():
+            gerar_pdf(str(caminho), quantidade, proporcao_sem_campo, semente)
+        medicao = medir(str(caminho), motor, False, workers, mapear_arquivo)
+        pico_tracemalloc = (medir(str(caminho), motor, True, workers, mapear_arquivo)["pico_tracemalloc"]
+                            if tracemalloc else None)
+        pss_total = medicao["pico_pss"]
+        if pss_total is not None and medicao["pss_workers"] is not None:
+            pss_total += medicao["pss_workers"]
+        # Crescimento durante a análise: o que o documento custa além do interpretador e dos módulos
+        crescimento = (medicao["pico_rss"] - medicao["rss_inicial"]
+                       if medicao["pico_rss"] is not None and medicao["rss_inicial"] is not None else None)
+        ponto = {
+            "paginas": quantidade,
+            "tamanho_pdf": os.path.getsize(caminho),
+            "rss_inicial": medicao["rss_inicial"],
+            "pico_rss": medicao["pico_rss"],
+            "pico_rss_processo": medicao["pico_rss_processo"],
+            "crescimento_rss": crescimento,
+            "bytes_por_pagina": crescimento / quantidade if crescimento is not None else None,
+            "pico_tracemalloc": pico_tracemalloc,
+            "pico_rss_workers": medicao["pico_rss_workers"],
+            "pss_total": pss_total,
+        }
+        pontos.append(ponto)
+        por_pagina = f"{ponto['bytes_por_pagina'] / 1024:10.1f}" if crescimento is not None else f"{'n/d':>10}"
+        print(f"{quantidade:>8} {ponto['tamanho_pdf'] / MB:9.2f} {_mb(ponto['pico_rss'])} "
+              f"{_mb(crescimento):>11} {por_pagina} {_mb(pico_tracemalloc):>17} {_mb(pss_total):>15}")
+
+    estimativa = estimar_maximo(pontos)
+    if estimativa is not None:
+        print()
+        print(f"Estimativa para um PDF de {TAMANHO_MAXIMO_PDF // MB} MB neste layout: "
+              f"~{estimativa['paginas']:.0f} páginas, pico de RSS ~{estimativa['pico_rss'] / MB:.0f} MB")
+    return {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "parametros": {"motor": motor, "sem_campo": proporcao_sem_campo, "semente": semente,
+                       "workers": workers, "mmap": mapear_arquivo},
+        "pontos": pontos,
+        "estimativa_100mb": estimativa,
+    }
+
+
+def estimar_maximo(pontos: List[Dict]) -> Optional[Dict[str, float]]:
+    """
+    Extrapola pelos dois maiores documentos: o pico de RSS cresce linearmente com o tamanho do
+    arquivo (reta pelos dois pontos), e as páginas pela média de bytes por página.
+    """
+    validos = [p for p in pontos if p["pico_rss"] is not None]
+    if len(validos) < 2:
+        return None
+    menor, maior = validos[-2], validos[-1]
+    if maior["tamanho_pdf"] == menor["tamanho_pdf"]:
+        return None
+    inclinacao = (maior["pico_rss"] - menor["pico_rss"]) / (maior["tamanho_pdf"] - menor["tamanho_pdf"])
+    return {
+        "paginas": TAMANHO_MAXIMO_PDF / (maior["tamanho_pdf"] / maior["paginas"]),
+        "pico_rss": maior["pico_rss"] + inclinacao * (TAMANHO_MAXIMO_PDF - maior["tamanho_pdf"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Curva de memória por página da análise")
+    parser.add_argument("--paginas", type=int, nargs="+", default=PAGINAS_PADRAO,
+                        help=f"tamanhos dos documentos (padrão: {' '.join(map(str, PAGINAS_PADRAO))})")
+    parser.add_argument("--motor", default=MOTOR_PADRAO, help=f"motor de extração (padrão: {MOTOR_PADRAO})")
+    parser.add_argument("--sem-campo", type=float, default=0.5,
+                        help="proporção de páginas sem o campo bancário (padrão: 0.5)")
+    parser.add_argument("--sem-tracemalloc", action="store_true",
+                        help="não faz a segunda execução com o tracemalloc (bem mais lenta)")
+    parser.add_argument("--workers", type=int, default=1, help="processos da análise paralela (padrão: 1)")
+    parser.add_argument("--sem-mmap", action="store_true", help="lê o PDF sem o mapeamento em memória")
+    parser.add_argument("--saida", help=f"arquivo JSON (padrão: {PASTA_RESULTADOS}/memoria_<data>.json)")
+    args = parser.parse_args()
+
+    resultados = executar(sorted(args.paginas), args.motor, args.sem_campo, not args.sem_tracemalloc,
+                          workers=max(1, args.workers), mapear_arquivo=not args.sem_mmap)
+    saida = Path(args.saida) if args.saida else PASTA_RESULTADOS / f"memoria_{datetime.now():%Y%m%d_%H%M%S}.json"
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados salvos em: {saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/bench_registros.py
+# Compara a memória ocupada pelos registros extraídos em listas de dataclasses
+# (formato original) e no ArmazemRegistros em colunas.
+# Uso: python -m benchmarks.bench_registros [--registros N]
+import argparse
+import gc
+import random
+import tracemalloc
+from decimal import Decimal
+from typing import Callable, List
+
+from app.analise_pdf import ValorDemonstrativo
+from app.registros import ArmazemRegistros
+
+
+def gerar_registros(quantidade: int, semente: int = 42) -> List[ValorDemonstrativo]:
+    """Registros como os da varredura: poucas datas distintas e linhas que se repetem entre dias"""
+    rnd = random.Random(semente)
+    datas = [f"{dia:02d}/{mes:02d}/2024" for mes in range(1, 13) for dia in range(1, 29)]
+    registros = []
+    for i in range(quantidade):
+        centavos = rnd.randint(1000, 9_999_999)
+        data = rnd.choice(datas)
+        valor = f"{centavos // 100:,},{centavos % 100:02d}".replace(",", ".", 1)
+        registros.append(ValorDemonstrativo(
+            pagina=i // 4 + 1,
+            linha_completa=f"Valor Demonstrativo: R$ {valor} Dt. Pgto: {data}",
+            valor=Decimal(valor.replace(".", "").replace(",", ".")),
+            data_pagamento=data,
+        ))
+    return registros
+
+
+def medir(construir: Callable[[], object]):
+    """Bytes alocados pela estrutura devolvida por construir(), que é mantida viva na medição"""
+    gc.collect()
+    tracemalloc.start()
+    estrutura = construir()
+    atual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return estrutura, atual
+
+
+def executar(quantidade: int):
+    # As linhas de texto vêm do PDF nos dois casos; a lista é gerada a cada medição para
+    # que o texto de cada registro seja contado como memória própria da estrutura
+    lista, bytes_lista = medir(lambda: gerar_registros(quantidade))
+    armazem, bytes_armazem = medir(lambda: ArmazemRegistros(ValorDemonstrativo, gerar_registros(quantidade)))
+    assert armazem == lista
+
+    print(f"Registros: {quantidade}")
+    print(f"Lista de dataclasses: {bytes_lista / 1024 / 1024:8.2f} MB ({bytes_lista / quantidade:6.1f} bytes/registro)")
+    print(f"ArmazemRegistros:     {bytes_armazem / 1024 / 1024:8.2f} MB ({bytes_armazem / quantidade:6.1f} bytes/registro)")
+    print(f"Redução:              {bytes_lista / bytes_armazem:8.2f}x")
+    return bytes_lista, bytes_armazem
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memória dos registros: dataclasses x colunas")
+    parser.add_argument("--registros", type=int, default=200_000)
+    args = parser.parse_args()
+    executar(args.registros)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# benchmarks/bench_varredura.py
+# Micro-benchmark da varredura de páginas: compara as três passagens originais
+# (processar_valor_demonstrativo, processar_funarpen e processar_issqn, que o AnalisadorPDF
+# tinha antes do VarredorPagina e que ficam aqui como cópia de referência) com o VarredorPagina.
+# Uso: python -m benchmarks.bench_varredura [--paginas N] [--repeticoes N]
+import argparse
+import random
+import timeit
+from typing import List
+
+from app.analise_pdf import (
+    GATILHO_DEMONSTRATIVO, GATILHO_FUNARPEN, GATILHO_ISSQN, PADRAO_DATA_PAGAMENTO, ValorDemonstrativo,
+    ValorFunarpen, ValorIssqn, VarredorPagina, converter_valor_monetario,
+)
+
+
+def gerar_texto_pagina(rnd: random.Random, blocos: int = 4) -> str:
+    """Texto no formato extraído de uma página real de demonstrativo"""
+    data = f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/2024"
+    linhas = [
+        "BANCO DO BRASIL S.A.",
+        "Demonstrativo de Pagamento de Boletos",
+        "Ag./Cod. Cedente: 3162/730791-8",
+        f"Dt. Movimento: {data}",
+    ]
+    for bloco in range(blocos):
+        centavos = rnd.randint(1000, 9_999_999)
+        linhas += [
+            f"Sacado: CLIENTE {rnd.randint(1, 99999):05d} LTDA",
+            f"CPF/CNPJ: {rnd.randint(10**13, 10**14 - 1)}",
+            f"Endereço: RUA {rnd.randint(1, 999)}, CENTRO - CURITIBA/PR",
+            f"Nosso Número: {rnd.randint(10**9, 10**10 - 1)}  Seu Número: {rnd.randint(1, 9999)}",
+            f"Vencimento: {data}  Juros: 0,00  Multa: 0,00  Desconto: 0,00",
+            f"Protocolo: {rnd.randint(10**5, 10**6 - 1)}  Livro: {rnd.randint(1, 99)}  Folha: {rnd.randint(1, 300)}",
+            f"Valor Demonstrativo: R$ {centavos // 100:,},{centavos % 100:02d} Dt. Pgto: {data}".replace(",", ".", 1),
+            "Emolumentos  Selo  FADEP  FUNREJUS",
+            f"R$ {rnd.randint(1, 500)},{rnd.randint(0, 99):02d}",
+            "FUNARPEN",
+            f"FUNARPEN R$ {rnd.randint(1, 99)},{rnd.randint(0, 99):02d}",
+            f"ISSQN - Imposto sobre Serviços de Qualquer Natureza R$ {rnd.randint(1, 80)},{rnd.randint(0, 99):02d}",
+            "Observações: pagamento compensado",
+            "Canal: Internet Banking  Autenticação: " + "".join(rnd.choice("0123456789ABCDEF") for _ in range(16)),
+            "-" * 60,
+        ]
+    linhas += ["Total do dia conforme extrato bancário", f"Página {rnd.randint(1, 2000)}"]
+    return "\n".join(linhas)
+
+
+class ReferenciaTresPassagens:
+    """
+    Caminho anterior, copiado do AnalisadorPDF: três passagens sobre as linhas da página, uma
+    por tipo de valor, acumulando os registros nas listas valores_*. É a referência contra a
+    qual o VarredorPagina é conferido.
+    """
+
+    def __init__(self):
+        self.valores_demonstrativos: List[ValorDemonstrativo] = []
+        self.valores_funarpen: List[ValorFunarpen] = []
+        self.valores_issqn: List[ValorIssqn] = []
+
+    @staticmethod
+    def extrair_data_pagamento(texto: str) -> str:
+        match = PADRAO_DATA_PAGAMENTO.search(texto)
+        if match:
+            return match.group(1)
+        return ""
+
+    def processar_valor_demonstrativo(self, linhas: List[str], num_pagina: int):
+        for linha in linhas:
+            if GATILHO_DEMONSTRATIVO in linha:
+                valor = converter_valor_monetario(linha)
+                data_pagamento = self.extrair_data_pagamento(linha)
+                if valor:
+                    self.valores_demonstrativos.append(
+                        ValorDemonstrativo(num_pagina, linha.strip(), valor, data_pagamento)
+                    )
+
+    def processar_funarpen(self, linhas: List[str], num_pagina: int):
+        # Primeiro, encontra a data de pagamento na página
+        data_pagamento = ""
+        for linha in linhas:
+            data_temp = self.extrair_data_pagamento(linha)
+            if data_temp:
+                data_pagamento = data_temp
+                break
+
+        for i, linha in enumerate(linhas):
+            if GATILHO_FUNARPEN in linha:
+                # Verifica a linha atual
+                valor = converter_valor_monetario(linha)
+                if valor:
+                    self.valores_funarpen.append(
+                        ValorFunarpen(num_pagina, linha.strip(), valor, data_pagamento)
+                    )
+                else:
+                    # Verifica linha anterior
+                    if i > 0:
+                        valor_anterior = converter_valor_monetario(linhas[i-1])
+                        if valor_anterior:
+                            self.valores_funarpen.append(
+                                ValorFunarpen(num_pagina, f"{linhas[i-1].strip()} | {linha.strip()}", valor_anterior, data_pagamento)
+                            )
+
+                    # Verifica linha posterior
+                    if i < len(linhas) - 1:
+                        valor_posterior = converter_valor_monetario(linhas[i+1])
+                        if valor_posterior:
+                            self.valores_funarpen.append(
+                                ValorFunarpen(num_pagina, f"{linha.strip()} | {linhas[i+1].strip()}", valor_posterior, data_pagamento)
+                            )
+
+    def processar_issqn(self, linhas: List[str], num_pagina: int):
+        # Primeiro, encontra a data de pagamento na página
+        data_pagamento = ""
+        for linha in linhas:
+            data_temp = self.extrair_data_pagamento(linha)
+            if data_temp:
+                data_pagamento = data_temp
+                break
+
+        for linha in linhas:
+            if GATILHO_ISSQN in linha:
+                valor = converter_valor_monetario(linha)
+                self.valores_issqn.append(
+                    ValorIssqn(num_pagina, linha.strip(), valor, data_pagamento)
+                )
+
+
+def varrer_tres_passagens(referencia: ReferenciaTresPassagens, texto: str, num_pagina: int):
+    """Caminho anterior: três passagens sobre as linhas, uma por tipo de valor"""
+    linhas = texto.split('\n')
+    referencia.processar_valor_demonstrativo(linhas, num_pagina)
+    referencia.processar_funarpen(linhas, num_pagina)
+    referencia.processar_issqn(linhas, num_pagina)
+
+
+def executar(paginas: int, repeticoes: int, semente: int = 42):
+    rnd = random.Random(semente)
+    textos: List[str] = [gerar_texto_pagina(rnd, rnd.randint(1, 6)) for _ in range(paginas)]
+    varredor = VarredorPagina()
+
+    # Os dois caminhos precisam produzir exatamente os mesmos registros
+    referencia = ReferenciaTresPassagens()
+    for n, texto in enumerate(textos, 1):
+        varrer_tres_passagens(referencia, texto, n)
+    demonstrativos, funarpen, issqn = [], [], []
+    for n, texto in enumerate(textos, 1):
+        d, f, i = varredor.varrer(texto, n)
+        demonstrativos += d
+        funarpen += f
+        issqn += i
+    assert demonstrativos == referencia.valores_demonstrativos
+    assert funarpen == referencia.valores_funarpen
+    assert issqn == referencia.valores_issqn
+
+    def antigo():
+        # Listas simples, como no código original: mede só a varredura, não o armazenamento
+        analisador = ReferenciaTresPassagens()
+        for n, texto in enumerate(textos, 1):
+            varrer_tres_passagens(analisador, texto, n)
+
+    def novo():
+        for n, texto in enumerate(textos, 1):
+            varredor.varrer(texto, n)
+
+    # Medições intercaladas, ficando com o melhor tempo de cada caminho
+    tempos_antigo, tempos_novo = [], []
+    for _ in range(repeticoes):
+        tempos_antigo.append(timeit.timeit(antigo, number=1))
+        tempos_novo.append(timeit.timeit(novo, number=1))
+    tempo_antigo = min(tempos_antigo)
+    tempo_novo = min(tempos_novo)
+    por_pagina_antigo = tempo_antigo / paginas * 1e6
+    por_pagina_novo = tempo_novo / paginas * 1e6
+
+    print(f"Páginas: {paginas} | registros: {len(demonstrativos)} demonstrativos, "
+          f"{len(funarpen)} FUNARPEN, {len(issqn)} ISSQN")
+    print(f"Três passagens:  {por_pagina_antigo:8.1f} µs/página")
+    print(f"Varredura única: {por_pagina_novo:8.1f} µs/página")
+    print(f"Ganho:           {tempo_antigo / tempo_novo:8.2f}x")
+    return tempo_antigo, tempo_novo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark da varredura de páginas")
+    parser.add_argument("--paginas", type=int, default=2000)
+    parser.add_argument("--repeticoes", type=int, default=10)
+    args = parser.parse_args()
+    executar(args.paginas, args.repeticoes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/gerador_pdf.py
+# Gerador de demonstrativos sintéticos em PDF (PyMuPDF) para os benchmarks: páginas bancárias
+# no layout real (linha do cedente, "Valor Demonstrativo:", "Dt. Pgto:", FUNARPEN e ISSQN)
+# misturadas, na proporção pedida, a páginas de anexo sem o campo bancário. Com
+# --cabecalho-fora-da-cropbox, o cabeçalho (com a linha do cedente) fica fora da área visível.
+# Uso: python -m benchmarks.gerador_pdf saida.pdf [--paginas N] [--sem-campo P] [--semente N]
+#      [--cabecalho-fora-da-cropbox]
+import argparse
+import random
+
+try:
+    import fitz  # type: ignore
+except ImportError:
+    fitz = None
+
+from benchmarks.bench_varredura import gerar_texto_pagina
+
+MIN_PAGINAS = 10
+MAX_PAGINAS = 10_000
+
+# Posição e corpo do texto: 3 blocos de boletos (cerca de 50 linhas) cabem numa página A4
+MARGEM = (40, 50)
+TAMANHO_FONTE = 8
+
+
+def gerar_texto_anexo(rnd: random.Random, linhas: int = 40) -> str:
+    """Página sem o campo bancário: texto corrido, como os anexos e capas dos demonstrativos reais"""
+    texto = ["RELATÓRIO COMPLEMENTAR - ANEXO", f"Referência: {rnd.randint(1, 12):02d}/2024"]
+    texto += [f"Linha {n} do anexo com texto corrido de exemplo {rnd.randint(0, 10**9)}" for n in range(linhas)]
+    return "\n".join(texto)
+
+
+def gerar_pdf(caminho: str, paginas: int, proporcao_sem_campo: float = 0.5, semente: int = 42,
+              cabecalho_fora_da_cropbox: bool = False) -> str:
+    """
+    Grava em caminho um PDF de paginas páginas, das quais cerca de proporcao_sem_campo não têm
+    o campo bancário. A mesma semente gera sempre o mesmo documento. Com
+    cabecalho_fora_da_cropbox, a CropBox das páginas bancárias começa abaixo do cabeçalho: o
+    texto continua no conteúdo da página (o PyPDF2 o lê), mas fica fora da área visível.
+    """
+    if fitz is None:
+        raise RuntimeError("PyMuPDF não está instalado. Execute: pip install PyMuPDF")
+    if not MIN_PAGINAS <= paginas <= MAX_PAGINAS:
+        raise ValueError(f"paginas deve estar entre {MIN_PAGINAS} e {MAX_PAGINAS}")
+    if not 0.0 <= proporcao_sem_campo <= 1.0:
+        raise ValueError("proporcao_sem_campo deve estar entre 0 e 1")
+    rnd = random.Random(semente)
+    documento = fitz.open()
+    try:
+        for _ in range(paginas):
+            bancaria = rnd.random() >= proporcao_sem_campo
+            texto = gerar_texto_pagina(rnd, rnd.randint(1, 3)) if bancaria else gerar_texto_anexo(rnd)
+            pagina = documento.new_page()
+            pagina.insert_text(MARGEM, texto, fontsize=TAMANHO_FONTE)
+            if bancaria and cabecalho_fora_da_cropbox:
+                # O primeiro boleto começa logo abaixo do cabeçalho
+                inicio_boletos = pagina.search_for("Sacado:")[0].y0
+                pagina.set_cropbox(fitz.Rect(0, inicio_boletos - 1, pagina.rect.width, pagina.rect.height))
+        documento.save(caminho, garbage=1, deflate=True)
+    finally:
+        documento.close()
+    return caminho
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um demonstrativo sintético em PDF")
+    parser.add_argument("saida", help="arquivo PDF gerado")
+    parser.add_argument("--paginas", type=int, default=100,
+                        help=f"quantidade de páginas, de {MIN_PAGINAS} a {MAX_PAGINAS} (padrão: 100)")
+    parser.add_argument("--sem-campo", type=float, default=0.5,
+                        help="proporção de páginas sem o campo bancário (padrão: 0.5)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--cabecalho-fora-da-cropbox", action="store_true",
+                        help="deixa o cabeçalho das páginas bancárias fora da CropBox")
+    args = parser.parse_args()
+    gerar_pdf(args.saida, args.paginas, args.sem_campo, args.semente, args.cabecalho_fora_da_cropbox)
+    print(f"PDF gerado: {args.saida} ({args.paginas} páginas)")
+
+
+if __name__ == "__main__":
+    main()
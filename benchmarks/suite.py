@@ -0,0 +1,149 @@
+# benchmarks/suite.py
+# Suíte de benchmarks de ponta a ponta: gera demonstrativos sintéticos (benchmarks/gerador_pdf.py)
+# de 10 a 10.000 páginas, mede analisar_pdf, as agregações e gerar_relatorio, grava os tempos
+# em JSON e compara com uma baseline salva, acusando regressões acima da tolerância.
+# Os PDFs gerados ficam em results/benchmarks/pdfs e são reaproveitados nas execuções seguintes.
+# Uso: python -m benchmarks.suite [--paginas N ...] [--sem-campo P] [--motor MOTOR]
+#      [--repeticoes N] [--saida ARQUIVO] [--baseline ARQUIVO] [--tolerancia T]
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from app.analise_pdf import AnalisadorPDF
+from app.extracao import MOTOR_PADRAO
+from benchmarks.gerador_pdf import gerar_pdf
+
+VERSAO_RESULTADOS = 1
+PAGINAS_PADRAO = [10, 100, 1000, 10_000]
+PASTA_RESULTADOS = Path("results") / "benchmarks"
+PASTA_PDFS = PASTA_RESULTADOS / "pdfs"
+# Etapas medidas em cada cenário, na ordem da tabela
+METRICAS = ("analisar_pdf", "agregacao", "gerar_relatorio")
+# Uma regressão de poucos milissegundos em cenários muito rápidos é só ruído
+MINIMO_SIGNIFICATIVO_S = 0.025
+
+
+def chave_cenario(paginas: int, proporcao_sem_campo: float, motor: str) -> str:
+    return f"{paginas}p-{proporcao_sem_campo:g}-{motor}"
+
+
+def medir_cenario(caminho_pdf: str, motor: str, repeticoes: int) -> Dict[str, float]:
+    """Melhor tempo de cada etapa entre as repetições, com analisador, cache e checkpoint novos"""
+    tempos: Dict[str, List[float]] = {metrica: [] for metrica in METRICAS}
+    registros = 0
+    with open(os.devnull, "w", encoding="utf-8") as descarte:
+        for _ in range(repeticoes):
+            analisador = AnalisadorPDF(caminho_pdf, motor=motor)
+            inicio = time.perf_counter()
+            if not analisador.analisar_pdf():
+                raise RuntimeError(f"falha ao analisar {caminho_pdf}: {analisador.erro}")
+            tempos["analisar_pdf"].append(time.perf_counter() - inicio)
+
+            inicio = time.perf_counter()
+            analisador.calcular_totais()
+            analisador.calcular_totais_diarios()
+            analisador.indice_datas()
+            tempos["agregacao"].append(time.perf_counter() - inicio)
+
+            # O texto do relatório é descartado: mede a montagem, não o disco
+            inicio = time.perf_counter()
+            analisador.gerar_relatorio(retornar_texto=False, saida=descarte)
+            tempos["gerar_relatorio"].append(time.perf_counter() - inicio)
+
+            registros = (len(analisador.valores_demonstrativos) + len(analisador.valores_funarpen)
+                         + len(analisador.valores_issqn))
+    resultado = {metrica: min(valores) for metrica, valores in tempos.items()}
+    resultado["registros"] = registros
+    return resultado
+
+
+def executar_suite(paginas: List[int], proporcao_sem_campo: float, motor: str, repeticoes: int,
+                   semente: int = 42) -> Dict:
+    resultados = {}
+    PASTA_PDFS.mkdir(parents=True, exist_ok=True)
+    for quantidade in paginas:
+        # A mesma semente gera o mesmo documento: PDFs de execuções anteriores são reaproveitados
+        caminho = PASTA_PDFS / f"demonstrativo_{quantidade}p_{proporcao_sem_campo:g}_{semente}.pdf"
+        if not caminho.exists():
+            gerar_pdf(str(caminho), quantidade, proporcao_sem_campo, semente)
+        chave = chave_cenario(quantidade, proporcao_sem_campo, motor)
+        resultados[chave] = medir_cenario(str(caminho), motor, repeticoes)
+        resultados[chave]["paginas"] = quantidade
+        print(f"{chave:<24} " + "  ".join(
+            f"{metrica}: {resultados[chave][metrica]:8.3f}s" for metrica in METRICAS
+        ))
+    return {
+        "versao": VERSAO_RESULTADOS,
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": {"sem_campo": proporcao_sem_campo, "motor": motor, "repeticoes": repeticoes,
+                       "semente": semente},
+        "cenarios": resultados,
+    }
+
+
+def comparar(atual: Dict, baseline: Dict, tolerancia: float) -> List[Tuple[str, str, float, float]]:
+    """
+    Compara os cenários presentes nos dois resultados. Retorna as regressões, como
+    (cenário, etapa, segundos na baseline, segundos agora), das etapas mais lentas que
+    baseline * (1 + tolerancia).
+    """
+    regressoes = []
+    print()
+    print(f"{'Cenário':<24} {'Etapa':<16} {'Baseline (s)':>12} {'Atual (s)':>10} {'Variação':>9}")
+    print("-" * 75)
+    for chave, medicoes in atual["cenarios"].items():
+        referencia = baseline.get("cenarios", {}).get(chave)
+        if referencia is None:
+            continue
+        for metrica in METRICAS:
+            antes, agora = referencia.get(metrica), medicoes[metrica]
+            if not antes:
+                continue
+            variacao = agora / antes - 1
+            regrediu = variacao > tolerancia and agora - antes > MINIMO_SIGNIFICATIVO_S
+            marca = "  REGRESSÃO" if regrediu else ""
+            print(f"{chave:<24} {metrica:<16} {antes:>12.3f} {agora:>10.3f} {variacao:>+8.1%}{marca}")
+            if regrediu:
+                regressoes.append((chave, metrica, antes, agora))
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de ponta a ponta com PDFs sintéticos")
+    parser.add_argument("--paginas", type=int, nargs="+", default=PAGINAS_PADRAO,
+                        help=f"tamanhos dos documentos gerados (padrão: {' '.join(map(str, PAGINAS_PADRAO))})")
+    parser.add_argument("--sem-campo", type=float, default=0.5,
+                        help="proporção de páginas sem o campo bancário (padrão: 0.5)")
+    parser.add_argument("--motor", default=MOTOR_PADRAO, help=f"motor de extração (padrão: {MOTOR_PADRAO})")
+    parser.add_argument("--repeticoes", type=int, default=3, help="repetições por cenário; vale o melhor tempo")
+    parser.add_argument("--saida", help=f"arquivo JSON dos resultados (padrão: {PASTA_RESULTADOS}/suite_<data>.json)")
+    parser.add_argument("--baseline", help="resultados anteriores (JSON) para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.2,
+                        help="aumento relativo tolerado antes de acusar regressão (padrão: 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    resultados = executar_suite(args.paginas, args.sem_campo, args.motor, max(1, args.repeticoes))
+    saida = Path(args.saida) if args.saida else PASTA_RESULTADOS / f"suite_{datetime.now():%Y%m%d_%H%M%S}.json"
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados salvos em: {saida}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressoes = comparar(resultados, baseline, args.tolerancia)
+        if regressoes:
+            print(f"\n{len(regressoes)} regressão(ões) acima de {args.tolerancia:.0%}")
+            sys.exit(1)
+        print(f"\nNenhuma regressão acima de {args.tolerancia:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/verificar_motores.py
+# Verificação de paridade dos motores de extração: analisa os mesmos demonstrativos sintéticos
+# (benchmarks/gerador_pdf.py) com o PyPDF2 e com o fitz e confere que os registros extraídos
+# (página, linha, valor e data de cada demonstrativo, FUNARPEN e ISSQN) e os totais são iguais.
+# Termina com código 1 se algum documento divergir.
+# Uso: python -m benchmarks.verificar_motores [--paginas N ...] [--sem-campo P] [--semente N]
+import argparse
+import sys
+from typing import Dict, List, Tuple
+
+from app.analise_pdf import AnalisadorPDF
+from app.extracao import MOTORES
+from benchmarks.gerador_pdf import gerar_pdf
+from benchmarks.suite import PASTA_PDFS
+
+PAGINAS_PADRAO = [20, 300]
+MOTORES_COMPARADOS = ("pypdf2", "fitz")
+
+
+def extrair(caminho_pdf: str, motor: str) -> Tuple[Dict[str, List[tuple]], Dict[str, object]]:
+    """Registros por tipo, como tuplas comparáveis, e os totais da análise com o motor dado"""
+    # Sem cache nem checkpoint: cada motor extrai de fato todas as páginas
+    analisador = AnalisadorPDF(caminho_pdf, motor=motor, cache=False, checkpoint=False)
+    if not analisador.analisar_pdf():
+        raise RuntimeError(f"falha ao analisar {caminho_pdf} com {motor}: {analisador.erro}")
+    registros = {
+        "demonstrativos": [(r.pagina, r.linha_completa, r.valor, r.data_pagamento)
+                           for r in analisador.valores_demonstrativos],
+        "funarpen": [(r.pagina, r.linha_completa, r.valor, r.data_pagamento) for r in analisador.valores_funarpen],
+        "issqn": [(r.pagina, r.linha_completa, r.valor, r.data_pagamento) for r in analisador.valores_issqn],
+    }
+    return registros, analisador.calcular_totais()
+
+
+def comparar(caminho_pdf: str) -> List[str]:
+    """Divergências entre os motores no documento; lista vazia se forem iguais"""
+    referencia, outro = MOTORES_COMPARADOS
+    registros_ref, totais_ref = extrair(caminho_pdf, referencia)
+    registros, totais = extrair(caminho_pdf, outro)
+    divergencias = []
+    for tipo, lista_ref in registros_ref.items():
+        lista = registros[tipo]
+        if lista != lista_ref:
+            primeira = next((i for i, (a, b) in enumerate(zip(lista_ref, lista)) if a != b), min(len(lista), len(lista_ref)))
+            divergencias.append(f"{tipo}: {len(lista_ref)} registros no {referencia}, {len(lista)} no {outro};"
+                                f" primeira diferença no registro {primeira}")
+        elif not lista_ref:
+            divergencias.append(f"{tipo}: nenhum registro extraído (documento sem valores?)")
+    if totais != totais_ref:
+        divergencias.append(f"totais: {totais_ref} no {referencia}, {totais} no {outro}")
+    return divergencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Confere que PyPDF2 e fitz extraem os mesmos registros")
+    parser.add_argument("--paginas", type=int, nargs="+", default=PAGINAS_PADRAO,
+                        help=f"tamanhos dos documentos gerados (padrão: {' '.join(map(str, PAGINAS_PADRAO))})")
+    parser.add_argument("--sem-campo", type=float, default=0.3,
+                        help="proporção de páginas sem o campo bancário (padrão: 0.3)")
+    parser.add_argument("--semente", type=int, default=7)
+    args = parser.parse_args()
+
+    indisponiveis = [m for m in MOTORES_COMPARADOS if not MOTORES[m].disponivel()]
+    if indisponiveis:
+        print(f"Motores não instalados: {', '.join(indisponiveis)}")
+        sys.exit(1)
+
+    PASTA_PDFS.mkdir(parents=True, exist_ok=True)
+    falhas = 0
+    for quantidade in args.paginas:
+        caminho = PASTA_PDFS / f"paridade_{quantidade}p_{args.sem_campo:g}_{args.semente}.pdf"
+        if not caminho.exists():
+            gerar_pdf(str(caminho), quantidade, args.sem_campo, args.semente)
+        divergencias = comparar(str(caminho))
+        if divergencias:
+            falhas += 1
+            print(f"DIVERGE  {caminho.name}")
+            for divergencia in divergencias:
+                print(f"  - {divergencia}")
+        else:
+            print(f"OK       {caminho.name}")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/verificar_prefiltro.py
+# Verificação do pré-filtro: analisa demonstrativos sintéticos (benchmarks/gerador_pdf.py) com e
+# sem o pré-filtro e confere que os registros e os totais são iguais e que o modo de verificação
+# não encontra páginas descartadas com o campo bancário. Um dos documentos tem o cabeçalho
+# bancário fora da CropBox das páginas, texto que o get_text() padrão do PyMuPDF não lê.
+# Termina com código 1 se algum documento divergir.
+# Uso: python -m benchmarks.verificar_prefiltro [--paginas N] [--sem-campo P] [--semente N]
+import argparse
+import sys
+from typing import Dict, List, Tuple
+
+from app.analise_pdf import AnalisadorPDF
+from benchmarks.gerador_pdf import gerar_pdf
+from benchmarks.suite import PASTA_PDFS
+
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
+CASOS = (
+    ("normal", False),
+    ("fora_da_cropbox", True),
+)
+
+
+def extrair(caminho_pdf: str, **opcoes) -> Tuple[Dict[str, List[tuple]], Dict[str, object], AnalisadorPDF]:
+    """Registros por tipo, como tuplas comparáveis, os totais e o próprio analisador"""
+    # Sem cache nem checkpoint: todas as páginas passam de fato pelo pré-filtro
+    analisador = AnalisadorPDF(caminho_pdf, cache=False, checkpoint=False, **opcoes)
+    if not analisador.analisar_pdf():
+        raise RuntimeError(f"falha ao analisar {caminho_pdf}: {analisador.erro}")
+    registros = {
+        "demonstrativos": [(r.pagina, r.linha_completa, r.valor, r.data_pagamento)
+                           for r in analisador.valores_demonstrativos],
+        "funarpen": [(r.pagina, r.linha_completa, r.valor, r.data_pagamento) for r in analisador.valores_funarpen],
+        "issqn": [(r.pagina, r.linha_completa, r.valor, r.data_pagamento) for r in analisador.valores_issqn],
+    }
+    return registros, analisador.calcular_totais(), analisador
+
+
+def comparar(caminho_pdf: str) -> List[str]:
+    """Divergências entre a análise com e sem o pré-filtro; lista vazia se forem iguais"""
+    registros_ref, totais_ref, _ = extrair(caminho_pdf, prefiltro=False)
+    registros, totais, _ = extrair(caminho_pdf, prefiltro=True)
+    divergencias = []
+    for tipo, lista_ref in registros_ref.items():
+        lista = registros[tipo]
+        if lista != lista_ref:
+            divergencias.append(f"{tipo}: {len(lista_ref)} registros sem o pré-filtro, {len(lista)} com ele")
+        elif not lista_ref:
+            divergencias.append(f"{tipo}: nenhum registro extraído (documento sem valores?)")
+    if totais != totais_ref:
+        divergencias.append(f"totais: {totais_ref} sem o pré-filtro, {totais} com ele")
+    _, _, analisador = extrair(caminho_pdf, prefiltro=True, verificar_prefiltro=True)
+    if analisador.falsos_negativos_prefiltro:
+        divergencias.append(f"{analisador.falsos_negativos_prefiltro} página(s) com o campo bancário descartadas"
+                            " pelo pré-filtro")
+    return divergencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Confere que o pré-filtro não muda os registros extraídos")
+    parser.add_argument("--paginas", type=int, default=300, help="tamanho dos documentos gerados (padrão: 300)")
+    parser.add_argument("--sem-campo", type=float, default=0.3,
+                        help="proporção de páginas sem o campo bancário (padrão: 0.3)")
+    parser.add_argument("--semente", type=int, default=7)
+    args = parser.parse_args()
+
+    if fitz is None:
+        print("PyMuPDF não instalado: o pré-filtro fica desligado")
+        sys.exit(1)
+
+    PASTA_PDFS.mkdir(parents=True, exist_ok=True)
+    falhas = 0
+    for nome, fora_da_cropbox in CASOS:
+        caminho = PASTA_PDFS / f"prefiltro_{nome}_{args.paginas}p_{args.sem_campo:g}_{args.semente}.pdf"
+        if not caminho.exists():
+            gerar_pdf(str(caminho), args.paginas, args.sem_campo, args.semente,
+                      cabecalho_fora_da_cropbox=fora_da_cropbox)
+        divergencias = comparar(str(caminho))
+        if divergencias:
+            falhas += 1
+            print(f"DIVERGE  {caminho.name}")
+            for divergencia in divergencias:
+                print(f"  - {divergencia}")
+        else:
+            print(f"OK       {caminho.name}")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
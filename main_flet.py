@@ -1,5 +1,8 @@
+import multiprocessing
+
 import flet as ft
-from app.logic import set_etapa, validar_arquivo_pdf, estado
+from app.logic import set_etapa, validar_arquivo_pdf, estado, adicionar_arquivos_fila
+from app.tarefas import iniciar_analise_especulativa
 from pathlib import Path
 
 def main(page: ft.Page):
@@ -24,6 +27,8 @@ def main(page: ft.Page):
             valido, mensagem = validar_arquivo_pdf(file_path)
             if valido:
                 estado["file_path"] = file_path  # type: ignore
+                # A análise começa já, enquanto o usuário confere o arquivo na confirmação
+                iniciar_analise_especulativa(file_path)
                 set_etapa(4)  # Ir para tela de confirmação
             else:
                 page.add(ft.SnackBar(ft.Text(f"Arquivo inválido: {mensagem}"), bgcolor="#d32f2f"))
@@ -32,6 +37,14 @@ def main(page: ft.Page):
     pick_files_dialog = ft.FilePicker(on_result=pick_files_result)
     page.overlay.append(pick_files_dialog)
     
+    # FilePicker da fila de análise: vários arquivos de uma vez
+    def pick_files_fila_result(e: ft.FilePickerResultEvent):
+        if e.files:
+            adicionar_arquivos_fila([f.path for f in e.files])
+    
+    pick_files_fila_dialog = ft.FilePicker(on_result=pick_files_fila_result)
+    page.overlay.append(pick_files_fila_dialog)
+    
     # Configurar FilePickers para salvar arquivos
     def save_txt_result(e: ft.FilePickerResultEvent):
         if e.path:
@@ -57,6 +70,14 @@ def main(page: ft.Page):
             allow_multiple=False,
         )
     
+    def abrir_file_picker_fila(e=None):
+        pick_files_fila_dialog.pick_files(
+            dialog_title="Selecione os arquivos PDF",
+            file_type=ft.FilePickerFileType.CUSTOM,
+            allowed_extensions=["pdf"],
+            allow_multiple=True,
+        )
+    
     # Funções para abrir janelas de salvar
     def abrir_save_txt(e=None):
         nome_arquivo = Path(estado["file_path"]).stem if estado["file_path"] else "relatorio"
@@ -78,6 +99,7 @@ def main(page: ft.Page):
     
     # Conectar as funções ao logic
     setattr(app.logic, 'pick_file', abrir_file_picker)
+    setattr(app.logic, 'pick_files_fila', abrir_file_picker_fila)
     app.logic.save_txt_dialog_func = abrir_save_txt
     app.logic.save_csv_dialog_func = abrir_save_csv
     
@@ -87,5 +109,8 @@ def main(page: ft.Page):
     set_etapa(1)
 
 if __name__ == "__main__":
+    # A fila e a análise usam ProcessPoolExecutor: no executável do PyInstaller, cada processo
+    # filho reabre o próprio .exe e precisa parar aqui em vez de abrir outra janela
+    multiprocessing.freeze_support()
     Path("results").mkdir(exist_ok=True)
     ft.app(target=main, view=ft.AppView.FLET_APP) 
\ No newline at end of file
@@ -1,5 +1,6 @@
 # main_launcher.py
 # Ponto de entrada principal da aplicação Analisador PDF Financeiro.
+import multiprocessing
 import subprocess
 import sys
 import os
@@ -11,4 +12,6 @@ def main():
     subprocess.run([python_exe, script_path])
 
 if __name__ == "__main__":
+    # Ponto de entrada do executável (pyinstaller --onefile): os processos dos pools reabrem o .exe
+    multiprocessing.freeze_support()
     main() 
\ No newline at end of file